@@ -42,13 +42,34 @@ def ignoreEnv():
 
 # The global application object used when cadnano is run as a python module
 
+class HeadlessSignal(object):
+    """Stands in for the pyqtSignals of CadnanoQt when there is no gui."""
+    def __init__(self):
+        self.targets = []
+    def connect(self, target):
+        self.targets.append(target)
+    def disconnect(self, target):
+        self.targets.remove(target)
+    def emit(self, *args):
+        for t in list(self.targets):
+            t(*args)
+# end class
+
 class HeadlessCadnano(object):
     undoGroup = None
+    def __init__(self):
+        self.documentControllers = set()
+        self.documentWasCreatedSignal = HeadlessSignal()
     def isInMaya(self):
         return False
     class prefs():
+        # the defaults of views.styles
+        honeycombRows = 30
+        honeycombCols = 32
+        honeycombSteps = 2
         squareRows = 50
         squareCols = 50
+        squareSteps = 2
     def isGui(self):
         return False
 # end def
@@ -59,10 +80,17 @@ def app(appArgs=None):
         return sharedApp
     return initAppWithoutGui(appArgs)
 
-def initAppWithoutGui(appArgs=sys.argv):
+def initAppWithoutGui(appArgs=sys.argv, useQt=False):
+    """
+    Unless useQt is True, the model gets the pure python stand-ins of
+    dummyqt for its Qt classes and signals. That choice is made when the
+    model modules are first imported, so call this before importing them.
+    """
     global sharedApp
+    if not useQt:
+        util.qtFrameworkList = ['Dummy']
     sharedApp = HeadlessCadnano()
-    loadAllPlugins()
+    # plugins are mostly gui, they are loaded on first use with plugin()
     return sharedApp
 
 def initAppWithGui(appArgs=sys.argv):
@@ -94,14 +122,16 @@ def path():
 # maps plugin path (extension stripped) -> plugin module
 loadedPlugins = {}
 
+def pluginDirs():
+    """The directories searched for plugins."""
+    return [os.path.join(path(), 'plugins')]
+
 def unloadedPlugins():
     """ Returns a list of plugin paths that have yet to
     be loaded but are in the top level of one of the
     search directories specified in pluginDirs"""
-    internalPlugins = os.path.join(path(), 'plugins')
-    pluginDirs = [internalPlugins]
     results = []
-    for pluginDir in pluginDirs:
+    for pluginDir in pluginDirs():
         if not os.path.isdir(pluginDir):
             continue
         for dirent in os.listdir(pluginDir):
@@ -129,9 +159,27 @@ def loadPlugin(f):
     loadedPlugins[pluginKey] = mod
     return mod
 
+def plugin(name):
+    """ Returns the plugin module called name, loading it
+    if it hasn't been loaded yet. Raises ImportError if no
+    plugin directory has it."""
+    for pluginDir in pluginDirs():
+        f = os.path.join(pluginDir, name)
+        if os.path.isfile(os.path.join(f, '__init__.py')):
+            return loadPlugin(f)
+        for suffix in ('.py', '.so'):
+            if os.path.isfile(f + suffix):
+                return loadPlugin(f + suffix)
+    raise ImportError("No plugin named %s" % name)
+
 def loadAllPlugins():
     loadedAPlugin = False
     for p in unloadedPlugins():
         loadPlugin(p)
         loadedAPlugin = True
-    return loadedAPlugin
\ No newline at end of file
+    return loadedAPlugin
+
+if __name__ == '__main__':
+    # python -m cadnano batch ...
+    from cadnanobatch import main
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,228 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+"""
+cadnanobatch.py
+
+Headless batch processing of designs, run from the cadnano2 root as
+
+    python -m cadnano batch [options] design.json [design.json ...]
+
+Each design is opened without a gui and put through the steps selected by
+the options, always in this order: autostaple, autobreak, apply a scaffold
+sequence, export the staples as CSV and save the design. Designs are
+processed in parallel worker processes.
+"""
+
+import os
+import sys
+import time
+import traceback
+from argparse import ArgumentParser
+from multiprocessing import Pool, cpu_count
+
+import cadnano
+from data.dnasequences import sequences
+from dummyqt.QtCore import signalsSuspended
+
+BINARY_SUFFIX = '.cnb'
+JSON_SUFFIX = '.json'
+
+def buildParser():
+    parser = ArgumentParser(prog="python -m cadnano")
+    commands = parser.add_subparsers(dest='command')
+    batch = commands.add_parser('batch',
+                    help="process designs headless, in parallel")
+    batch.add_argument('inputs', nargs='+', metavar='DESIGN',
+                    help="json (or .cnb) design files")
+    batch.add_argument('--lattice', choices=('honeycomb', 'square'),
+                    help="lattice type of the legacy designs (default: "
+                         "inferred from the helix length, honeycomb if "
+                         "ambiguous). Designs that don't fit it fail")
+    batch.add_argument('--autostaple', action='store_true',
+                    help="replace the staples with autostaple")
+    batch.add_argument('--autobreak', action='store_true',
+                    help="break the staples with the autobreak plugin")
+    batch.add_argument('--min-staple-len', type=int, default=30)
+    batch.add_argument('--max-staple-len', type=int, default=40)
+    batch.add_argument('--tgt-staple-len', type=int, default=35)
+    batch.add_argument('--min-staple-leg-len', type=int, default=2)
+    batch.add_argument('--solution-cache', metavar='FILE',
+                    help="autobreak solution cache file")
+    batch.add_argument('--sequence', choices=sorted(sequences.keys()),
+                    help="apply this sequence to the longest scaffold oligo")
+    batch.add_argument('--export-staples', action='store_true',
+                    help="write the staples to <name><suffix>.csv")
+    batch.add_argument('--save', choices=('json', 'cnb'),
+                    help="save the design to <name><suffix>.json or .cnb")
+    batch.add_argument('--output-dir', metavar='DIR',
+                    help="directory of the output files (default: the "
+                         "directory of each design)")
+    batch.add_argument('--suffix', default='',
+                    help="appended to the name of the output files. "
+                         "Without it or --output-dir, --save json "
+                         "overwrites the design")
+    batch.add_argument('-j', '--jobs', type=int, default=cpu_count(),
+                    help="number of worker processes (default: %(default)s)")
+    return parser
+# end def
+
+
+def helixOrder(part):
+    """
+    Returns the coords of the virtual helices of part in the order they
+    were imported, followed by any others in order of their numbers. This is
+    the order the path view saves them in.
+    """
+    order = list(part.importedVHelixOrder() or [])
+    known = set(order)
+    others = [vh for vh in part.getVirtualHelices() if vh.coord() not in known]
+    others.sort(key=lambda vh: vh.number())
+    return order + [vh.coord() for vh in others]
+# end def
+
+
+def outputPath(inputPath, options, extension):
+    name = os.path.splitext(os.path.basename(inputPath))[0]
+    outputDir = options['output_dir'] or os.path.dirname(inputPath)
+    return os.path.join(outputDir, name + options['suffix'] + extension)
+# end def
+
+
+def processDesign(inputPath, options):
+    """
+    Opens the design at inputPath and runs the steps selected in options,
+    the argument dictionary of the batch command. Returns a list of
+    warnings about steps that were only partly done.
+    """
+    from model.document import Document
+    from model.enum import LatticeType
+    from model.io.decoder import decode
+    from model.io.encoder import encode
+    from model.io.binaryformat import encode_binary
+
+    warnings = []
+    document = Document()
+    latticeType = {'honeycomb': LatticeType.Honeycomb,
+                   'square': LatticeType.Square}.get(options['lattice'])
+    with open(inputPath, 'rb') as f:
+        decode(document, f, latticeType)
+    part = document.selectedPart()
+    if part == None:
+        raise ValueError("no part in %s" % inputPath)
+
+    if options['autostaple']:
+        part.autoStaple()
+    if options['autobreak']:
+        autobreak = cadnano.plugin('autobreak').autobreak
+        settings = {
+            'stapleScorer'      : autobreak.tgtLengthStapleScorer,
+            'minStapleLegLen'   : options['min_staple_leg_len'],
+            'minStapleLen'      : options['min_staple_len'],
+            'maxStapleLen'      : options['max_staple_len'],
+            'tgtStapleLen'      : options['tgt_staple_len'],
+            'numWorkers'        : 1,  # already in a worker process
+            'solutionCacheFile' : options['solution_cache'],
+        }
+        autobreak.breakStaples(part, settings)
+    if options['sequence']:
+        scaffolds = [o for o in part.oligos() if not o.isStaple()]
+        if not scaffolds:
+            raise ValueError("no scaffold to apply %s to" % options['sequence'])
+        scaffold = max(scaffolds, key=lambda o: o.length())
+        scaffold.applySequence(sequences[options['sequence']])
+    if options['export_staples']:
+        loops = part.getStapleLoopOligos()
+        if loops:
+            warnings.append("%d circular staples left out of the csv: %s"
+                            % (len(loops), ' '.join(sorted(o.locString()
+                                                           for o in loops))))
+        with open(outputPath(inputPath, options, '.csv'), 'wb') as f:
+            part.writeStapleSequences(f, skipLoops=True)
+    if options['save'] == 'cnb':
+        with open(outputPath(inputPath, options, BINARY_SUFFIX), 'wb') as f:
+            encode_binary(document, helixOrder(part), f)
+    elif options['save'] == 'json':
+        with open(outputPath(inputPath, options, JSON_SUFFIX), 'w') as f:
+            encode(document, helixOrder(part), f)
+    return warnings
+# end def
+
+
+def runJob(job):
+    """
+    Runs processDesign for job, an (inputPath, options) tuple. Returns
+    (inputPath, seconds, warnings, error), where error is None or a
+    traceback.
+    """
+    inputPath, options = job
+    start = time.time()
+    warnings = []
+    try:
+        # listeners, if any, hear about each design once it is done
+        with signalsSuspended():
+            warnings = processDesign(inputPath, options)
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    return inputPath, time.time() - start, warnings, error
+# end def
+
+
+def initWorker():
+    cadnano.app()
+# end def
+
+
+def main(argv):
+    """Runs the command line argv, returns the exit status."""
+    args = buildParser().parse_args(argv)
+    options = vars(args)
+    if args.output_dir and not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+    cadnano.app()
+    jobs = [(inputPath, options) for inputPath in args.inputs]
+    numWorkers = max(1, min(args.jobs, len(jobs)))
+    if numWorkers == 1:
+        results = map(runJob, jobs)
+    else:
+        pool = Pool(numWorkers, initializer=initWorker)
+        results = pool.imap_unordered(runJob, jobs)
+    failures = 0
+    for inputPath, seconds, warnings, error in results:
+        for warning in warnings:
+            print "warning %s: %s" % (inputPath, warning)
+        if error == None:
+            print "ok      %s (%.2fs)" % (inputPath, seconds)
+        else:
+            failures += 1
+            print "FAILED  %s (%.2fs)\n%s" % (inputPath, seconds, error)
+        sys.stdout.flush()
+    if numWorkers > 1:
+        pool.close()
+        pool.join()
+    print "%d of %d designs processed" % (len(jobs) - failures, len(jobs))
+    return 1 if failures else 0
+# end def
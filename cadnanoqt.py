@@ -130,7 +130,8 @@ class CadnanoQt(QObject):
             dc = DocumentController()
             doc = dc.document()
             from model.io.decoder import decode
-            decode(doc, file(defaultFile).read())
+            with open(defaultFile) as f:
+                decode(doc, f)
             print "Loaded default document: %s" % doc
         else:
             docCtrlrCount = len(self.documentControllers)
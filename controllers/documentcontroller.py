@@ -27,6 +27,7 @@ from cadnano import app
 from model.document import Document
 from model.io.decoder import decode
 from model.io.encoder import encode
+from model.io.binaryformat import encode_binary, EXTENSION as BINARY_EXTENSION
 from views.documentwindow import DocumentWindow
 from views import styles
 import util
@@ -515,14 +516,18 @@ class DocumentController():
                             self.win,
                             "%s - Save As" % QApplication.applicationName(),
                             directory,
-                            "%s (*.json)" % QApplication.applicationName())
+                            "%s (*.json);;%s binary (*%s)" % \
+                            (QApplication.applicationName(),
+                             QApplication.applicationName(), BINARY_EXTENSION))
             self.writeDocumentToFile(fname)
         else:  # access through non-blocking callback
             fdialog = QFileDialog(
                             self.win,
                             "%s - Save As" % QApplication.applicationName(),
                             directory,
-                            "%s (*.json)" % QApplication.applicationName())
+                            "%s (*.json);;%s binary (*%s)" % \
+                            (QApplication.applicationName(),
+                             QApplication.applicationName(), BINARY_EXTENSION))
             fdialog.setAcceptMode(QFileDialog.AcceptSave)
             fdialog.setWindowFlags(Qt.Sheet)
             fdialog.setWindowModality(Qt.WindowModal)
@@ -574,9 +579,8 @@ class DocumentController():
             del self.saveStaplesDialog
             self.saveStaplesDialog = None
         # write the file
-        output = self.activePart().getStapleSequences()
-        with open(fname, 'w') as f:
-            f.write(output)
+        with open(fname, 'wb') as f:
+            self.activePart().writeStapleSequences(f)
     # end def
 
     def newClickedCallback(self):
@@ -610,7 +614,8 @@ class DocumentController():
         fname = str(fname)
         self._writeFileOpenPath(os.path.dirname(fname))
         self.newDocument(fname=fname)
-        decode(self._document, file(fname).read())
+        with open(fname, 'rb') as f:
+            decode(self._document, f)
         if hasattr(self, "filesavedialog"): # user did save
             if self.fileopendialog != None:
                 self.fileopendialog.filesSelected.disconnect(\
@@ -628,7 +633,7 @@ class DocumentController():
         if fname.isEmpty() or os.path.isdir(fname):
             return False
         fname = str(fname)
-        if not fname.lower().endswith(".json"):
+        if not fname.lower().endswith((".json", BINARY_EXTENSION)):
             fname += ".json"
         if self.filesavedialog != None:
             self.filesavedialog.filesSelected.disconnect(
@@ -681,7 +686,7 @@ class DocumentController():
             fname = QFileDialog.getOpenFileName(
                         None,
                         "Open Document", path,
-                        "cadnano1 / cadnano2 Files (*.nno *.json *.cadnano)")
+                        "cadnano1 / cadnano2 Files (*.nno *.json *.cadnano *%s)" % BINARY_EXTENSION)
             self.filesavedialog = None
             self.openAfterMaybeSaveCallback(fname)
         else:  # access through non-blocking callback
@@ -689,7 +694,7 @@ class DocumentController():
                         self.win,
                         "Open Document",
                         path,
-                        "cadnano1 / cadnano2 Files (*.nno *.json *.cadnano)")
+                        "cadnano1 / cadnano2 Files (*.nno *.json *.cadnano *%s)" % BINARY_EXTENSION)
             fdialog.setAcceptMode(QFileDialog.AcceptOpen)
             fdialog.setWindowFlags(Qt.Sheet)
             fdialog.setWindowModality(Qt.WindowModal)
@@ -729,9 +734,13 @@ class DocumentController():
             assert(not self._hasNoAssociatedFile)
             filename = self.filename()
         try:
-            with open(filename, 'w') as f:
-                helixOrderList = self.win.pathroot.getSelectedPartOrderedVHList()
-                encode(self._document, helixOrderList, f)
+            helixOrderList = self.win.pathroot.getSelectedPartOrderedVHList()
+            if str(filename).lower().endswith(BINARY_EXTENSION):
+                with open(filename, 'wb') as f:
+                    encode_binary(self._document, helixOrderList, f)
+            else:
+                with open(filename, 'w') as f:
+                    encode(self._document, helixOrderList, f)
         except IOError:
             flags = Qt.Dialog | Qt.MSWindowsFixedSizeDialogHint | Qt.Sheet
             errorbox = QMessageBox(QMessageBox.Critical,
@@ -1,29 +1,171 @@
-QObject = object
+"""
+Pure python stand-ins for the QtCore classes used by the model, selected
+with util.qtFrameworkList = ['Dummy'] (see cadnano.initAppWithoutGui).
+
+A pyqtSignal only creates a bound signal for an object once something
+connects to it, so emitting a signal that nobody listens to allocates
+nothing lasting and calls nothing.
+
+Emission can be suspended around bulk operations with suspendSignals and
+resumeSignals (or the signalsSuspended context manager). The emissions of
+connected signals made in the meantime are replayed on resume, in order.
+An emission that repeats the one just before it, same signal and same
+arguments, is coalesced into it. Repeats with other emissions in between
+are all kept, since those may have undone what the first one announced.
+"""
+from contextlib import contextmanager
+
+_suspendDepth = 0
+_pending = []  # (boundSignal, args) to replay on resume
+
+
+def suspendSignals():
+    """Holds back signal emission until the matching resumeSignals."""
+    global _suspendDepth
+    _suspendDepth += 1
+# end def
+
+
+def resumeSignals():
+    """
+    Ends a suspendSignals. Once no suspension is left, replays what was
+    emitted meanwhile.
+    """
+    global _suspendDepth, _pending
+    _suspendDepth -= 1
+    if _suspendDepth > 0:
+        return
+    _suspendDepth = 0
+    while _pending:
+        pending = _pending
+        _pending = []
+        for bound, args in pending:
+            bound.emit(*args)
+# end def
+
+
+@contextmanager
+def signalsSuspended():
+    suspendSignals()
+    try:
+        yield
+    finally:
+        resumeSignals()
+# end def
+
+
+def _queue(bound, args):
+    if _pending:
+        lastBound, lastArgs = _pending[-1]
+        if lastBound == bound and lastArgs == args:
+            return
+    _pending.append((bound, args))
+# end def
+
 
 class Qt(object):
     pass
 
+
+def pyqtSlot(*argtypes, **kwargs):
+    def decorator(func):
+        return func
+    return decorator
+
+
+class QObject(object):
+    """
+    Slotted so that subclasses declaring __slots__ of their own (e.g.
+    model.strand.Strand) carry no instance dictionary. Subclasses without
+    __slots__ get one as usual.
+    """
+    __slots__ = ('_qobjectParent', '_boundSignals')
+
+    def __init__(self, parent=None):
+        self._qobjectParent = parent
+        self._boundSignals = None  # signal key -> pyqtBoundSignal
+
+    def parent(self):
+        return self._qobjectParent
+
+    def setParent(self, parent):
+        self._qobjectParent = parent
+
+    def deleteLater(self):
+        pass
+
+
 class pyqtSignal(object):
-    def __init__(self, *args):
-        """ We don't actually do anything with argtypes because
-        the real Qt will perform checks in the Gui version of
-        cadnano which should suffice. """
-        self.signalEmitters = {}
-        self.argtypes = args
-    def __get__(self, emitter):
-        try:
-            return self.signalEmitters.get(emitter)
-        except KeyError:
-            self.signalEmitters[emitter] = pyqtBoundSignal()
-            return emitter
+    """
+    We don't actually do anything with argtypes because the real Qt will
+    perform checks in the Gui version of cadnano which should suffice.
+    """
+    __slots__ = ('argtypes', '_key')
+
+    def __init__(self, *argtypes):
+        self.argtypes = argtypes
+        self._key = '_pyqtSignal%x' % id(self)
+
+    def __get__(self, instance, owner=None):
+        if instance == None:
+            return self
+        boundSignals = instance._boundSignals
+        if boundSignals == None or self._key not in boundSignals:
+            return _UnconnectedSignal(self, instance)
+        return boundSignals[self._key]
+
+    def bind(self, instance):
+        """Returns the bound signal of instance, creating it if needed."""
+        boundSignals = instance._boundSignals
+        if boundSignals == None:
+            boundSignals = instance._boundSignals = {}
+        bound = boundSignals.get(self._key)
+        if bound == None:
+            bound = boundSignals[self._key] = pyqtBoundSignal()
+        return bound
+
+
+class _UnconnectedSignal(object):
+    """What a signal looks like on an object before anything connects."""
+    __slots__ = ('signal', 'instance')
+
+    def __init__(self, signal, instance):
+        self.signal = signal
+        self.instance = instance
+
+    def connect(self, slot):
+        self.signal.bind(self.instance).connect(slot)
+
+    def disconnect(self, slot=None):
+        if slot != None:
+            raise TypeError("disconnect() failed, the slot is not connected")
+
+    def emit(self, *args):
+        pass
+
 
 class pyqtBoundSignal(object):
+    __slots__ = ('slots',)
+
     def __init__(self):
-        self.targets = {}
-    def connect(self, target):
-        self.targets.add(target)
-    def disconnect(self, target):
-        self.targets.remove(target)
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def disconnect(self, slot=None):
+        if slot == None:
+            del self.slots[:]
+        elif slot in self.slots:
+            self.slots.remove(slot)
+        else:
+            raise TypeError("disconnect() failed, the slot is not connected")
+
     def emit(self, *args):
-        for t in self.targets:
-            t(*args)
\ No newline at end of file
+        if not self.slots:
+            return
+        if _suspendDepth:
+            _queue(self, args)
+            return
+        for slot in tuple(self.slots):  # slots may disconnect themselves
+            slot(*args)
@@ -1,6 +1,13 @@
+"""
+Pure python stand-ins for the QtGui classes used by the model.
+"""
+import re
+
+
 class QUndoCommand(object):
-    children = []
     name = "untitled"
+    def __init__(self, *args):
+        self.children = []
     def undo(self):
         for c in reversed(self.children):
             c.undo()
@@ -9,65 +16,66 @@ class QUndoCommand(object):
             c.redo()
 
 class QUndoStack(object):
-    undoCmds = []
-    macroStack = []  # list of lists
-    macroNameStack = []
-    index = 0
-    clean = True
+    """
+    Commands are kept in undoCmds, the first index of them are done. Macros
+    being recorded are kept in macroStack.
+    """
+    def __init__(self, *args):
+        self.undoCmds = []
+        self.macroStack = []  # list of lists
+        self.macroNameStack = []
+        self.index = 0
+        self.cleanIndex = 0
     def isClean(self):
-        return self.clean
+        return self.index == self.cleanIndex
     def setClean(self):
-        self.clean = True
-    def clean(self):
-        self.clean = True
+        self.cleanIndex = self.index
+    def clear(self):
         self.undoCmds = []
         self.index = 0
-    def beginMacro(self, macroName):
-        self.macroStack.append([])
-        self.macroNameStack.append(macroName)
-        self.clean = False
-    def push(self, cmd):
+        self.cleanIndex = 0
+    def count(self):
+        return len(self.undoCmds)
+    def canUndo(self):
+        return not self.macroStack and self.index > 0
+    def canRedo(self):
+        return not self.macroStack and self.index < len(self.undoCmds)
+    def _append(self, cmd):
         if self.macroStack:
             self.macroStack[-1].append(cmd)
         else:
+            del self.undoCmds[self.index:]  # drop the undone commands
+            if self.cleanIndex > self.index:
+                self.cleanIndex = -1  # the clean state can't come back
             self.undoCmds.append(cmd)
-            self.index = len(self.undoCmds) - 1
+            self.index = len(self.undoCmds)
+    def beginMacro(self, macroName):
+        self.macroStack.append([])
+        self.macroNameStack.append(macroName)
+    def push(self, cmd):
         cmd.redo()
-        self.clean = False
+        self._append(cmd)
     def endMacro(self):
-        l = len(self.macroStack)
-        if l == 0:
-            assert(False)  # Can't end a macro that wasn't begun
+        assert(self.macroStack)  # Can't end a macro that wasn't begun
         cmd = QUndoCommand()
         cmd.children = self.macroStack.pop()
         cmd.name = self.macroNameStack.pop()
-        if l == 1:
-            self.undoCmds.append(cmd)
-            self.index = len(self.undoCmds) - 1
-        else:
-            self.macroStack[-1].append(cmd)
-        self.clean = False
+        self._append(cmd)
     def undo(self):
         assert(not self.macroStack)  # Can't undo in the middle of a macro!
         if self.index > 0:
-            cmd = self.undoCmds[self.index]
-            self.index = self.index - 1
-            cmd.undo()
+            self.index -= 1
+            self.undoCmds[self.index].undo()
     def redo(self):
-        assert(not macroStack)  # Can't redo in the middle of a macro
-        if self.index < len(self.undoCmds) - 1:
-            cmd = self.undoCmds[self.index + 1]
-            self.index = self.index + 1
-            cmd.redo()
+        assert(not self.macroStack)  # Can't redo in the middle of a macro
+        if self.index < len(self.undoCmds):
+            self.undoCmds[self.index].redo()
+            self.index += 1
 
 class QColor(object):
-    r = 0
-    g = 0
-    b = 0
-    a = 0
     def __init__(self, *args):
         if len(args) == 1:
-            assert(type(args[0]) == str)
+            assert(isinstance(args[0], basestring))
             hvals = re.findall('[0-9a-fA-F]{2}', args[0])
             hvals = [int(hv, 16) for hv in hvals]
         elif len(args) == 3:
@@ -82,7 +90,9 @@ class QColor(object):
             hvals.append(255)
         for hv in hvals:
             assert(0 <= hv <= 255)
-        r, g, b, a = hvals
+        self.r, self.g, self.b, self.a = hvals[:4]
+    def name(self):
+        return "#%02x%02x%02x" % (self.r, self.g, self.b)
 
 class QFont(object):
     dummy = True
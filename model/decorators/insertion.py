@@ -25,14 +25,20 @@
 #
 # http://www.opensource.org/licenses/mit-license.php
 
+from bisect import bisect_left, bisect_right
+
+
 class Insertion(object):
     """
     Insertions do affect an applied sequence and do not store a sequence
     themselves.  They are a skip if the length is less than 0
     """
+    __slots__ = ('_length', '_index', '_owner')
+
     def __init__(self, index, length):
         self._length = length
         self._index  = index
+        self._owner = None  # the InsertionIndex holding this insertion
     # end def
 
     def length(self):
@@ -43,6 +49,8 @@ class Insertion(object):
 
     def setLength(self, length):
         self._length = length
+        if self._owner != None:
+            self._owner._sums = None
     # end def
 
     def updateIdx(self, delta):
@@ -55,4 +63,134 @@ class Insertion(object):
 
     def isSkip(self):
         return self.length() < 0
-# end class
\ No newline at end of file
+# end class
+
+
+class InsertionIndex(dict):
+    """
+    The insertions of one virtual helix, as a dictionary of base idx to
+    Insertion (the value type of Part.insertions()).
+
+    The sorted idxs and the prefix sums of the insertion lengths are kept
+    alongside and rebuilt after the dictionary changes, so range queries
+    cost O(log n). Each insertion refers back to the index holding it, so
+    that Insertion.setLength invalidates the sums.
+    """
+    __slots__ = ('_idxs', '_sums')
+
+    def __init__(self, *args, **kwargs):
+        super(InsertionIndex, self).__init__(*args, **kwargs)
+        self._idxs = None  # sorted insertion idxs
+        self._sums = None  # _sums[i] is the length of the first i insertions
+        for insertion in self.itervalues():
+            self._adopt(insertion)
+    # end def
+
+    def _adopt(self, insertion):
+        if isinstance(insertion, Insertion):
+            insertion._owner = self
+        return insertion
+    # end def
+
+    def _release(self, insertion):
+        if isinstance(insertion, Insertion) and insertion._owner is self:
+            insertion._owner = None
+        return insertion
+    # end def
+
+    def __setitem__(self, idx, insertion):
+        if idx in self:
+            self._release(dict.__getitem__(self, idx))
+        dict.__setitem__(self, idx, self._adopt(insertion))
+        self._idxs = self._sums = None
+
+    def __delitem__(self, idx):
+        self._release(dict.__getitem__(self, idx))
+        dict.__delitem__(self, idx)
+        self._idxs = self._sums = None
+
+    def clear(self):
+        for insertion in self.itervalues():
+            self._release(insertion)
+        dict.clear(self)
+        self._idxs = self._sums = None
+
+    def pop(self, *args):
+        self._idxs = self._sums = None
+        if args[0] in self:
+            self._release(dict.__getitem__(self, args[0]))
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self._idxs = self._sums = None
+        idx, insertion = dict.popitem(self)
+        return idx, self._release(insertion)
+
+    def setdefault(self, idx, insertion=None):
+        self._idxs = self._sums = None
+        return self._adopt(dict.setdefault(self, idx, insertion))
+
+    def update(self, *args, **kwargs):
+        for insertion in self.itervalues():
+            self._release(insertion)
+        dict.update(self, *args, **kwargs)
+        for insertion in self.itervalues():
+            self._adopt(insertion)
+        self._idxs = self._sums = None
+
+    def _index(self):
+        """Returns the sorted idxs and the prefix sums, rebuilding them."""
+        if self._sums == None:
+            if self._idxs == None:
+                self._idxs = sorted(self.iterkeys())
+            sums = [0]
+            total = 0
+            for idx in self._idxs:
+                total += dict.__getitem__(self, idx)._length
+                sums.append(total)
+            self._sums = sums
+        return self._idxs, self._sums
+    # end def
+
+    def setInsertionLength(self, idx, length):
+        dict.__getitem__(self, idx).setLength(length)
+    # end def
+
+    def shiftIdxs(self, delta):
+        """Moves every insertion by delta bases."""
+        insertions = self.values()
+        dict.clear(self)
+        for insertion in insertions:
+            insertion.updateIdx(delta)
+            dict.__setitem__(self, insertion.idx(), self._adopt(insertion))
+        self._idxs = self._sums = None
+    # end def
+
+    def insertionsBetween(self, idxL, idxH):
+        """Returns the insertions at idxL to idxH inclusive, sorted by idx."""
+        if not self:
+            return []
+        idxs = self._index()[0]
+        i, j = bisect_left(idxs, idxL), bisect_right(idxs, idxH)
+        return [dict.__getitem__(self, idx) for idx in idxs[i:j]]
+    # end def
+
+    def lengthBetween(self, idxL, idxH):
+        """Returns the summed length of the insertions at idxL to idxH."""
+        if not self:
+            return 0
+        idxs, sums = self._index()
+        return sums[bisect_right(idxs, idxH)] - sums[bisect_left(idxs, idxL)]
+    # end def
+
+    def expandedIdx(self, idx):
+        """
+        Returns the position of base idx in the helix sequence, that is idx
+        shifted by the lengths of the insertions (and skips) at lower idxs.
+        """
+        if not self:
+            return idx
+        idxs, sums = self._index()
+        return idx + sums[bisect_left(idxs, idx)]
+    # end def
+# end class
@@ -0,0 +1,200 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+"""
+binaryformat.py
+
+A compact binary container for designs. Strands are stored as intervals
+and xovers as edge lists instead of the per-base arrays of the legacy
+json format, so a file holds the same helix records that
+legacydecoder.read_legacy_helix extracts from json, and is loaded with
+legacydecoder.import_legacy_records.
+
+All values are little endian int32s:
+    header:  magic (8 bytes), version, latticeType, numBases, numHelices,
+             name length in bytes, name (utf-8, padded to 4 bytes)
+    helix:   num, row, col, and the lengths of the six tables below,
+             followed by the tables:
+             scafSeg     (low, high) per scaffold strand
+             stapSeg     (low, high) per staple strand
+             scafXo      (3' idx, to vh num, to 5' idx) per scaffold xover
+             stapXo      (3' idx, to vh num, to 5' idx) per staple xover
+             insertions  (idx, length) per insertion, skips have length -1
+             stapColors  (5' idx, rgb) per staple oligo
+Files are read through mmap when they have a file descriptor.
+"""
+
+import mmap
+import struct
+from os.path import basename
+from legacydecoder import import_legacy_records
+
+MAGIC = 'CADNANOB'
+VERSION = 1
+EXTENSION = '.cnb'
+
+_HEADER = struct.Struct('<8s5i')
+_HELIX = struct.Struct('<9i')
+
+
+def is_binary(source):
+    """
+    Returns True if source, a string or a seekable file object, starts
+    with the binary format magic. The file position is not changed.
+    """
+    if hasattr(source, 'read'):
+        pos = source.tell()
+        head = source.read(len(MAGIC))
+        source.seek(pos)
+        return head == MAGIC
+    return source[:len(MAGIC)] == MAGIC
+# end def
+
+def helix_records_from_doc(document, helixOrderList):
+    """
+    Yields the record of each helix of the selected part, in the order
+    of helixOrderList, in the form returned by read_legacy_helix.
+    """
+    part = document.selectedPart()
+    numBases = part.maxBaseIdx() + 1
+    for row, col in helixOrderList:
+        vh = part.virtualHelixAtCoord((row, col))
+        record = {'num': vh.number(), 'row': row, 'col': col,
+                  'numBases': numBases}
+        for strandSet, segKey, xoKey in \
+                            ((vh.scaffoldStrandSet(), 'scafSeg', 'scafXo'),
+                             (vh.stapleStrandSet(), 'stapSeg', 'stapXo')):
+            segs, xovers = [], []
+            for strand in strandSet:
+                segs.extend(strand.idxs())
+                s3p = strand.connection3p()
+                if s3p != None:
+                    xovers.append((strand.idx3Prime(),
+                                   s3p.virtualHelix().number(),
+                                   s3p.idx5Prime()))
+            record[segKey] = segs
+            record[xoKey] = xovers
+        # end for
+        record['insertions'] = [(idx, insertion.length()) for idx, insertion \
+                                in sorted(part.insertions()[(row, col)].iteritems())]
+        stapColors = []
+        for strand in vh.stapleStrandSet():
+            if strand.connection5p() == None:
+                c = str(strand.oligo().color())[1:]  # drop the hash
+                stapColors.append((strand.idx5Prime(), int(c, 16)))
+        record['stap_colors'] = stapColors
+        yield record
+    # end for
+# end def
+
+def _packInts(values):
+    return struct.pack('<%di' % len(values), *values)
+
+def _flatten(pairs):
+    return [v for pair in pairs for v in pair]
+
+def encode_binary(document, helixOrderList, io):
+    """Writes the selected part of document to the file object io."""
+    part = document.selectedPart()
+    name = basename(str(io.name)).encode('utf-8')
+    io.write(_HEADER.pack(MAGIC, VERSION, part.crossSectionType(),
+                          part.maxBaseIdx() + 1, len(helixOrderList), len(name)))
+    io.write(name + '\0' * (-len(name) % 4))
+    for record in helix_records_from_doc(document, helixOrderList):
+        tables = (record['scafSeg'], record['stapSeg'],
+                  _flatten(record['scafXo']), _flatten(record['stapXo']),
+                  _flatten(record['insertions']),
+                  _flatten(record['stap_colors']))
+        io.write(_HELIX.pack(record['num'], record['row'], record['col'],
+                             *[len(table) for table in tables]))
+        for table in tables:
+            io.write(_packInts(table))
+    # end for
+# end def
+
+def read_binary_records(buf):
+    """
+    Parses buf, a string or mmap holding a binary design. Returns
+    (latticeType, name, records). Raises ValueError if buf is not a
+    binary design of a supported version, or is truncated.
+    """
+    try:
+        return _readBinaryRecords(buf)
+    except struct.error:
+        raise ValueError("Truncated cadnano binary file.")
+# end def
+
+def _readBinaryRecords(buf):
+    magic, version, latticeType, numBases, numHelices, nameLen = \
+                                                _HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a cadnano binary file.")
+    if not 1 <= version <= VERSION:
+        raise ValueError("Unsupported cadnano binary version %d." % version)
+    offset = _HEADER.size
+    if nameLen < 0 or offset + nameLen > len(buf):
+        raise ValueError("Truncated cadnano binary file.")
+    name = buf[offset:offset + nameLen].decode('utf-8')
+    offset += nameLen + (-nameLen % 4)
+    records = []
+    for i in xrange(numHelices):
+        fields = _HELIX.unpack_from(buf, offset)
+        offset += _HELIX.size
+        tables = []
+        for n in fields[3:]:
+            if n < 0:
+                raise ValueError("Corrupt cadnano binary file.")
+            tables.append(struct.unpack_from('<%di' % n, buf, offset))
+            offset += 4 * n
+        scafSeg, stapSeg, scafXo, stapXo, insertions, stapColors = tables
+        records.append({'num': fields[0], 'row': fields[1], 'col': fields[2],
+                        'numBases': numBases,
+                        'scafSeg': scafSeg, 'stapSeg': stapSeg,
+                        'scafXo': zip(scafXo[0::3], scafXo[1::3], scafXo[2::3]),
+                        'stapXo': zip(stapXo[0::3], stapXo[1::3], stapXo[2::3]),
+                        'insertions': zip(insertions[0::2], insertions[1::2]),
+                        'stap_colors': zip(stapColors[0::2], stapColors[1::2])})
+    # end for
+    return latticeType, name, records
+# end def
+
+def import_binary(document, source):
+    """
+    Populates document from source, a binary design given as a string or
+    a file object. Files are memory mapped when possible.
+    """
+    buf = source
+    if hasattr(source, 'read'):
+        try:
+            buf = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, EnvironmentError, ValueError):
+            buf = source.read()  # no file descriptor (eg. StringIO)
+    try:
+        latticeType, name, records = read_binary_records(buf)
+    finally:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+    import_legacy_records(document, records, latticeType, askLatticeType=False)
+# end def
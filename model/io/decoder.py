@@ -24,22 +24,27 @@
 
 import json
 from exceptions import ImportError
-from legacydecoder import import_legacy_dict
-from ui.dialogs.ui_latticetype import Ui_LatticeType
-import util, cadnano
-if cadnano.app().isGui():#headless:
-    from ui.dialogs.ui_latticetype import Ui_LatticeType
-    util.qtWrapImport('QtGui', globals(),  ['QDialog', 'QDialogButtonBox'])
+from legacydecoder import import_legacy_dict, import_legacy_helices
+from streamdecoder import iterObject
+from binaryformat import is_binary, import_binary
 
 
-def decode(document, string):
-    if cadnano.app().isGui():
-        # from ui.dialogs.ui_latticetype import Ui_LatticeType
-        # util.qtWrapImport('QtGui', globals(),  ['QDialog', 'QDialogButtonBox'])
-        dialog = QDialog()
-        dialogLT = Ui_LatticeType()  # reusing this dialog, should rename
-        dialogLT.setupUi(dialog)
+def decode(document, string, latticeType=None):
+    """
+    Populates document from a json design, given either as a string or as
+    a file object. File objects are read incrementally (see streamdecoder).
+    Designs in the binary format (see binaryformat) are recognized by their
+    magic number.
 
+    Legacy designs don't store their lattice type. If latticeType is None
+    the gui asks for it, otherwise it is used as is.
+    """
+    if is_binary(string):
+        import_binary(document, string)
+        return
+    if hasattr(string, 'read'):
+        decodeFile(document, string, latticeType)
+        return
     # try:  # try to do it fast
     #     try:
     #         import cjson
@@ -54,4 +59,31 @@ def decode(document, string):
     packageObject = json.loads(string)
 
     if packageObject.get('.format', None) != 'caDNAno2':
-        import_legacy_dict(document, packageObject)
\ No newline at end of file
+        if latticeType == None:
+            import_legacy_dict(document, packageObject)
+        else:
+            import_legacy_dict(document, packageObject, latticeType,
+                               askLatticeType=False)
+# end def
+
+def decodeFile(document, f, latticeType=None):
+    """
+    Streaming version of decode. Legacy helices are imported as they are
+    read from the file object f, without building the whole json tree.
+    """
+    header = {}
+    for key, value in iterObject(f, streamedKeys=('vstrands',)):
+        if key == 'vstrands':
+            if header.get('.format', None) != 'caDNAno2':
+                if latticeType == None:
+                    import_legacy_helices(document, value)
+                else:
+                    import_legacy_helices(document, value, latticeType,
+                                          askLatticeType=False)
+            else:
+                for helix in value:  # not a legacy file, skip the helices
+                    pass
+        else:
+            header[key] = value
+    # end for
+# end def
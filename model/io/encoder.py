@@ -22,10 +22,12 @@
 #
 # http://www.opensource.org/licenses/mit-license.php
 
-from json import dumps
-from legacyencoder import legacy_dict_from_doc
+from legacyencoder import legacy_json_chunks
 
 def encode(document, helixOrderList, io):
-    obj = legacy_dict_from_doc(document, io.name, helixOrderList)
-    json_string = dumps(obj, separators=(',',':'))  # compact encoding
-    io.write(json_string)
+    """
+    Writes the document to the file object io in the compact legacy json
+    format, streaming one helix at a time.
+    """
+    for chunk in legacy_json_chunks(document, io.name, helixOrderList):
+        io.write(chunk)
@@ -22,8 +22,15 @@
 #
 # http://www.opensource.org/licenses/mit-license.php
 
-from collections import defaultdict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from model.document import Document
+from model.decorators.insertion import Insertion
+from model.strand import Strand
 from model.enum import LatticeType, StrandType
 from model.parts.honeycombpart import HoneycombPart
 from model.parts.squarepart import SquarePart
@@ -32,9 +39,6 @@ from views import styles
 import util, cadnano
 # import Qt stuff into the module namespace with PySide, PyQt4 independence
 util.qtWrapImport('QtGui', globals(),  ['QColor'])
-if cadnano.app().isGui():
-    from ui.dialogs.ui_latticetype import Ui_LatticeType
-    util.qtWrapImport('QtGui', globals(),  ['QDialog', 'QDialogButtonBox'])
 
 NODETAG = "node"
 NAME = "name"
@@ -53,39 +57,85 @@ STAPLE = "staple"
 INSERTION = "insertion"
 DELETION = "deletion"
 
-def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb):
+def latticeTypeDialog():
+    """
+    Returns a (QDialog, Ui_LatticeType) pair for the questions asked during
+    import. The dialog modules are only imported once it is needed, so
+    headless imports never load them.
+    """
+    from ui.dialogs.ui_latticetype import Ui_LatticeType
+    util.qtWrapImport('QtGui', globals(),  ['QDialog', 'QDialogButtonBox'])
+    dialog = QDialog()
+    dialogLT = Ui_LatticeType()
+    dialogLT.setupUi(dialog)
+    return dialog, dialogLT
+# end def
+
+def inferLatticeType(numBases):
+    """
+    Returns the lattice type implied by the number of bases per helix of a
+    legacy design, or None if it could be either or neither.
+    """
+    if numBases % 21 == 0 and numBases % 32 == 0:
+        return None
+    elif numBases % 32 == 0:
+        return LatticeType.Square
+    elif numBases % 21 == 0:
+        return LatticeType.Honeycomb
+    return None
+# end def
+
+def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb,
+                       askLatticeType=True):
     """
     Parses a dictionary (obj) created from reading a json file and uses it
     to populate the given document with model data.
     """
-    numBases = len(obj['vstrands'][0]['scaf'])
-    if cadnano.app().isGui():
-        # from ui.dialogs.ui_latticetype import Ui_LatticeType
-        # util.qtWrapImport('QtGui', globals(),  ['QDialog', 'QDialogButtonBox'])
-        dialog = QDialog()
-        dialogLT = Ui_LatticeType()
-        dialogLT.setupUi(dialog)
+    import_legacy_helices(document, obj['vstrands'], latticeType,
+                          askLatticeType)
+# end def
+
+def import_legacy_helices(document, vstrands, latticeType=LatticeType.Honeycomb,
+                          askLatticeType=True):
+    """
+    Populates the given document from vstrands, an iterable of legacy helix
+    dictionaries (the 'vstrands' list of a legacy file). Each helix is
+    reduced to a compact record by read_legacy_helix as soon as it is
+    read, so vstrands may be a stream (see streamdecoder).
+    """
+    helices = [read_legacy_helix(helix) for helix in vstrands]
+    import_legacy_records(document, helices, latticeType, askLatticeType)
+# end def
+
+def import_legacy_records(document, helices, latticeType=LatticeType.Honeycomb,
+                          askLatticeType=True):
+    """
+    Builds a part in document from a list of helix records, as returned by
+    read_legacy_helix. If askLatticeType is True the lattice type is
+    inferred from the number of bases per helix, and if that is ambiguous
+    the gui asks for it while headless imports use the latticeType
+    argument. If askLatticeType is False the latticeType argument is used
+    as is, for formats that store it or callers that chose it, and a
+    design that doesn't fit it raises a ValueError.
+    """
+    numBases = helices[0]['numBases']
+    isGui = cadnano.app().isGui()
+    if isGui:
+        dialog, dialogLT = latticeTypeDialog()
+    if askLatticeType:
         # DETERMINE LATTICE TYPE
-        if numBases % 21 == 0 and numBases % 32 == 0:
-            if dialog.exec_() == 1:
-                latticeType = LatticeType.Square
-            else:
-                latticeType = LatticeType.Honeycomb
-        elif numBases % 32 == 0:
-            latticeType = LatticeType.Square
-        elif numBases % 21 == 0:
-            latticeType = LatticeType.Honeycomb
-        else:
+        inferredType = inferLatticeType(numBases)
+        if inferredType != None:
+            latticeType = inferredType
+        elif isGui:
             if dialog.exec_() == 1:
                 latticeType = LatticeType.Square
             else:
                 latticeType = LatticeType.Honeycomb
-    else:  # Headless, assume the latticeType arg was meaningful
-        pass
 
     # DETERMINE MAX ROW,COL
     maxRowJson = maxColJson = 0
-    for helix in obj['vstrands']:
+    for helix in helices:
         maxRowJson = max(maxRowJson, int(helix['row'])+1)
         maxColJson = max(maxColJson, int(helix['col'])+1)
 
@@ -96,8 +146,8 @@ def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb):
         nCols = max(32, maxColJson, cadnano.app().prefs.honeycombCols)
         part = HoneycombPart(document=document, maxRow=nRows, maxCol=nCols, maxSteps=steps)
     elif latticeType == LatticeType.Square:
-        isSQ100 = True  # check for custom SQ100 format
-        for helix in obj['vstrands']:
+        isSQ100 = isGui and askLatticeType  # check for custom SQ100 format
+        for helix in helices:
             if helix['col'] != 0:
                 isSQ100 = False
                 break
@@ -120,13 +170,9 @@ def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb):
     # POPULATE VIRTUAL HELICES
     orderedCoordList = []
     vhNumToCoord = {}
-    for helix in obj['vstrands']:
-        vhNum = helix['num']
-        row = helix['row']
-        col = helix['col']
-        scaf= helix['scaf']
-        coord = (row, col)
-        vhNumToCoord[vhNum] = coord
+    for helix in helices:
+        coord = (helix['row'], helix['col'])
+        vhNumToCoord[helix['num']] = coord
         orderedCoordList.append(coord)
     # make sure we retain the original order
     for vhNum in sorted(vhNumToCoord.iterkeys()):
@@ -134,64 +180,32 @@ def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb):
         part.createVirtualHelix(row, col, useUndoStack=False)
     part.setImportedVHelixOrder(orderedCoordList)
 
-    # INSTALL STRANDS AND COLLECT XOVER LOCATIONS
-    numHelixes = len(obj['vstrands'])-1
-    scaf_seg = defaultdict(list)
-    scaf_xo = defaultdict(list)
-    stap_seg = defaultdict(list)
-    stap_xo = defaultdict(list)
+    # INSTALL STRANDS
+    # Strands are built directly and put in their strandsets in one go.
+    # Segments that would overlap are skipped, like createStrand does.
+    strandSets = []
     try:
-        for helix in obj['vstrands']:
-            vhNum = helix['num']
-            row = helix['row']
-            col = helix['col']
-            scaf = helix['scaf']
-            stap = helix['stap']
-            insertions = helix['loop']
-            skips = helix['skip']
-            vh = part.virtualHelixAtCoord((row, col))
-            scafStrandSet = vh.scaffoldStrandSet()
-            stapStrandSet = vh.stapleStrandSet()
-            assert(len(scaf)==len(stap) and len(stap)==part.maxBaseIdx()+1 and\
-                   len(scaf)==len(insertions) and len(insertions)==len(skips))
-            # read scaffold segments and xovers
-            for i in range(len(scaf)):
-                fiveVH, fiveIdx, threeVH, threeIdx = scaf[i]
-                if fiveVH == -1 and threeVH == -1:
-                    continue  # null base
-                if isSegmentStartOrEnd(StrandType.Scaffold, vhNum, i, fiveVH,\
-                                       fiveIdx, threeVH, threeIdx):
-                    scaf_seg[vhNum].append(i)
-                if fiveVH != vhNum and threeVH != vhNum:  # special case
-                    scaf_seg[vhNum].append(i)  # end segment on a double crossover
-                if is3primeXover(StrandType.Scaffold, vhNum, i, threeVH, threeIdx):
-                    scaf_xo[vhNum].append((i, threeVH, threeIdx))
-            assert (len(scaf_seg[vhNum]) % 2 == 0)
-            # install scaffold segments
-            for i in range(0, len(scaf_seg[vhNum]), 2):
-                lowIdx = scaf_seg[vhNum][i]
-                highIdx = scaf_seg[vhNum][i+1]
-                scafStrandSet.createStrand(lowIdx, highIdx, useUndoStack=False)
-            # read staple segments and xovers
-            for i in range(len(stap)):
-                fiveVH, fiveIdx, threeVH, threeIdx = stap[i]
-                if fiveVH == -1 and threeVH == -1:
-                    continue  # null base
-                if isSegmentStartOrEnd(StrandType.Staple, vhNum, i, fiveVH,\
-                                       fiveIdx, threeVH, threeIdx):
-                    stap_seg[vhNum].append(i)
-                if fiveVH != vhNum and threeVH != vhNum:  # special case
-                    stap_seg[vhNum].append(i)  # end segment on a double crossover
-                if is3primeXover(StrandType.Staple, vhNum, i, threeVH, threeIdx):
-                    stap_xo[vhNum].append((i, threeVH, threeIdx))
-            assert (len(stap_seg[vhNum]) % 2 == 0)
-            # install staple segments
-            for i in range(0, len(stap_seg[vhNum]), 2):
-                lowIdx = stap_seg[vhNum][i]
-                highIdx = stap_seg[vhNum][i+1]
-                stapStrandSet.createStrand(lowIdx, highIdx, useUndoStack=False)
+        for helix in helices:
+            vh = part.virtualHelixAtCoord((helix['row'], helix['col']))
+            assert(helix['numBases'] == part.maxBaseIdx()+1)
+            for strandSet, segs in ((vh.scaffoldStrandSet(), helix['scafSeg']),
+                                    (vh.stapleStrandSet(), helix['stapSeg'])):
+                assert (len(segs) % 2 == 0)
+                strands = []
+                prevHigh = -1
+                for i in range(0, len(segs), 2):
+                    lo, hi = segs[i], segs[i+1]
+                    if prevHigh < lo <= hi:
+                        strands.append(Strand(strandSet, lo, hi))
+                        prevHigh = hi
+                strandSet._setStrandList(strands)
+                strandSets.append(strandSet)
     except AssertionError:
-        if not cadnano.app().isGui():
+        if not askLatticeType:
+            raise ValueError("Unrecognized file format: the helices don't "
+                             "have the %d bases of this lattice type." % \
+                             (part.maxBaseIdx() + 1))
+        elif not isGui:
             print "Unrecognized file format."
         else:
             dialogLT.label.setText("Unrecognized file format.")
@@ -199,64 +213,149 @@ def import_legacy_dict(document, obj, latticeType=LatticeType.Honeycomb):
             dialog.exec_()
 
     # INSTALL XOVERS
-    for helix in obj['vstrands']:
-        vhNum = helix['num']
-        row = helix['row']
-        col = helix['col']
-        scaf = helix['scaf']
-        stap = helix['stap']
-        insertions = helix['loop']
-        skips = helix['skip']
-        fromVh = part.virtualHelixAtCoord((row, col))
-        scafStrandSet = fromVh.scaffoldStrandSet()
-        stapStrandSet = fromVh.stapleStrandSet()
-        # install scaffold xovers
-        for (idx5p, toVhNum, idx3p) in scaf_xo[vhNum]:
-            # idx3p is 3' end of strand5p, idx5p is 5' end of strand3p
-            strand5p = scafStrandSet.getStrand(idx5p)
-            toVh = part.virtualHelixAtCoord(vhNumToCoord[toVhNum])
-            strand3p = toVh.scaffoldStrandSet().getStrand(idx3p)
-            part.createXover(strand5p, idx5p, strand3p, idx3p, useUndoStack=False)
-        # install staple xovers
-        for (idx5p, toVhNum, idx3p) in stap_xo[vhNum]:
-            # idx3p is 3' end of strand5p, idx5p is 5' end of strand3p
-            strand5p = stapStrandSet.getStrand(idx5p)
-            toVh = part.virtualHelixAtCoord(vhNumToCoord[toVhNum])
-            strand3p = toVh.stapleStrandSet().getStrand(idx3p)
-            part.createXover(strand5p, idx5p, strand3p, idx3p, useUndoStack=False)
-
-    # SET DEFAULT COLOR
-    for oligo in part.oligos():
-        if oligo.isStaple():
-            defaultColor = styles.DEFAULT_STAP_COLOR
-        else:
-            defaultColor = styles.DEFAULT_SCAF_COLOR
-        oligo.applyColor(defaultColor, useUndoStack=False)
+    # xovers between strand ends are linked directly, others are created
+    # with createXover (which splits strands) once the oligos exist
+    xoverOrder = {}  # strand3p: rank of the xover into its 5' end
+    otherXovers = []
+    activeVh = None
+    try:
+        for helix in helices:
+            fromVh = part.virtualHelixAtCoord((helix['row'], helix['col']))
+            for strandType, xovers in ((StrandType.Scaffold, helix['scafXo']),
+                                       (StrandType.Staple, helix['stapXo'])):
+                strandSet = fromVh.getStrandSetByType(strandType)
+                for (idx5p, toVhNum, idx3p) in xovers:
+                    # idx3p is 3' end of strand5p, idx5p is 5' end of strand3p
+                    strand5p = strandSet.getStrand(idx5p)
+                    toVh = part.virtualHelixAtCoord(vhNumToCoord[toVhNum])
+                    strand3p = toVh.getStrandSetByType(strandType).getStrand(idx3p)
+                    if strand5p == None or strand3p == None:
+                        continue
+                    if strand5p.idx3Prime() == idx5p and strand5p.connection3p() == None and \
+                       strand3p.idx5Prime() == idx3p and strand3p.connection5p() == None:
+                        strand5p.setConnection3p(strand3p)
+                        strand3p.setConnection5p(strand5p)
+                        xoverOrder[strand3p] = len(xoverOrder)
+                        activeVh = fromVh
+                    else:
+                        otherXovers.append((strand5p, idx5p, strand3p, idx3p))
+        # end for
 
-    # COLORS, INSERTIONS, SKIPS
-    for helix in obj['vstrands']:
-        vhNum = helix['num']
-        row = helix['row']
-        col = helix['col']
-        scaf = helix['scaf']
-        stap = helix['stap']
-        insertions = helix['loop']
-        skips = helix['skip']
-        vh = part.virtualHelixAtCoord((row, col))
-        scafStrandSet = vh.scaffoldStrandSet()
-        stapStrandSet = vh.stapleStrandSet()
-        # install insertions and skips
-        for baseIdx in range(len(stap)):
-            sumOfInsertSkip = insertions[baseIdx] + skips[baseIdx]
-            if sumOfInsertSkip != 0:
-                strand = scafStrandSet.getStrand(baseIdx)
-                strand.addInsertion(baseIdx, sumOfInsertSkip, useUndoStack=False)
+        # INSTALL INSERTIONS AND SKIPS
+        for helix in helices:
+            coord = (helix['row'], helix['col'])
+            scafStrandSet = part.virtualHelixAtCoord(coord).scaffoldStrandSet()
+            insertions = part.insertions()[coord]
+            for baseIdx, sumOfInsertSkip in helix['insertions']:
+                if scafStrandSet.getStrand(baseIdx) != None and baseIdx not in insertions:
+                    # make sure length is -1 if a skip
+                    length = -1 if sumOfInsertSkip < 0 else sumOfInsertSkip
+                    insertions[baseIdx] = Insertion(baseIdx, length)
         # end for
+    finally:
+        # ASSIGN OLIGOS, even if the above failed, so no strand is left
+        # without one
+        part.rebuildOligos(strandSets, xoverOrder, useUndoStack=False)
+    for helix in helices:
+        vh = part.virtualHelixAtCoord((helix['row'], helix['col']))
+        stapStrandSet = vh.stapleStrandSet()
         # populate colors
         for baseIdx, colorNumber in helix['stap_colors']:
             color = QColor((colorNumber>>16)&0xFF, (colorNumber>>8)&0xFF, colorNumber&0xFF).name()
             strand = stapStrandSet.getStrand(baseIdx)
-            strand.oligo().applyColor(color, useUndoStack=False)
+            if strand != None:
+                strand.oligo().setColor(color)
+    # end for
+
+    # NOTIFY THE VIEWS
+    for strandSet in strandSets:
+        for strand in strandSet:
+            strandSet.strandsetStrandAddedSignal.emit(strandSet, strand)
+    for helix in helices:
+        vh = part.virtualHelixAtCoord((helix['row'], helix['col']))
+        part.partStrandChangedSignal.emit(part, vh)
+    if activeVh != None:
+        part.partActiveVirtualHelixChangedSignal.emit(part, activeVh)
+
+    for (strand5p, idx5p, strand3p, idx3p) in otherXovers:
+        part.createXover(strand5p, idx5p, strand3p, idx3p, useUndoStack=False)
+# end def
+
+def read_legacy_helix(helix):
+    """
+    Reduces a legacy helix dictionary to what import_legacy_helices needs:
+    segment endpoints and 3' xovers of both strands, and the nonzero
+    insertions/skips. The per-base arrays are not kept.
+    """
+    vhNum = helix['num']
+    scaf = helix['scaf']
+    stap = helix['stap']
+    insertions = helix['loop']
+    skips = helix['skip']
+    numBases = len(scaf)
+    if not (len(stap) == numBases and len(insertions) == numBases and \
+                                                len(skips) == numBases):
+        numBases = -1  # rejected when strands are installed
+    record = {'num': vhNum, 'row': helix['row'], 'col': helix['col'],
+              'numBases': numBases, 'stap_colors': helix['stap_colors']}
+    for strandType, bases, segKey, xoKey in \
+                            ((StrandType.Scaffold, scaf, 'scafSeg', 'scafXo'),
+                             (StrandType.Staple, stap, 'stapSeg', 'stapXo')):
+        segs, xovers = None, None
+        if np != None:
+            segs, xovers = readBasesVectorized(strandType, vhNum, bases)
+        if segs == None:
+            segs, xovers = [], []
+            for i in range(len(bases)):
+                fiveVH, fiveIdx, threeVH, threeIdx = bases[i]
+                if fiveVH == -1 and threeVH == -1:
+                    continue  # null base
+                if isSegmentStartOrEnd(strandType, vhNum, i, fiveVH,\
+                                       fiveIdx, threeVH, threeIdx):
+                    segs.append(i)
+                if fiveVH != vhNum and threeVH != vhNum:  # special case
+                    segs.append(i)  # end segment on a double crossover
+                if is3primeXover(strandType, vhNum, i, threeVH, threeIdx):
+                    xovers.append((i, threeVH, threeIdx))
+        record[segKey] = segs
+        record[xoKey] = xovers
+    # end for
+    record['insertions'] = [(baseIdx, insertions[baseIdx] + skips[baseIdx]) \
+                            for baseIdx in range(min(len(insertions), len(skips))) \
+                            if insertions[baseIdx] + skips[baseIdx] != 0]
+    return record
+# end def
+
+def readBasesVectorized(strandType, vhNum, bases):
+    """
+    Array version of the per-base scan in read_legacy_helix, which applies
+    isSegmentStartOrEnd and is3primeXover to all bases at once. Returns
+    (segs, xovers), or (None, None) if bases is not an (N, 4) int array.
+    """
+    arr = np.array(bases)
+    if arr.ndim != 2 or arr.shape[1] != 4 or arr.dtype.kind not in 'iu':
+        return None, None
+    fiveVH, fiveIdx, threeVH, threeIdx = arr.T
+    idx = np.arange(len(arr))
+    offset = 1 if strandType == StrandType.Scaffold else -1
+    if vhNum % 2 == 1:
+        offset = -offset
+    # the natural neighbors of each base are idx-offset (5') and idx+offset (3')
+    five = fiveVH == vhNum
+    three = threeVH == vhNum
+    nonNull = (fiveVH != -1) | (threeVH != -1)
+    isEnd = (five != three) | \
+            (five & (fiveIdx != idx - offset)) | \
+            (three & (threeIdx != idx + offset)) | \
+            ((fiveVH == -1) != (threeVH == -1))
+    isDouble = ~five & ~three  # end segment on a double crossover
+    counts = (isEnd & nonNull).astype(np.intp) + (isDouble & nonNull)
+    segs = np.repeat(idx, counts).tolist()
+    isXover = (threeVH != -1) & (~three | (threeIdx != idx + offset))
+    xoIdx = np.flatnonzero(isXover)
+    xovers = zip(xoIdx.tolist(), threeVH[xoIdx].tolist(), threeIdx[xoIdx].tolist())
+    return segs, xovers
+# end def
 
 def isSegmentStartOrEnd(strandType, vhNum, baseIdx, fiveVH, fiveIdx, threeVH, threeIdx):
     """Returns True if the base is a breakpoint or crossover."""
@@ -22,45 +22,67 @@
 #
 # http://www.opensource.org/licenses/mit-license.php
 
+from json import dumps
 from os.path import basename
 from model.enum import StrandType
 
 def legacy_dict_from_doc(document, fname, helixOrderList):
     part = document.selectedPart()
-    numBases = part.maxBaseIdx()+1
-
-    # iterate through virtualhelix list
-    vhList = []
-    for row, col in helixOrderList:
-        vh = part.virtualHelixAtCoord((row, col))
-        # insertions and skips
-        insertionDict = part.insertions()[(row, col)]
-        insts = [0 for i in range(numBases)]
-        skips = [0 for i in range(numBases)]
-        for idx, insertion in insertionDict.iteritems():
-            if insertion.isSkip():
-                skips[idx] = insertion.length()
-            else:
-                insts[idx] = insertion.length()
-        # colors
-        stapColors = []
-        stapStrandSet = vh.stapleStrandSet()
-        for strand in stapStrandSet:
-            if strand.connection5p() == None:
-                c = str(strand.oligo().color())[1:]  # drop the hash
-                stapColors.append([strand.idx5Prime(), int(c, 16)])
-
-        vhDict = {"row":row,
-                  "col":col,
-                  "num":vh.number(),
-                  "scaf":vh.getLegacyStrandSetArray(StrandType.Scaffold),
-                  "stap":vh.getLegacyStrandSetArray(StrandType.Staple),
-                  "loop":insts,
-                  "skip":skips,
-                  "scafLoop":[],
-                  "stapLoop":[],
-                  "stap_colors":stapColors}
-        vhList.append(vhDict)
+    vhList = [legacy_helix_dict(part, row, col) for row, col in helixOrderList]
     bname = basename(str(fname))
     obj = {"name":bname , "vstrands":vhList}
     return obj
+
+def legacy_json_chunks(document, fname, helixOrderList):
+    """
+    Yields the compact json encoding of legacy_dict_from_doc piece by
+    piece, one helix at a time, so only one helix dict exists at once.
+    The joined chunks equal dumps(legacy_dict_from_doc(...)) with compact
+    separators.
+    """
+    part = document.selectedPart()
+    bname = basename(str(fname))
+    # encode the document with an empty helix list to get the key order
+    # of the top level object, then fill the list in
+    head = dumps({"name":bname , "vstrands":[]}, separators=(',',':'))
+    marker = '"vstrands":['
+    split = head.index(marker + ']') + len(marker)
+    yield head[:split]
+    for i, (row, col) in enumerate(helixOrderList):
+        vhDict = legacy_helix_dict(part, row, col)
+        if i > 0:
+            yield ','
+        yield dumps(vhDict, separators=(',',':'))
+    yield head[split:]
+
+def legacy_helix_dict(part, row, col):
+    numBases = part.maxBaseIdx()+1
+    vh = part.virtualHelixAtCoord((row, col))
+    # insertions and skips
+    insertionDict = part.insertions()[(row, col)]
+    insts = [0] * numBases
+    skips = [0] * numBases
+    for idx, insertion in insertionDict.iteritems():
+        if insertion.isSkip():
+            skips[idx] = insertion.length()
+        else:
+            insts[idx] = insertion.length()
+    # colors
+    stapColors = []
+    stapStrandSet = vh.stapleStrandSet()
+    for strand in stapStrandSet:
+        if strand.connection5p() == None:
+            c = str(strand.oligo().color())[1:]  # drop the hash
+            stapColors.append([strand.idx5Prime(), int(c, 16)])
+
+    vhDict = {"row":row,
+              "col":col,
+              "num":vh.number(),
+              "scaf":vh.getLegacyStrandSetArray(StrandType.Scaffold),
+              "stap":vh.getLegacyStrandSetArray(StrandType.Staple),
+              "loop":insts,
+              "skip":skips,
+              "scafLoop":[],
+              "stapLoop":[],
+              "stap_colors":stapColors}
+    return vhDict
@@ -0,0 +1,152 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+"""
+streamdecoder.py
+
+Incremental reader for json design files. The top level object is read one
+member at a time from a file object in chunks, and the elements of large
+arrays (like the legacy 'vstrands' list) are yielded one by one, so the
+whole file is never held in memory as a string and the parsed helices can
+be consumed as they are read.
+"""
+
+import json
+
+CHUNK_SIZE = 1 << 16
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789+-.eE'
+
+
+class _ChunkReader(object):
+    """A read buffer over a file object that decodes one json value at a time."""
+    def __init__(self, source, chunkSize=CHUNK_SIZE):
+        self._source = source
+        self._chunkSize = chunkSize
+        self._decoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+    # end def
+
+    def _fill(self, size):
+        """Appends up to size bytes to the buffer. Returns False at eof."""
+        if self._eof:
+            return False
+        data = self._source.read(size)
+        if not data:
+            self._eof = True
+            return False
+        # drop what has been consumed so the buffer stays small
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+    # end def
+
+    def peek(self):
+        """Returns the next non-whitespace character, or '' at eof."""
+        while True:
+            buf, pos = self._buf, self._pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill(self._chunkSize):
+                return ''
+    # end def
+
+    def expect(self, chars):
+        """Consumes and returns the next character, which must be in chars."""
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError("Expecting one of %r at offset %d, got %r" % \
+                                                        (chars, self._pos, c))
+        self._pos += 1
+        return c
+    # end def
+
+    def value(self):
+        """
+        Decodes the next json value. If the buffer ends within the value,
+        more is read, doubling the read size each time, and decoding is
+        retried.
+        """
+        self.peek()
+        size = self._chunkSize
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self._buf, self._pos)
+            except ValueError:
+                if not self._fill(size):
+                    raise
+                size *= 2
+                continue
+            # a number at the end of the buffer may be cut short
+            if isinstance(obj, (int, long, float)) and \
+                    not self._buf[end:].lstrip(_NUMBER_CHARS) and \
+                    self._fill(size):
+                continue
+            self._pos = end
+            return obj
+    # end def
+# end class
+
+
+def iterObject(source, streamedKeys=('vstrands',), chunkSize=CHUNK_SIZE):
+    """
+    Yields (key, value) for each member of the top level json object read
+    from the file object source. For keys in streamedKeys the value must be
+    an array, and is yielded as an iterator over its elements, which has to
+    be exhausted before the next member is read.
+    """
+    reader = _ChunkReader(source, chunkSize)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key in streamedKeys:
+            yield key, _iterArray(reader)
+        else:
+            yield key, reader.value()
+        if reader.expect(',}') == '}':
+            return
+    # end while
+# end def
+
+
+def _iterArray(reader):
+    reader.expect('[')
+    if reader.peek() == ']':
+        reader.expect(']')
+        return
+    while True:
+        yield reader.value()
+        if reader.expect(',]') == ']':
+            return
+    # end while
+# end def
@@ -28,6 +28,8 @@
 
 import util
 import copy
+import sequencetools
+from array import array
 from strand import Strand
 # import Qt stuff into the module namespace with PySide, PyQt4 independence
 util.qtWrapImport('QtCore', globals(), ['pyqtSignal', 'QObject'])
@@ -51,6 +53,8 @@ class Oligo(QObject):
         self._length = 0
         self._isLoop = False
         self._color = color if color else "#0066cc"
+        self._sequence = None  # cached by sequence()
+        self._isSequenceCached = False
     # end def
 
     def __repr__(self):
@@ -108,6 +112,7 @@ class Oligo(QObject):
 
     def setStrand5p(self, strand):
         self._strand5p = strand
+        self._isSequenceCached = False
     # end def
 
     def undoStack(self):
@@ -126,31 +131,48 @@ class Oligo(QObject):
     # end def
 
     def sequence(self):
+        """
+        Returns the sequence of the oligo, or None. The result is cached
+        until invalidateSequence is called by a change to one of its strands.
+        """
+        if self._isSequenceCached:
+            return self._sequence
         temp = self.strand5p()
         if not temp:
             return None
         if temp.sequence():
-            return ''.join([Strand.sequence(strand) \
+            seq = ''.join([Strand.sequence(strand) \
                         for strand in self.strand5p().generator3pStrand()])
         else:
-            return None
+            seq = None
+        self._sequence = seq
+        self._isSequenceCached = True
+        return seq
     # end def
 
     def sequenceExport(self):
+        return "%s,%s,%s,%s,%s\n" % self.sequenceExportRow()
+    # end def
+
+    def sequenceExportRow(self):
+        """
+        Returns the staple CSV fields of the oligo as a tuple
+        (start, end, sequence, length, color), with unset bases as '?'.
+        """
         vhNum5p = self.strand5p().virtualHelix().number()
         idx5p = self.strand5p().idx5Prime()
-        seq = ''
+        seqs = []
         if self.isLoop():
             # print "A loop exists"
             raise Exception
         for strand in self.strand5p().generator3pStrand():
-            seq = seq + Strand.sequence(strand, forExport=True)
+            seqs.append(Strand.sequence(strand, forExport=True))
             if strand.connection3p() == None:  # last strand in the oligo
                 vhNum3p = strand.virtualHelix().number()
                 idx3p = strand.idx3Prime()
-        output = "%d[%d],%d[%d],%s,%s,%s\n" % \
-                (vhNum5p, idx5p, vhNum3p, idx3p, seq, len(seq), self._color)
-        return output
+        seq = ''.join(seqs)
+        return ("%d[%d]" % (vhNum5p, idx5p), "%d[%d]" % (vhNum3p, idx3p),
+                seq, len(seq), self._color)
     # end def
 
     def shouldHighlight(self):
@@ -179,6 +201,16 @@ class Oligo(QObject):
     # end def
 
     def applySequence(self, sequence, useUndoStack=True):
+        """
+        Applies sequence to the oligo from its 5' end, or clears the
+        sequence if it is None. Raises a ValueError if sequence has chars
+        that are not IUPAC nucleotide codes.
+        """
+        if sequence:
+            invalid = sequencetools.invalidChars(''.join(sequence))
+            if invalid:
+                raise ValueError("Invalid bases in sequence: %s" % \
+                                 ''.join(sorted(set(invalid))))
         c = Oligo.ApplySequenceCommand(self, sequence)
         util.execCommandList(self, [c], desc="Apply Sequence", useUndoStack=useUndoStack)
     # end def
@@ -207,6 +239,14 @@ class Oligo(QObject):
         self.setLength(self._length-delta)
     # end def
 
+    def invalidateSequence(self):
+        """
+        Drops the cached sequence. Called when the sequence, bounds or
+        connections of a strand of the oligo change.
+        """
+        self._isSequenceCached = False
+    # end def
+
     def incrementLength(self, delta):
         self.setLength(self._length+delta)
     # end def
@@ -250,6 +290,7 @@ class Oligo(QObject):
         This method sets the isLoop status of the oligo and the oligo's
         5' strand.
         """
+        self._isSequenceCached = False
         # check loop status
         if oldStrandLow.oligo() == oldStrandHigh.oligo():
             self._isLoop = True
@@ -277,7 +318,8 @@ class Oligo(QObject):
         Called by a strand after resize. Delta is used to update the length,
         which may case an appearance change.
         """
-        pass
+        self._isSequenceCached = False
+        self.incrementLength(delta)
     # end def
 
     def strandSplitUpdate(self, newStrand5p, newStrand3p, oligo3p, oldMergedStrand):
@@ -288,6 +330,8 @@ class Oligo(QObject):
         """
         # if you split it can't be a loop
         self._isLoop = False
+        self._isSequenceCached = False
+        oligo3p._isSequenceCached = False
         if oldMergedStrand.oligo().isLoop():
             self._strand5p = newStrand3p
             return
@@ -325,56 +369,138 @@ class Oligo(QObject):
     # end class
 
     class ApplySequenceCommand(QUndoCommand):
+        """
+        Applies a sequence to the oligo and its complement to every
+        overlapping strand of the complement strand sets.
+
+        The complemented sequence is laid out once per helix onto a buffer
+        indexed by base position (shifted by the insertions and skips
+        before it), and each complement strand is then filled in by slicing
+        that buffer. The strand sequences before and after are recorded on
+        the first redo, so undo and later redos just swap them back in.
+        """
         def __init__(self, oligo, sequence):
             super(Oligo.ApplySequenceCommand, self).__init__()
             self._oligo = oligo
             self._newSequence = sequence
-            self._oldSequence = oligo.sequence()
             self._strandType = oligo._strand5p.strandSet().strandType()
+            self._oldStates = None
+            self._newStates = None
+            self._oligoList = None
         # end def
 
         def redo(self):
-            olg = self._oligo
-            nS = ''.join(self._newSequence) if self._newSequence else None
-            nS_original = self._newSequence
-            oligoList = [olg]
-            for strand in olg.strand5p().generator3pStrand():
-                usedSeq, nS = strand.setSequence(nS)
-                # get the compliment ahead of time
-                usedSeq = util.comp(usedSeq) if usedSeq else None
-                compSS = strand.strandSet().complementStrandSet()
-                for compStrand in compSS._findOverlappingRanges(strand):
-                    subUsedSeq = compStrand.setComplementSequence(usedSeq, strand)
-                    oligoList.append(compStrand.oligo())
-                # end for
-                # as long as the new Applied Sequence is not None
-                if nS == None and nS_original:
-                    break
-            # end for
-            for oligo in oligoList:
-                oligo.oligoSequenceAddedSignal.emit(oligo)
+            if self._newStates == None:
+                self._applySequence()
+            else:
+                self._setStates(self._newStates)
         # end def
 
         def undo(self):
-            olg = self._oligo
-            oS = ''.join(self._oldSequence) if self._oldSequence else None
+            self._setStates(self._oldStates)
+        # end def
 
-            oligoList = [olg]
+        def _setStates(self, states):
+            for strand, seq in states:
+                strand._sequence = seq
+                if strand._oligo != None:
+                    strand._oligo.invalidateSequence()
+            # end for
+            for oligo in self._oligoList:
+                oligo.oligoSequenceAddedSignal.emit(oligo)
+        # end def
 
+        def _applySequence(self):
+            olg = self._oligo
+            part = olg.part()
+            nS = ''.join(self._newSequence) if self._newSequence else None
+            expandedIdxs = {}  # coord: base idx to buffer position function
+            helixBuffers = {}  # coord: complemented sequence by position
+            helixRanges = []   # (strand, coord, start) in 5' to 3' order
+            oldStates, newStates = [], []
+
+            # lay the sequence out left to right, strand by strand
+            laidList = []
+            offset = 0
             for strand in olg.strand5p().generator3pStrand():
-                usedSeq, oS = strand.setSequence(oS)
+                coord = strand.virtualHelix().coord()
+                if coord not in expandedIdxs:
+                    expandedIdxs[coord] = part.insertions()[coord].expandedIdx
+                    helixBuffers[coord] = {}
+                expIdx = expandedIdxs[coord]
+                lo, hi = strand.idxs()
+                start, end = expIdx(lo), expIdx(hi + 1)
+                length = end - start
+                if nS == None:
+                    usedSeq = None
+                    laid = ' ' * length
+                else:
+                    usedSeq = nS[offset:offset + length]
+                    if len(usedSeq) < length:
+                        usedSeq += ' ' * (length - len(usedSeq))
+                    offset += length
+                    laid = usedSeq if strand._isDrawn5to3 else usedSeq[::-1]
+                oldStates.append((strand, strand._sequence))
+                newStates.append((strand, usedSeq))
+                laidList.append(laid)
+                helixRanges.append((strand, coord, start))
+            # end for
+            # and complement it onto the helix buffers in one go
+            for (strand, coord, start), laid in \
+                            zip(helixRanges, sequencetools.compList(laidList)):
+                helixBuffers[coord][start] = laid
 
-                # get the compliment ahead of time
-                usedSeq = util.comp(usedSeq) if usedSeq else None
+            # fill in each overlapping complement strand from the buffers
+            oligoList = [olg]
+            seenOligos = set([olg])
+            compEdits = {}
+            compOrder = []
+            for strand, coord, start in helixRanges:
                 compSS = strand.strandSet().complementStrandSet()
                 for compStrand in compSS._findOverlappingRanges(strand):
-                    subUsedSeq = compStrand.setComplementSequence(usedSeq, strand)
-                    oligoList.append(compStrand.oligo())
+                    if compStrand not in compEdits:
+                        compEdits[compStrand] = []
+                        compOrder.append((compStrand, coord))
+                    compEdits[compStrand].append(strand)
                 # end for
-            # for
+            # end for
+            for compStrand, coord in compOrder:
+                expIdx = expandedIdxs[coord]
+                buf = helixBuffers[coord]
+                cLo, cHi = compStrand.idxs()
+                cStart = expIdx(cLo)
+                cLength = expIdx(cHi + 1) - cStart
+                seq = compStrand._sequence
+                if seq == None:
+                    temp = array('c', ' ' * cLength)
+                else:
+                    temp = array('c', seq if compStrand._isDrawn5to3 \
+                                                        else seq[::-1])
+                for strand in compEdits[compStrand]:
+                    sLo, sHi = strand.idxs()
+                    lowIdx, highIdx = util.overlap(sLo, sHi, cLo, cHi)
+                    sStart = expIdx(sLo)
+                    start, end = expIdx(lowIdx), expIdx(highIdx + 1)
+                    temp[start - cStart:end - cStart] = \
+                        array('c', buf[sStart][start - sStart:end - sStart])
+                # end for
+                seq = temp.tostring()
+                if not compStrand._isDrawn5to3:
+                    seq = seq[::-1]
+                if not seq.strip():
+                    seq = None
+                oldStates.append((compStrand, compStrand._sequence))
+                newStates.append((compStrand, seq))
+                compOligo = compStrand.oligo()
+                if compOligo not in seenOligos:
+                    seenOligos.add(compOligo)
+                    oligoList.append(compOligo)
+            # end for
 
-            for oligo in oligoList:
-                oligo.oligoSequenceAddedSignal.emit(oligo)
+            self._oldStates = oldStates
+            self._newStates = newStates
+            self._oligoList = oligoList
+            self._setStates(newStates)
         # end def
     # end class
     class ApplyColorCommand(QUndoCommand):
@@ -418,7 +544,7 @@ class Oligo(QObject):
                 strandSet._doc.removeStrandFromSelection(strand)
                 isInSet, overlap, sSetIdx = strandSet._findIndexOfRangeFor(strand)
                 sIList.append(sSetIdx)
-                strandSet._strandList.pop(sSetIdx)
+                strandSet._popFromStrandList(sSetIdx)
                 # Emit a signal to notify on completion
                 strand.strandRemovedSignal.emit(strand)
                 # for updating the Slice View displayed helices
@@ -441,7 +567,7 @@ class Oligo(QObject):
             for strand in s3p.generator5pStrand():
                 strandSet = strand.strandSet()
                 sSetIdx = sIList.pop(-1)
-                strandSet._strandList.insert(sSetIdx, strand)
+                strandSet._addToStrandList(strand, sSetIdx)
                 # Emit a signal to notify on completion
                 strandSet.strandsetStrandAddedSignal.emit(strandSet, strand)
                 # for updating the Slice View displayed helices
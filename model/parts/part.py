@@ -29,13 +29,22 @@ from exceptions import KeyError
 from heapq import heapify, heappush, heappop
 from itertools import product, izip, islice
 from collections import defaultdict
+from operator import itemgetter
+import csv
 import random
+from cStringIO import StringIO
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 from model.enum import StrandType
 from model.virtualhelix import VirtualHelix
 from model.strand import Strand
 from model.oligo import Oligo
 from model.strandset import StrandSet
+from model.decorators.insertion import InsertionIndex
 from views import styles
 
 import util
@@ -79,7 +88,7 @@ class Part(QObject):
         self._document = kwargs.get('document', None)
         super(Part, self).__init__(parent=self._document)
         # Data structure
-        self._insertions = defaultdict(dict)  # dict of insertions per virtualhelix
+        self._insertions = defaultdict(InsertionIndex)  # insertions per virtualhelix
         self._oligos = set()
         self._coordToVirtualHelix = {}
         self._numberToVirtualHelix = {}
@@ -94,6 +103,11 @@ class Part(QObject):
         self._highestUsedOdd = -1  # Used in _reserveHelixIDNumber
         self._highestUsedEven = -2  # same
         self._importedVHelixOrder = None
+        # Crossover lookup tables, see potentialCrossoverList
+        self._xoverLUT = {}  # virtualHelix: (neighbors, candidate list)
+        self._potentialXoverCache = {}  # virtualHelix: unoccupied candidates
+        # see deferOligoUpdates
+        self._oligoUpdatesDeferred = False
         # Runtime state
         self._activeBaseIndex = self._step
         self._activeVirtualHelix = None
@@ -192,12 +206,40 @@ class Part(QObject):
     # end def
 
     def getStapleSequences(self):
-        """getStapleSequences"""
-        s = "Start,End,Sequence,Length,Color\n"
+        """Returns the staple CSV, as written by writeStapleSequences."""
+        f = StringIO()
+        self.writeStapleSequences(f)
+        return f.getvalue()
+    # end def
+
+    def stapleSequenceRows(self, skipLoops=False):
+        """
+        Yields the sequenceExportRow of every staple oligo, ordered by the
+        helix number and then the idx of its 5' end. Circular staples,
+        which have no row, raise unless skipLoops is True.
+        """
+        staples = []
         for oligo in self._oligos:
-            if oligo.strand5p().strandSet().isStaple():
-                s = s + oligo.sequenceExport()
-        return s
+            if skipLoops and oligo.isLoop():
+                continue
+            strand5p = oligo.strand5p()
+            if strand5p.strandSet().isStaple():
+                staples.append((strand5p.virtualHelix().number(),
+                                strand5p.idx5Prime(), oligo))
+        staples.sort(key=itemgetter(0, 1))
+        for vhNum, idx, oligo in staples:
+            yield oligo.sequenceExportRow()
+    # end def
+
+    def writeStapleSequences(self, f, skipLoops=False):
+        """
+        Writes the staple CSV to the file object f, one row at a time. See
+        stapleSequenceRows for skipLoops.
+        """
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(("Start", "End", "Sequence", "Length", "Color"))
+        writer.writerows(self.stapleSequenceRows(skipLoops))
+    # end def
 
     def getVirtualHelices(self):
         """yield an iterator to the virtualHelix references in the part"""
@@ -281,133 +323,163 @@ class Part(QObject):
     ### PUBLIC METHODS FOR EDITING THE MODEL ###
     def autoStaple(part):
         """Autostaple does the following:
-        1. Clear existing staple strands by iterating over each strand
-        and calling RemoveStrandCommand on each. The next strand to remove
-        is always at index 0.
-        2. Create temporary strands that span regions where scaffold is present.
-        3. Determine where actual strands will go based on strand overlap with
-        prexovers.
-        4. Delete temporary strands and create new strands.
-        """
-        epDict = {}  # keyed on StrandSet
+        1. Clear existing staple oligos.
+        2. Compute the final staple segmentation for the whole part in one
+        pass over the scaffold occupancy (see _autoStapleSegments) and
+        create those strands directly.
+        3. Install staple xovers wherever a pair of strand ends lines up
+        with a prexover.
+        4. Assign oligos in a single pass (see deferOligoUpdates).
+        Everything is recorded as one "Auto-Staple" undo macro.
+        """
+        util.beginSuperMacro(part, desc="Auto-Staple")
+        try:
+            part._autoStaple()
+        finally:
+            util.endSuperMacro(part)
+    # end def
+
+    def _autoStaple(part):
+        """The body of autoStaple, run inside its macro."""
         cmds = []
 
         # clear existing staple strands
-        # part.verifyOligos()
-
         for o in list(part.oligos()):
             if not o.isStaple():
                 continue
             c = Oligo.RemoveOligoCommand(o)
             cmds.append(c)
         # end for
-        util.execCommandList(part, cmds, desc="Clear staples")
-        cmds = []
 
-        # create strands that span all bases where scaffold is present
-        for vh in part.getVirtualHelices():
-            segments = []
-            scafSS = vh.scaffoldStrandSet()
-            for strand in scafSS:
-                lo, hi = strand.idxs()
-                if len(segments) == 0:
-                    segments.append([lo, hi])  # insert 1st strand
-                elif segments[-1][1] == lo - 1:
-                    segments[-1][1] = hi  # extend
-                else:
-                    segments.append([lo, hi])  # insert another strand
-            stapSS = vh.stapleStrandSet()
-            epDict[stapSS] = []
-            for i in range(len(segments)):
-                lo, hi = segments[i]
-                epDict[stapSS].extend(segments[i])
-                c = StrandSet.CreateStrandCommand(stapSS, lo, hi, i)
+        # create the final staple strands, no temporary strands needed
+        for stapSS, segments in part._autoStapleSegments():
+            for ssIdx, (lo, hi) in enumerate(segments):
+                c = StrandSet.CreateStrandCommand(stapSS, lo, hi, ssIdx)
                 cmds.append(c)
-        util.execCommandList(part, cmds, desc="Add tmp strands", useUndoStack=False)
+        util.execCommandList(part, cmds, desc="Create strands")
         cmds = []
 
-        # determine where xovers should be installed
-        for vh in part.getVirtualHelices():
-            stapSS = vh.stapleStrandSet()
-            scafSS = vh.scaffoldStrandSet()
-            is5to3 = stapSS.isDrawn5to3()
-            potentialXovers = part.potentialCrossoverList(vh)
-            for neighborVh, idx, strandType, isLowIdx in potentialXovers:
-                if strandType != StrandType.Staple:
-                    continue
-                if isLowIdx and is5to3:
-                    strand = stapSS.getStrand(idx)
-                    neighborSS = neighborVh.stapleStrandSet()
-                    nStrand = neighborSS.getStrand(idx)
-                    if strand == None or nStrand == None:
-                        continue
-                    # check for bases on both strands at [idx-1:idx+3]
-                    if not (strand.lowIdx() < idx and strand.highIdx() > idx + 1):
-                        continue
-                    if not (nStrand.lowIdx() < idx and nStrand.highIdx() > idx + 1):
+        # create crossovers wherever possible (from strand5p only)
+        undoStack = part.undoStack()
+        part.deferOligoUpdates()
+        try:
+            for vh in part.getVirtualHelices():
+                stapSS = vh.stapleStrandSet()
+                is5to3 = stapSS.isDrawn5to3()
+                potentialXovers = part.potentialCrossoverList(vh)
+                for neighborVh, idx, strandType, isLowIdx in potentialXovers:
+                    if strandType != StrandType.Staple:
                         continue
-
-                    # check for nearby scaffold xovers
-                    scafStrandL = scafSS.getStrand(idx-4)
-                    scafStrandH = scafSS.getStrand(idx+5)
-                    if scafStrandL:
-                        if scafStrandL.hasXoverAt(idx-4):
-                            continue
-                    if scafStrandH:
-                        if scafStrandH.hasXoverAt(idx+5):
+                    if (isLowIdx and is5to3) or (not isLowIdx and not is5to3):
+                        strand = stapSS.getStrand(idx)
+                        neighborSS = neighborVh.stapleStrandSet()
+                        nStrand = neighborSS.getStrand(idx)
+                        if strand == None or nStrand == None:
                             continue
-                    # Finally, add the xovers to install
-                    epDict[stapSS].extend([idx, idx+1])
-                    epDict[neighborSS].extend([idx, idx+1])
-
-        # clear temporary staple strands
-        for vh in part.getVirtualHelices():
-            stapSS = vh.stapleStrandSet()
-            for strand in stapSS:
-                c = StrandSet.RemoveStrandCommand(stapSS, strand, 0)
-                cmds.append(c)
-        util.execCommandList(part, cmds, desc="Rm tmp strands", useUndoStack=False)
-        cmds = []
+                        if idx in strand.idxs() and idx in nStrand.idxs():
+                            # only install xovers on pre-split strands
+                            if strand.idx3Prime() == idx and \
+                                                    nStrand.idx5Prime() == idx:
+                                c = Part.CreateXoverCommand(part, strand, idx,
+                                                nStrand, idx, updateOligo=False)
+                                undoStack.push(c)
+                            else:  # ends need splitting first
+                                part.createXover(strand, idx, nStrand, idx)
+        finally:
+            part.endDeferredOligoUpdates([vh.stapleStrandSet() \
+                                            for vh in part.getVirtualHelices()])
+    # end def
 
-        util.beginSuperMacro(part, desc="Auto-Staple")
+    def _autoStapleSegments(self):
+        """
+        Returns a list of (stapleStrandSet, [(lo, hi), ...]) describing the
+        staple strands created by autoStaple, in StrandSet order.
 
-        for stapSS, epList in epDict.iteritems():
-            assert (len(epList) % 2 == 0)
-            epList = sorted(epList)
-            ssIdx = 0
-            for i in range(0, len(epList),2):
-                lo, hi = epList[i:i+2]
-                c = StrandSet.CreateStrandCommand(stapSS, lo, hi, ssIdx)
-                cmds.append(c)
-                ssIdx += 1
-        util.execCommandList(part, cmds, desc="Create strands")
-        cmds = []
+        Staples cover every base where scaffold is present, and are broken
+        at each staple prexover (idx, idx+1) where both helices have
+        staple on [idx-1, idx+2] and the scaffold has no xover at idx-4 or
+        idx+5.
 
-        # create crossovers wherever possible (from strand5p only)
-        for vh in part.getVirtualHelices():
-            stapSS = vh.stapleStrandSet()
-            is5to3 = stapSS.isDrawn5to3()
-            potentialXovers = part.potentialCrossoverList(vh)
-            for neighborVh, idx, strandType, isLowIdx in potentialXovers:
-                if strandType != StrandType.Staple:
-                    continue
-                if (isLowIdx and is5to3) or (not isLowIdx and not is5to3):
-                    strand = stapSS.getStrand(idx)
-                    neighborSS = neighborVh.stapleStrandSet()
-                    nStrand = neighborSS.getStrand(idx)
-                    if strand == None or nStrand == None:
-                        continue
-                    if idx in strand.idxs() and idx in nStrand.idxs():
-                        # only install xovers on pre-split strands
-                        part.createXover(strand, idx, nStrand, idx, updateOligo=False)
+        Occupancy is computed with NumPy arrays (one row per virtualHelix)
+        when NumPy is available; otherwise the same arrays are scanned in
+        Python.
+        """
+        vhs = self.getVirtualHelices()
+        vhRow = dict((vh, i) for i, vh in enumerate(vhs))
+        pad = 5  # room for the idx-4 .. idx+5 probes around a site
+        width = self.maxBaseIdx() + 1 + 2 * pad
+
+        # scaffold occupancy and scaffold xover endpoints, offset by pad
+        if np != None:
+            covered = np.zeros((len(vhs), width), dtype=np.int8)
+            scafXover = np.zeros((len(vhs), width), dtype=np.int8)
+        else:
+            covered = [bytearray(width) for vh in vhs]
+            scafXover = [bytearray(width) for vh in vhs]
+        for vh, i in vhRow.iteritems():
+            cRow, xRow = covered[i], scafXover[i]
+            for strand in vh.scaffoldStrandSet():
+                lo, hi = strand.idxs()
+                if np != None:
+                    cRow[lo + pad:hi + pad + 1] = 1
+                else:
+                    cRow[lo + pad:hi + pad + 1] = '\x01' * (hi - lo + 1)
+                # as in Strand.hasXoverAt, the high end wins for 1 base strands
+                if strand.connectionHigh() != None:
+                    xRow[hi + pad] = 1
+                if lo != hi and strand.connectionLow() != None:
+                    xRow[lo + pad] = 1
+        # end for
 
-        c = Part.RefreshOligosCommand(part)
-        cmds.append(c)
-        util.execCommandList(part, cmds, desc="Assign oligos")
+        # candidate sites, seen from the helix whose staple is drawn 5' to 3'
+        sites = []  # (vhRow, neighborRow, idx)
+        for vh, i in vhRow.iteritems():
+            if not vh.stapleStrandSet().isDrawn5to3():
+                continue
+            for baseIdx, neighbor, idx, st, isLowIdx in self._xoverLUTFor(vh)[1]:
+                if st == StrandType.Staple and isLowIdx:
+                    sites.append((i, vhRow[neighbor], idx))
+        # end for
 
-        cmds = []
-        util.endSuperMacro(part)
+        if sites and np != None:
+            siteArray = np.array(sites, dtype=np.intp)
+            v, n = siteArray[:, 0], siteArray[:, 1]
+            idx = siteArray[:, 2] + pad
+            ok = (scafXover[v, idx - 4] == 0) & (scafXover[v, idx + 5] == 0)
+            for d in (-1, 0, 1, 2):
+                ok &= (covered[v, idx + d] == 1) & (covered[n, idx + d] == 1)
+            sites = [sites[k] for k in np.flatnonzero(ok)]
+        elif sites:
+            def siteOk(site):
+                v, n, idx = site
+                idx += pad
+                return not (scafXover[v][idx - 4] or scafXover[v][idx + 5]) \
+                    and all(covered[v][idx + d] and covered[n][idx + d] \
+                                                    for d in (-1, 0, 1, 2))
+            sites = filter(siteOk, sites)
+        # end if
 
+        breaks = defaultdict(list)
+        for v, n, idx in sites:
+            breaks[v].extend((idx, idx + 1))
+            breaks[n].extend((idx, idx + 1))
+
+        ret = []
+        for vh, i in sorted(vhRow.iteritems(), key=itemgetter(1)):
+            # segment endpoints are the rising and falling edges of the row
+            row = covered[i]
+            if np != None:
+                edges = np.flatnonzero(np.diff(row)).tolist()
+            else:
+                edges = [k for k in xrange(width - 1) if row[k] != row[k + 1]]
+            epList = []
+            for k in xrange(0, len(edges), 2):
+                epList.extend((edges[k] + 1 - pad, edges[k + 1] - pad))
+            epList.extend(breaks[i])
+            epList.sort()
+            ret.append((vh.stapleStrandSet(),
+                        [tuple(epList[k:k + 2]) for k in xrange(0, len(epList), 2)]))
+        return ret
     # end def
 
     def verifyOligoStrandCounts(self):
@@ -530,6 +602,8 @@ class Part(QObject):
         # prexoveritem needs to store left or right, and determine
         # locally whether it is from or to
         # pass that info in here in and then do the breaks
+        if self._oligoUpdatesDeferred:
+            updateOligo = False
         ss5p = strand5p.strandSet()
         ss3p = strand3p.strandSet()
         if ss5p.strandType() != ss3p.strandType():
@@ -678,6 +752,39 @@ class Part(QObject):
 
     # end def
 
+    def deferOligoUpdates(self):
+        """
+        Until endDeferredOligoUpdates is called, xovers are created without
+        updating oligos, which otherwise walks every strand downstream of
+        each new xover. Call endDeferredOligoUpdates in a finally clause, so
+        that an exception can't leave the part in this mode.
+        """
+        self._oligoUpdatesDeferred = True
+    # end def
+
+    def endDeferredOligoUpdates(self, strandSets=None, useUndoStack=True):
+        """
+        Ends the mode set by deferOligoUpdates and reassigns the oligos of
+        strandSets (default all) in one pass with rebuildOligos.
+        """
+        self._oligoUpdatesDeferred = False
+        self.rebuildOligos(strandSets, useUndoStack=useUndoStack)
+    # end def
+
+    def rebuildOligos(self, strandSets=None, xoverOrder=None, useUndoStack=True):
+        """
+        Walks every 5'->3' chain of strands in strandSets (default all) once,
+        and gives each chain one oligo with its length and loop flag. See
+        RebuildOligosCommand.
+        """
+        if strandSets == None:
+            strandSets = [ss for vh in self.getVirtualHelices() \
+                                    for ss in vh.getStrandSets()]
+        c = Part.RebuildOligosCommand(self, strandSets, xoverOrder)
+        util.execCommandList(self, [c], desc="Rebuild oligos", \
+                                                    useUndoStack=useUndoStack)
+    # end def
+
     def removeXover(self, strand5p, strand3p, useUndoStack=True):
         cmds = []
         if strand5p.connection3p() == strand3p:
@@ -911,6 +1018,7 @@ class Part(QObject):
         of virtualHelix references
         """
         self._coordToVirtualHelix[virtualHelix.coord()] = virtualHelix
+        self._invalidateXoverLUT(virtualHelix)
     # end def
 
     def _removeVirtualHelix(self, virtualHelix):
@@ -918,9 +1026,47 @@ class Part(QObject):
         private method for adding a virtualHelix to the Parts data structure
         of virtualHelix references
         """
+        self._invalidateXoverLUT(virtualHelix)
         del self._coordToVirtualHelix[virtualHelix.coord()]
     # end def
 
+    def _invalidateXoverLUT(self, virtualHelix):
+        """
+        Drops the crossover lookup tables of virtualHelix and its neighbors,
+        which must be rebuilt when a neighboring helix comes or goes.
+        """
+        lut = self._xoverLUT
+        cache = self._potentialXoverCache
+        for vh in [virtualHelix] + self.getVirtualHelixNeighbors(virtualHelix):
+            lut.pop(vh, None)
+            cache.pop(vh, None)
+    # end def
+
+    def _invalidateXoverCache(self, virtualHelix):
+        """
+        Called when strands or xovers of virtualHelix change. The unoccupied
+        crossover candidates of virtualHelix and its neighbors are stale.
+        """
+        cache = self._potentialXoverCache
+        if not cache:
+            return
+        cache.pop(virtualHelix, None)
+        entry = self._xoverLUT.get(virtualHelix)
+        if entry == None:
+            neighbors = self.getVirtualHelixNeighbors(virtualHelix)
+        else:
+            neighbors = entry[0]
+        for neighbor in neighbors:
+            if neighbor:
+                cache.pop(neighbor, None)
+    # end def
+
+    def _clearXoverLUT(self):
+        """Drops all crossover lookup tables, e.g. on a dimension change."""
+        self._xoverLUT = {}
+        self._potentialXoverCache = {}
+    # end def
+
     def _reserveHelixIDNumber(self, parityEven=True, requestedIDnum=None):
         """
         Reserves and returns a unique numerical label appropriate for a
@@ -1096,9 +1242,50 @@ class Part(QObject):
         strandType is from the enum (StrandType.Scaffold, StrandType.Staple)
         isLowIdx is whether or not it's the at the low index (left in the Path
         view) of a potential Xover site
+
+        If idx is given, only sites within a few lattice steps of idx are
+        returned.
+
+        The list is served from a per-virtualHelix cache that is invalidated
+        by _invalidateXoverCache whenever strands or xovers on the helix or
+        one of its neighbors change.
         """
         vh = virtualHelix
-        ret = []  # LUT = Look Up Table
+        cache = self._potentialXoverCache
+        candidates = cache.get(vh)
+        if candidates == None:
+            neighbors, geometric = self._xoverLUTFor(vh)
+            candidates = []
+            fromStrandSets = vh.getStrandSets()  # indexed by StrandType
+            for cand in geometric:
+                i, neighbor, index, st, isLowIdx = cand
+                toStrandSets = neighbor.getStrandSets()
+                if fromStrandSets[st].hasNoStrandAtOrNoXover(index) and \
+                        toStrandSets[st].hasNoStrandAtOrNoXover(index):
+                    candidates.append(cand)
+            # end for
+            cache[vh] = candidates
+        # end if
+
+        if idx != None:
+            step = self._step
+            lo, hi = idx - 3 * step, idx + 2 * step
+            return [cand[1:] for cand in candidates if lo <= cand[0] <= hi]
+        return [cand[1:] for cand in candidates]
+    # end def
+
+    def _xoverLUTFor(self, virtualHelix):
+        """
+        Returns (neighbors, candidates) for virtualHelix, where candidates
+        is a list of tuples
+            (baseIdx, neighborVirtualHelix, index, strandType, isLowIdx)
+        of all crossover sites allowed by the lattice, regardless of strand
+        occupancy. baseIdx is the start of the lattice step the site is in.
+        """
+        vh = virtualHelix
+        entry = self._xoverLUT.get(vh)
+        if entry != None:
+            return entry
         part = self
         # these are the list of crossover points simplified
         # they depend on whether the strandType is scaffold or staple
@@ -1120,14 +1307,8 @@ class Part(QObject):
         # incrementing by the lattice step size.
         baseRange = range(0, numBases, part._step)
 
-        if idx != None:
-            baseRange = filter(lambda x: x >= idx - 3 * part._step and \
-                                        x <= idx + 2 * part._step, baseRange)
-
-        fromStrandSets = vh.getStrandSets()
         neighbors = self.getVirtualHelixNeighbors(vh)
-
-        # print neighbors, lutsNeighbor
+        ret = []
         for neighbor, lut in izip(neighbors, lutsNeighbor):
             if not neighbor:
                 continue
@@ -1139,23 +1320,20 @@ class Part(QObject):
             lutStap = lut[2:4]
             lut = (lutScaf, lutStap)
 
-            toStrandSets = neighbor.getStrandSets()
-            for fromSS, toSS, pts, st in izip(fromStrandSets, toStrandSets, lut, sTs):
+            for pts, st in izip(lut, sTs):
                 # test each period of each lattice for each StrandType
                 for pt, isLowIdx in izip(pts, (True, False)):
                     for i, j in product(baseRange, pt):
                         index = i + j
                         if index < numBases:
-                            if fromSS.hasNoStrandAtOrNoXover(index) and \
-                                    toSS.hasNoStrandAtOrNoXover(index):
-                                ret.append((neighbor, index, st, isLowIdx))
-                            # end if
-                        # end if
+                            ret.append((i, neighbor, index, st, isLowIdx))
                     # end for
                 # end for
             # end for
         # end for
-        return ret
+        entry = (neighbors, ret)
+        self._xoverLUT[vh] = entry
+        return entry
     # end def
 
     def possibleXoverAt(self, fromVirtualHelix, toVirtualHelix, strandType, idx):
@@ -1165,6 +1343,10 @@ class Part(QObject):
                 toSS.hasStrandAtAndNoXover(idx)
     # end def
 
+    def importedVHelixOrder(self):
+        """The coords of the virtual helices in the order of the imported file."""
+        return self._importedVHelixOrder
+
     def setImportedVHelixOrder(self, orderedCoordList):
         """Used on file import to store the order of the virtual helices."""
         self._importedVHelixOrder = orderedCoordList
@@ -1321,71 +1503,139 @@ class Part(QObject):
         # end def
     # end class
 
-    class RefreshOligosCommand(QUndoCommand):
+    class RebuildOligosCommand(QUndoCommand):
         """
-        RefreshOligosCommand is a post-processing step for AutoStaple.
+        RebuildOligosCommand reassigns oligos after strands and xovers were
+        installed with oligo updates deferred (see deferOligoUpdates).
 
         Normally when an xover is created, all strands in the 3' direction are
         assigned the oligo of the 5' strand. This becomes very expensive
-        during autoStaple, because the Nth xover requires updating up to N-1
-        strands.
-
-        Hence, we disable oligo assignment during the xover creation step,
-        and then do it all in one pass at the end with this command.
+        when many xovers are made at once (autoStaple, file import), because
+        the Nth xover requires updating up to N-1 strands.
+
+        Instead each chain is walked once from its 5' strand, and keeps the
+        oligo of that strand if no other chain claimed it first. Chains
+        without one get a new oligo with the default color. Oligos left
+        without strands are removed from the part. Loops start at the 3'
+        strand of their last xover in xoverOrder (strand3p: rank), if
+        given.
+
+        Chains may cross into other strandsets than the ones passed in, so
+        the strandsets of every walked strand are the ones saved for undo.
         """
-        def __init__(self, part):
-            super(Part.RefreshOligosCommand, self).__init__()
+        def __init__(self, part, strandSets, xoverOrder=None):
+            super(Part.RebuildOligosCommand, self).__init__()
             self._part = part
+            self._strandSets = list(strandSets)
+            self._xoverOrder = xoverOrder if xoverOrder else {}
+            self._newOligos = []  # created on the first redo, then reused
         # end def
 
-        def redo(self):
-            visited = {}
-            for vh in self._part.getVirtualHelices():
-                stapSS = vh.stapleStrandSet()
-                for strand in stapSS:
-                    visited[strand] = False
+        def _walkedStrandSets(self):
+            """
+            Returns the strandsets passed in, followed by any others reached
+            through the xovers of their strands.
+            """
+            strandSets = list(self._strandSets)
+            known = set(strandSets)
+            i = 0
+            while i < len(strandSets):
+                for strand in strandSets[i]:
+                    for neighbor in (strand.connection5p(), strand.connection3p()):
+                        if neighbor != None and neighbor.strandSet() not in known:
+                            known.add(neighbor.strandSet())
+                            strandSets.append(neighbor.strandSet())
+                i += 1
+            return strandSets
+        # end def
 
-            for strand in list(visited.keys()):
-                if visited[strand]:
+        def redo(self):
+            part = self._part
+            xoverOrder = self._xoverOrder
+            partOligos = part.oligos()
+            self._strandSets = self._walkedStrandSets()
+            strands = [strand for ss in self._strandSets for strand in ss]
+            # save the current assignment for undo
+            self._oldStrandOligos = [strand.oligo() for strand in strands]
+            oldOligos = set(self._oldStrandOligos)
+            oldOligos.discard(None)
+            self._oldOligoStates = [(olg, olg.strand5p(), olg.length(),
+                                     olg.isLoop(), olg in partOligos) \
+                                                        for olg in oldOligos]
+            claimed = set()
+            numNew = 0
+            visited = set()
+            for strand in strands:
+                if strand in visited:
                     continue
-                visited[strand] = True
-                startOligo = strand.oligo()
-                strand5gen = strand.generator5pStrand()
-                # this gets the oligo and burns a strand in the generator
-                strand5 = strand5gen.next()
-                for strand5 in strand5gen:
-                    oligo5 = strand5.oligo()
-                    if oligo5 != startOligo:
-                        oligo5.removeFromPart()
-                        Strand.setOligo(strand5, startOligo)  # emits strandHasNewOligoSignal
-                    visited[strand5] = True
-                # end for
-                startOligo.setStrand5p(strand5)
-                # is it a loop?
-                if strand.connection3p() == strand5:
-                    startOligo.setLoop(True)
-                else:
-                    strand3gen = strand.generator3pStrand()
-                    strand3 = strand3gen.next()   # burn one
-                    for strand3 in strand3gen:
-                        oligo3 = strand3.oligo()
-                        if oligo3 != startOligo:
-                            oligo3.removeFromPart()
-                            Strand.setOligo(strand3, startOligo)  # emits strandHasNewOligoSignal
-                        visited[strand3] = True
-                    # end for
-                startOligo.refreshLength()
+                # find the 5' end
+                strand5p = strand
+                for strand5p in strand.generator5pStrand():
+                    pass
+                isLoop = strand5p.connection5p() != None
+                if isLoop:
+                    loop = list(strand.generator3pStrand())
+                    if xoverOrder:
+                        strand5p = max(loop, key=lambda s: xoverOrder.get(s, -1))
+                    else:  # prefer the strand its oligo already starts at
+                        strand5p = strand
+                        for s in loop:
+                            if s.oligo() != None and s.oligo().strand5p() == s:
+                                strand5p = s
+                                break
+                olg = strand5p.oligo()
+                if olg == None or olg in claimed:
+                    if numNew < len(self._newOligos):
+                        newOlg = self._newOligos[numNew]
+                    else:
+                        if olg != None:
+                            color = olg.color()
+                        elif strand5p.isStaple():
+                            color = styles.DEFAULT_STAP_COLOR
+                        else:
+                            color = styles.DEFAULT_SCAF_COLOR
+                        newOlg = Oligo(None, color)
+                        self._newOligos.append(newOlg)
+                    numNew += 1
+                    olg = newOlg
+                if olg not in partOligos:
+                    olg.addToPart(part)
+                claimed.add(olg)
+                olg.setStrand5p(strand5p)
+                olg.setLoop(isLoop)
+                length = 0
+                for s in strand5p.generator3pStrand():
+                    visited.add(s)
+                    if s.oligo() != olg:
+                        s.setOligo(olg)  # emits strandHasNewOligoSignal
+                    length += s.totalLength()
+                olg.setLength(length)
             # end for
-
-            oligoSet = set()
-            for strand in visited.keys():
-                oligoSet.add(strand.oligo())
+            for olg in oldOligos - claimed:
+                if olg in partOligos:
+                    olg.removeFromPart()
+            for strand in strands:
                 strand.strandUpdateSignal.emit(strand)
         # end def
 
         def undo(self):
-            """Doesn't reassign """
-            pass
+            part = self._part
+            partOligos = part.oligos()
+            for olg in self._newOligos:
+                if olg in partOligos:
+                    olg.removeFromPart()
+            for olg, strand5p, length, isLoop, wasInPart in self._oldOligoStates:
+                olg.setStrand5p(strand5p)
+                olg.setLength(length)
+                olg.setLoop(isLoop)
+                if wasInPart and olg not in partOligos:
+                    olg.addToPart(part)
+            strands = [strand for ss in self._strandSets for strand in ss]
+            for strand, olg in izip(strands, self._oldStrandOligos):
+                if strand.oligo() != olg:
+                    strand.setOligo(olg)  # emits strandHasNewOligoSignal
+            for strand in strands:
+                strand.strandUpdateSignal.emit(strand)
         # end def
     # end class
 
@@ -1561,7 +1811,7 @@ class Part(QObject):
                 for strand in sList:
                     sSet.removeStrand(strand)
                 # end for
-                sSet._strandList = []
+                sSet._setStrandList([])
             #end for
             for vh in self._vhs:
                 # for updating the Slice View displayed helices
@@ -1579,7 +1829,7 @@ class Part(QObject):
                 for strand in sList:
                     sSet.strandsetStrandAddedSignal.emit(sSet, strand)
                 # end for
-                sSet._strandList = sList
+                sSet._setStrandList(sList)
             #end for
             for vh in self._vhs:
                 # for updating the Slice View displayed helices
@@ -1609,6 +1859,7 @@ class Part(QObject):
             part = self._part
             part._minBase += self._minDelta
             part._maxBase += self._maxDelta
+            part._clearXoverLUT()
             if self._minDelta != 0:
                 self.deltaMinDimension(part, self._minDelta)
             for vh in part._coordToVirtualHelix.itervalues():
@@ -1622,6 +1873,7 @@ class Part(QObject):
             part = self._part
             part._minBase -= self._minDelta
             part._maxBase -= self._maxDelta
+            part._clearXoverLUT()
             if self._minDelta != 0:
                 self.deltaMinDimension(part, self._minDelta)
             for vh in part._coordToVirtualHelix.itervalues():
@@ -1637,16 +1889,15 @@ class Part(QObject):
             strands
             insertions
             """
-            for vhDict in part._insertions.itervalues():
-                for insertion in vhDict:
-                    insertion.updateIdx(minDimensionDelta)
-                # end for
+            for vhInsertions in part._insertions.itervalues():
+                vhInsertions.shiftIdxs(minDimensionDelta)
             # end for
             for vh in part._coordToVirtualHelix.itervalues():
-                for strand in vh.scaffoldStrand().generatorStrand():
-                    strand.updateIdxs(minDimensionDelta)
-                for strand in vh.stapleStrand().generatorStrand():
-                    strand.updateIdxs(minDimensionDelta)
+                for sSet in vh.getStrandSets():
+                    for strand in sSet.generatorStrand():
+                        strand.updateIdxs(minDimensionDelta)
+                    # a uniform shift keeps the order, just rebuild the index
+                    sSet._setStrandList(sSet._strandList)
             # end for
         # end def
     # end class
@@ -0,0 +1,170 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+"""
+sequencetools.py
+
+Sequence helpers for the inner loops of sequence application and export.
+Everything is done with str.translate tables, so each call is a single
+pass in C over the string. The *List variants take a list of strand
+sequences, where None stands for a strand without a sequence, and return
+a list of the same length.
+"""
+import string
+
+DNA_BASES = 'ACGT'
+# IUPAC nucleotide codes, including U and the gap '-'
+IUPAC_BASES = 'ACGTURYSWKMBDHVN-'
+
+_COMPLEMENT = string.maketrans('ACGTacgt', 'TGCATGCA')
+_WHITE_TO_Q = string.maketrans(' ', '?')
+_ALL_CHARS = string.maketrans('', '')
+_NOT_DNA = _ALL_CHARS.translate(None, DNA_BASES + DNA_BASES.lower())
+_NOT_LETTERS = _ALL_CHARS.translate(None, string.letters)
+_UPPER = string.maketrans(string.ascii_lowercase, string.ascii_uppercase)
+
+
+def _asStr(seqStr):
+    """Returns seqStr as a byte string, dropping any non-ascii chars."""
+    if isinstance(seqStr, unicode):
+        return seqStr.encode('ascii', 'ignore')
+    return str(seqStr)
+# end def
+
+
+def comp(seqStr):
+    """Returns the complement of the sequence in seqStr."""
+    return seqStr.translate(_COMPLEMENT)
+# end def
+
+
+def rcomp(seqStr):
+    """Returns the reverse complement of the sequence in seqStr."""
+    return seqStr.translate(_COMPLEMENT)[::-1]
+# end def
+
+
+def markwhite(seqStr):
+    """Replaces the blanks of unfilled bases in seqStr with '?'."""
+    return seqStr.translate(_WHITE_TO_Q)
+# end def
+
+
+def strToDna(seqStr):
+    """Returns str having been reduced to capital ACTG."""
+    return _asStr(seqStr).translate(_UPPER, _NOT_DNA)
+# end def
+
+
+def nowhite(seqStr):
+    """Gets rid of whitespace in a string."""
+    return _asStr(seqStr).translate(None, _NOT_LETTERS)
+# end def
+
+
+def invalidChars(seqStr, alphabet=IUPAC_BASES):
+    """
+    Returns the chars of seqStr, upper case, that are not in alphabet,
+    which defaults to the IUPAC nucleotide codes.
+    """
+    return _asStr(seqStr).translate(_UPPER).translate(None, alphabet)
+# end def
+
+
+def isValidSequence(seqStr, alphabet=IUPAC_BASES):
+    """
+    Returns True if every char of seqStr, in either case, is in alphabet.
+    """
+    return not invalidChars(seqStr, alphabet)
+# end def
+
+
+def gcContent(seqStr):
+    """
+    Returns the fraction of the A, C, G and T bases of seqStr that are G or
+    C, or 0.0 if there are none.
+    """
+    bases = strToDna(seqStr)
+    if not bases:
+        return 0.0
+    return (bases.count('G') + bases.count('C')) / float(len(bases))
+# end def
+
+
+def meltingTemp(seqStr):
+    """
+    Returns an estimate of the melting temperature of seqStr in degrees C,
+    counting only its A, C, G and T bases. Uses the Wallace rule,
+    2*(A+T) + 4*(G+C), below 14 bases and the basic GC content formula,
+    64.9 + 41*(G+C-16.4)/N, from there on.
+    """
+    bases = strToDna(seqStr)
+    n = len(bases)
+    gc = bases.count('G') + bases.count('C')
+    if n < 14:
+        return 2.0 * (n - gc) + 4.0 * gc
+    return 64.9 + 41.0 * (gc - 16.4) / n
+# end def
+
+
+### BATCHED VARIANTS ###
+def _translateList(seqList, table):
+    """Translates the sequences of seqList, keeping the None entries."""
+    return [seq.translate(table) if seq else seq for seq in seqList]
+# end def
+
+
+def compList(seqList):
+    """Returns the complements of the sequences in seqList."""
+    return _translateList(seqList, _COMPLEMENT)
+# end def
+
+
+def rcompList(seqList):
+    """Returns the reverse complements of the sequences in seqList."""
+    return [seq.translate(_COMPLEMENT)[::-1] if seq else seq
+            for seq in seqList]
+# end def
+
+
+def markwhiteList(seqList):
+    """Returns the sequences in seqList with their blanks marked '?'."""
+    return _translateList(seqList, _WHITE_TO_Q)
+# end def
+
+
+def gcContentList(seqList):
+    """Returns the GC content of each sequence in seqList, None for None."""
+    return [None if seq == None else gcContent(seq) for seq in seqList]
+# end def
+
+
+def meltingTempList(seqList):
+    """
+    Returns the melting temperature estimate of each sequence in seqList,
+    None for None.
+    """
+    return [None if seq == None else meltingTemp(seq) for seq in seqList]
+# end def
@@ -28,6 +28,7 @@
 from exceptions import IndexError
 from operator import attrgetter
 import util
+import sequencetools
 from array import array
 from decorators.insertion import Insertion
 
@@ -53,8 +54,15 @@ class Strand(QObject):
     to the 5' and 3' phosphate linkages in the physical DNA strand,
     respectively. Since Strands can point 5'-to-3' in either the low-to-high
     or high-to-low directions, connection accessor methods (connectionLow and
-    connectionHigh) are bound during the init for convenience.
+    connectionHigh) dispatch on the direction of the StrandSet.
+
+    A large design holds many thousands of Strands, so the instance state is
+    kept in __slots__ and the decorator and modifier dictionaries are only
+    created once something is added to them.
     """
+    __slots__ = ('_strandSet', '_doc', '_baseIdxLow', '_baseIdxHigh',
+                 '_oligo', '_strand5p', '_strand3p', '_sequence',
+                 '_decorators', '_modifiers', '_isDrawn5to3')
 
     def __init__(self, strandSet, baseIdxLow, baseIdxHigh, oligo=None):
         super(Strand, self).__init__(strandSet)
@@ -68,27 +76,9 @@ class Strand(QObject):
         self._strand3p = None  # 3' connection to another strand
         self._sequence = None
 
-        self._decorators = {}
-        self._modifiers = {}
-
-        # dynamic methods for mapping high/low connection /indices
-        # to corresponding 3Prime 5Prime
-        isDrawn5to3 = strandSet.isDrawn5to3()
-        if isDrawn5to3:
-            self.idx5Prime = self.lowIdx
-            self.idx3Prime = self.highIdx
-            self.connectionLow = self.connection5p
-            self.connectionHigh = self.connection3p
-            self.setConnectionLow = self.setConnection5p
-            self.setConnectionHigh = self.setConnection3p
-        else:
-            self.idx5Prime = self.highIdx
-            self.idx3Prime = self.lowIdx
-            self.connectionLow = self.connection3p
-            self.connectionHigh = self.connection5p
-            self.setConnectionLow = self.setConnection3p
-            self.setConnectionHigh = self.setConnection5p
-        self._isDrawn5to3 = isDrawn5to3
+        self._decorators = None  # created by addDecorators
+        self._modifiers = None
+        self._isDrawn5to3 = strandSet.isDrawn5to3()
     # end def
 
     def __repr__(self):
@@ -179,6 +169,8 @@ class Strand(QObject):
         return self._strandSet.undoStack()
 
     def decorators(self):
+        if self._decorators == None:
+            return {}
         return self._decorators
     # end def
 
@@ -203,9 +195,9 @@ class Strand(QObject):
     def sequence(self, forExport=False):
         seq = self._sequence
         if seq:
-            return util.markwhite(seq) if forExport else seq
+            return sequencetools.markwhite(seq) if forExport else seq
         elif forExport:
-            return ''.join(['?' for x in range(self.totalLength())])
+            return '?' * self.totalLength()
         return ''
     # end def
 
@@ -225,13 +217,14 @@ class Strand(QObject):
         Applies sequence string from 5' to 3'
         return the tuple (used, unused) portion of the sequenceString
         """
+        if self._oligo != None:
+            self._oligo.invalidateSequence()
         if sequenceString == None:
             self._sequence = None
             return None, None
         length = self.totalLength()
         if len(sequenceString) < length:
-            bonus = length - len(sequenceString)
-            sequenceString += ''.join([' ' for x in range(bonus)])
+            sequenceString += ' ' * (length - len(sequenceString))
         temp = sequenceString[0:length]
         self._sequence = temp
         return temp, sequenceString[length:]
@@ -247,10 +240,12 @@ class Strand(QObject):
         # i.e. both endpoints thanks to multiple selections so just redo the 
         # whole thing
         self._sequence = None
-        
+        if self._oligo != None:
+            self._oligo.invalidateSequence()
+
         for compStrand in compSS._findOverlappingRanges(self):
             compSeq = compStrand.sequence()
-            usedSeq = util.comp(compSeq) if compSeq else None
+            usedSeq = sequencetools.comp(compSeq) if compSeq else None
             usedSeq = self.setComplementSequence(
                                         usedSeq, compStrand)
         # end for
@@ -308,6 +303,8 @@ class Strand(QObject):
         Perhaps it's wiser to merely store them left to right and reverse them
         at draw time, or export time
         """
+        if self._oligo != None:
+            self._oligo.invalidateSequence()
         sLowIdx, sHighIdx = self._baseIdxLow, self._baseIdxHigh
         cLowIdx, cHighIdx = strand.idxs()
 
@@ -322,14 +319,14 @@ class Strand(QObject):
         # see if we are applying
         if sequenceString == None:
             # clear out string for in case of not total overlap
-            useSeq = ''.join([' ' for x in range(totalLength)])
+            useSeq = ' ' * totalLength
         else:  # use the string as is
             useSeq = sequenceString[::-1] if self._isDrawn5to3 \
                                             else sequenceString
 
         temp = array('c', useSeq)
         if self._sequence == None:
-            tempSelf = array('c', ''.join([' ' for x in range(totalLength)]))
+            tempSelf = array('c', ' ' * totalLength)
         else:
             tempSelf = array('c', self._sequence if self._isDrawn5to3 \
                                                     else self._sequence[::-1])
@@ -380,11 +377,29 @@ class Strand(QObject):
 
     def idx3Prime(self):
         """Returns the absolute baseIdx of the 3' end of the strand."""
-        return self.idx3Prime
+        if self._isDrawn5to3:
+            return self._baseIdxHigh
+        return self._baseIdxLow
+    # end def
 
     def idx5Prime(self):
         """Returns the absolute baseIdx of the 5' end of the strand."""
-        return self.idx5Prime
+        if self._isDrawn5to3:
+            return self._baseIdxLow
+        return self._baseIdxHigh
+    # end def
+
+    def connectionLow(self):
+        if self._isDrawn5to3:
+            return self._strand5p
+        return self._strand3p
+    # end def
+
+    def connectionHigh(self):
+        if self._isDrawn5to3:
+            return self._strand3p
+        return self._strand5p
+    # end def
 
     def isDrawn5to3(self):
         return self._strandSet.isDrawn5to3()
@@ -537,30 +552,18 @@ class Strand(QObject):
         """
         includes the length of insertions in addition to the bases
         """
-        tL = 0
-        insertions = self.insertionsOnStrand(idxL, idxH)
-        for insertion in insertions:
-            tL += insertion.length()
-        return tL
+        coord = self._strandSet.virtualHelix().coord()
+        return self.part().insertions()[coord].lengthBetween(idxL, idxH)
     # end def
 
     def insertionsOnStrand(self, idxL=None, idxH=None):
         """
         if passed indices it will use those as a bounds
         """
-        insertions = []
-        coord = self.virtualHelix().coord()
-        insertionsDict = self.part().insertions()[coord]
-        sortedIndices = sorted(insertionsDict.keys())
+        coord = self._strandSet.virtualHelix().coord()
         if idxL == None:
             idxL, idxH = self.idxs()
-        for index in sortedIndices:
-            insertion = insertionsDict[index]
-            if idxL <= insertion.idx() <= idxH:
-                insertions.append(insertion)
-            # end if
-        # end for
-        return insertions
+        return self.part().insertions()[coord].insertionsBetween(idxL, idxH)
     # end def
 
     def length(self):
@@ -571,17 +574,17 @@ class Strand(QObject):
         """
         includes the length of insertions in addition to the bases
         """
-        tL = 0
-        insertions = self.insertionsOnStrand()
-
-        for insertion in insertions:
-            tL += insertion.length()
-        return tL + self.length()
+        return self.length() + self.insertionLengthBetweenIdxs(
+                                        self._baseIdxLow, self._baseIdxHigh)
     # end def
 
     ### PUBLIC METHODS FOR EDITING THE MODEL ###
     def addDecorators(self, additionalDecorators):
         """Used to add decorators during a merge operation."""
+        if not additionalDecorators:
+            return
+        if self._decorators == None:
+            self._decorators = {}
         self._decorators.update(additionalDecorators)
     # end def
 
@@ -683,10 +686,30 @@ class Strand(QObject):
 
     def setConnection3p(self, strand):
         self._strand3p = strand
+        self.part()._invalidateXoverCache(self.virtualHelix())
+        if self._oligo != None:
+            self._oligo.invalidateSequence()
     # end def
 
     def setConnection5p(self, strand):
         self._strand5p = strand
+        self.part()._invalidateXoverCache(self.virtualHelix())
+        if self._oligo != None:
+            self._oligo.invalidateSequence()
+    # end def
+
+    def setConnectionLow(self, strand):
+        if self._isDrawn5to3:
+            self.setConnection5p(strand)
+        else:
+            self.setConnection3p(strand)
+    # end def
+
+    def setConnectionHigh(self, strand):
+        if self._isDrawn5to3:
+            self.setConnection3p(strand)
+        else:
+            self.setConnection5p(strand)
     # end def
 
     def setIdxs(self, idxs):
@@ -695,6 +718,10 @@ class Strand(QObject):
     # end def
 
     def setOligo(self, newOligo, emitSignal=True):
+        if self._oligo != None:
+            self._oligo.invalidateSequence()
+        if newOligo != None:
+            newOligo.invalidateSequence()
         self._oligo = newOligo
         if emitSignal:
             self.strandHasNewOligoSignal.emit(self)
@@ -705,8 +732,11 @@ class Strand(QObject):
     # end def
 
     def split(self, idx, updateSequence=True):
-        """Called by view items to split this strand at idx."""
-        self._strandSet.splitStrand(self, idx, updateSequence)
+        """
+        Called by view items to split this strand at idx. Returns False if
+        the strand can't be split there.
+        """
+        return self._strandSet.splitStrand(self, idx, updateSequence)
 
     def updateIdxs(self, delta):
         self._baseIdxLow += delta
@@ -786,7 +816,7 @@ class Strand(QObject):
     # end def
 
     def hasDecoratorAt(self, idx):
-        return idx in self._decorators
+        return self._decorators != None and idx in self._decorators
     # end def
 
     def hasInsertion(self):
@@ -796,10 +826,7 @@ class Strand(QObject):
         """
         coord = self.virtualHelix().coord()
         insts = self.part().insertions()[coord]
-        for i in range(self._baseIdxLow, self._baseIdxHigh+1):
-            if i in insts:
-                return True
-        return False
+        return len(insts.insertionsBetween(*self.idxs())) > 0
     # end def
 
     def hasInsertionAt(self, idx):
@@ -809,7 +836,7 @@ class Strand(QObject):
     # end def
 
     def hasModifierAt(self, idx):
-        return idx in self._modifiers
+        return self._modifiers != None and idx in self._modifiers
     # end def
 
     def shallowCopy(self):
@@ -823,7 +850,8 @@ class Strand(QObject):
         nS._strand5p = self._strand5p
         nS._strand3p = self._strand3p
         # required to shallow copy the dictionary
-        nS._decorators = dict(self._decorators.items())
+        if self._decorators:
+            nS._decorators = dict(self._decorators.items())
         nS._sequence = None  # self._sequence
         return nS
     # end def
@@ -836,10 +864,11 @@ class Strand(QObject):
         """
         nS = Strand(strandSet, *self.idxs())
         nS._oligo = oligo
-        decs = nS._decorators
-        for key, decOrig in self._decorators:
-            decs[key] = decOrig.deepCopy()
-        # end fo
+        if self._decorators:
+            decs = nS._decorators = {}
+            for key, decOrig in self._decorators.iteritems():
+                decs[key] = decOrig.deepCopy()
+            # end for
         nS._sequence = self._sequence
         return nS
     # end def
@@ -875,8 +904,8 @@ class Strand(QObject):
             strandSet = self.strand.strandSet()
             part = strandSet.part()
 
-            std.oligo().incrementLength(self.delta)
-            std.setIdxs(nI)
+            std.oligo().strandResized(self.delta)
+            strandSet._updateStrandIdxs(std, nI)
             if strandSet.isStaple():
                 
                 std.reapplySequence()
@@ -894,8 +923,8 @@ class Strand(QObject):
             strandSet = self.strand.strandSet()
             part = strandSet.part()
 
-            std.oligo().decrementLength(self.delta)
-            std.setIdxs(oI)
+            std.oligo().strandResized(-self.delta)
+            strandSet._updateStrandIdxs(std, oI)
             if strandSet.isStaple():
                 std.reapplySequence()
             std.strandResizedSignal.emit(std, oI)
@@ -1009,7 +1038,7 @@ class Strand(QObject):
             strand = self._strand
             cStrand = self._compStrand
             inst = self._insertions[self._idx]
-            inst.setLength(self._newLength)
+            self._insertions.setInsertionLength(self._idx, self._newLength)
             strand.oligo().incrementLength(self._newLength - self._oldLength)
             strand.strandInsertionChangedSignal.emit(strand, inst)
             if cStrand:
@@ -1022,7 +1051,7 @@ class Strand(QObject):
             strand = self._strand
             cStrand = self._compStrand
             inst = self._insertions[self._idx]
-            inst.setLength(self._oldLength)
+            self._insertions.setInsertionLength(self._idx, self._oldLength)
             strand.oligo().decrementLength(self._newLength - self._oldLength)
             strand.strandInsertionChangedSignal.emit(strand, inst)
             if cStrand:
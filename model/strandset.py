@@ -23,9 +23,15 @@
 # http://www.opensource.org/licenses/mit-license.php
 
 import random
+from bisect import bisect_left, bisect_right
 from operator import itemgetter
 from itertools import izip, repeat
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from strand import Strand
 from oligo import Oligo
 from enum import StrandType
@@ -47,14 +53,21 @@ class StrandSet(QObject):
     Views may also query StrandSet for information that is useful in
     determining if edits can be made, such as the bounds of empty space in
     which a strand can be created or resized.
+
+    Strands in a StrandSet never overlap, so _strandList is sorted by both
+    low and high index. _lowIdxList and _highIdxList mirror the bounds of
+    every strand in _strandList and serve as an interval index: point and
+    range queries are a pair of bisects. All edits to _strandList must go
+    through the private support methods below to keep the index in sync.
     """
     def __init__(self, strandType, virtualHelix):
         super(StrandSet, self).__init__(virtualHelix)
         self._virtualHelix = virtualHelix
         self._doc = virtualHelix.document()
         self._strandList = []
+        self._lowIdxList = []
+        self._highIdxList = []
         self._undoStack = None
-        self._lastStrandSetIndex = None
         self._strandType = strandType
     # end def
 
@@ -139,29 +152,13 @@ class StrandSet(QObject):
         bases that includes the baseIdx.
         """
         lowIdx, highIdx = 0, self.partMaxBaseIdx()  # init the return values
-        lenStrands = len(self._strandList)
-
-        # not sure how to set this up this to help in caching
-        # lastIdx = self._lastStrandSetIndex
-
-        if lenStrands == 0:  # empty strandset, just return the part bounds
-            return (lowIdx, highIdx)
-
-        low = 0              # index of the first (left-most) strand
-        high = lenStrands    # index of the last (right-most) strand
-        while low < high:    # perform binary search to find empty region
-            mid = (low + high) / 2
-            midStrand = self._strandList[mid]
-            mLow, mHigh = midStrand.idxs()
-            if baseIdx < mLow:  # baseIdx is to the left of crntStrand
-                high = mid   # continue binary search to the left
-                highIdx = mLow - 1  # set highIdx to left of crntStrand
-            elif baseIdx > mHigh:   # baseIdx is to the right of crntStrand
-                low = mid + 1    # continue binary search to the right
-                lowIdx = mHigh + 1  # set lowIdx to the right of crntStrand
-            else:
+        i = bisect_left(self._highIdxList, baseIdx)
+        if i < len(self._strandList):
+            if self._lowIdxList[i] <= baseIdx:
                 return (None, None)  # baseIdx was not empty
-        self._lastStrandSetIndex = (low + high) / 2  # set cache
+            highIdx = self._lowIdxList[i] - 1
+        if i > 0:
+            lowIdx = self._highIdxList[i - 1] + 1
         return (lowIdx, highIdx)
     # end def
 
@@ -355,138 +352,114 @@ class StrandSet(QObject):
         return "scaffold" if self._strandType == StrandType.Scaffold else "staple"
 
     def hasStrandAt(self, idxLow, idxHigh):
-        """
-        """
-        dummyStrand = Strand(self, idxLow, idxHigh)
-        strandList = [s for s in self._findOverlappingRanges(dummyStrand)]
-        dummyStrand._strandSet = None
-        dummyStrand.setParent(None)
-        dummyStrand.deleteLater()
-        dummyStrand = None
-        return len(strandList) > 0
+        """Returns True if any strand overlaps [idxLow, idxHigh]."""
+        start, end = self._overlappingSlice(idxLow, idxHigh)
+        return start < end
     # end def
 
     def getOverlappingStrands(self, idxLow, idxHigh):
-        dummyStrand = Strand(self, idxLow, idxHigh)
-        strandList = [s for s in self._findOverlappingRanges(dummyStrand)]
-        dummyStrand._strandSet = None
-        dummyStrand.setParent(None)
-        dummyStrand.deleteLater()
-        dummyStrand = None
-        return strandList
+        start, end = self._overlappingSlice(idxLow, idxHigh)
+        return self._strandList[start:end]
     # end def
 
     def hasStrandAtAndNoXover(self, idx):
-        dummyStrand = Strand(self, idx, idx)
-        strandList = [s for s in self._findOverlappingRanges(dummyStrand)]
-        dummyStrand._strandSet = None
-        dummyStrand.setParent(None)
-        dummyStrand.deleteLater()
-        dummyStrand = None
-        if len(strandList) > 0:
-            return False if strandList[0].hasXoverAt(idx) else True
+        strand = self.getStrand(idx)
+        if strand != None:
+            return False if strand.hasXoverAt(idx) else True
         else:
             return False
     # end def
 
     def hasNoStrandAtOrNoXover(self, idx):
-        dummyStrand = Strand(self, idx, idx)
-        strandList = [s for s in self._findOverlappingRanges(dummyStrand)]
-        dummyStrand._strandSet = None
-        dummyStrand.setParent(None)
-        dummyStrand.deleteLater()
-        dummyStrand = None
-        if len(strandList) > 0:
-            return False if strandList[0].hasXoverAt(idx) else True
+        strand = self.getStrand(idx)
+        if strand != None:
+            return False if strand.hasXoverAt(idx) else True
         else:
             return True
     # end def
 
     def getIndexToInsert(self, idxLow, idxHigh):
         """
+        Returns a tuple (canInsert, idx), where idx is the position in the
+        _strandList a strand spanning [idxLow, idxHigh] would occupy.
         """
-        canInsert = True
-        dummyStrand = Strand(self, idxLow, idxHigh)
-        if self._couldStrandInsertAtLastIndex(dummyStrand):
-            return canInsert, self._lastStrandSetIndex
-        isInSet, overlap, idx = self._findIndexOfRangeFor(dummyStrand)
-        dummyStrand._strandSet = None
-        dummyStrand.setParent(None)
-        dummyStrand.deleteLater()
-        dummyStrand = None
-        if overlap:
-            canInsert = False
-        return canInsert, idx
+        start, end = self._overlappingSlice(idxLow, idxHigh)
+        if start < end:
+            return False, None
+        return True, start
     # end def
 
     def getStrand(self, baseIdx):
         """Returns the strand that overlaps with baseIdx."""
-        dummyStrand = Strand(self, baseIdx, baseIdx)
-        strandList = [s for s in self._findOverlappingRanges(dummyStrand)]
-        dummyStrand._strandSet = None
-        dummyStrand.setParent(None)
-        dummyStrand.deleteLater()
-        dummyStrand = None
-        return strandList[0] if len(strandList) > 0 else None
+        i = bisect_left(self._highIdxList, baseIdx)
+        if i < len(self._strandList) and self._lowIdxList[i] <= baseIdx:
+            return self._strandList[i]
+        return None
     # end def
 
     def getLegacyArray(self):
-        """docstring for getLegacyArray"""
+        """
+        Returns the legacy per-base [5'vh, 5'idx, 3'vh, 3'idx] list for the
+        strandset, converted from getLegacyBuffer.
+        """
+        buf = self.getLegacyBuffer()
+        if np != None:
+            return buf.tolist()
+        return buf
+    # end def
+
+    def getLegacyBuffer(self):
+        """
+        Fills an (N, 4) int32 array (a list of lists without numpy) with
+        the legacy encoding of the strandset. Each strand is copied as a
+        slice of a template row block, then its two ends are patched with
+        its xovers.
+        """
         num = self._virtualHelix.number()
-        ret = [[-1, -1, -1, -1] for i in range(self.part().maxBaseIdx() + 1)]
-        if self.isDrawn5to3():
-            for strand in self._strandList:
-                lo, hi = strand.idxs()
-                assert strand.idx5Prime() == lo and strand.idx3Prime() == hi
-                # map the first base (5' xover if necessary)
-                s5p = strand.connection5p()
-                if s5p != None:
-                    ret[lo][0] = s5p.virtualHelix().number()
-                    ret[lo][1] = s5p.idx3Prime()
-                ret[lo][2] = num
-                ret[lo][3] = lo + 1
-                # map the internal bases
-                for idx in range(lo + 1, hi):
-                    ret[idx][0] = num
-                    ret[idx][1] = idx - 1
-                    ret[idx][2] = num
-                    ret[idx][3] = idx + 1
-                # map the last base (3' xover if necessary)
-                ret[hi][0] = num
-                ret[hi][1] = hi - 1
-                s3p = strand.connection3p()
-                if s3p != None:
-                    ret[hi][2] = s3p.virtualHelix().number()
-                    ret[hi][3] = s3p.idx5Prime()
-                # end if
-            # end for
-        # end if
+        numBases = self.part().maxBaseIdx() + 1
+        isDrawn5to3 = self.isDrawn5to3()
+        # internal bases point at idx-1 and idx+1 (5to3), or the reverse
+        step = 1 if isDrawn5to3 else -1
+        if np != None:
+            ret = np.empty((numBases, 4), dtype=np.int32)
+            ret.fill(-1)
+            template = np.empty((numBases, 4), dtype=np.int32)
+            template[:, 0] = num
+            template[:, 1] = np.arange(-step, numBases - step)
+            template[:, 2] = num
+            template[:, 3] = np.arange(step, numBases + step)
         else:
-            for strand in self._strandList:
-                lo, hi = strand.idxs()
+            ret = [[-1, -1, -1, -1] for i in xrange(numBases)]
+            template = [[num, i - step, num, i + step] for i in xrange(numBases)]
+        for strand in self._strandList:
+            lo, hi = strand.idxs()
+            ret[lo:hi + 1] = template[lo:hi + 1]
+            s5p = strand.connection5p()
+            s3p = strand.connection3p()
+            if isDrawn5to3:
+                assert strand.idx5Prime() == lo and strand.idx3Prime() == hi
+                idx5p, idx3p = lo, hi
+            else:
                 assert strand.idx3Prime() == lo and strand.idx5Prime() == hi
-                # map the first base (3' xover if necessary)
-                ret[lo][0] = num
-                ret[lo][1] = lo + 1
-                s3p = strand.connection3p()
-                if s3p != None:
-                    ret[lo][2] = s3p.virtualHelix().number()
-                    ret[lo][3] = s3p.idx5Prime()
-                # map the internal bases
-                for idx in range(lo + 1, hi):
-                    ret[idx][0] = num
-                    ret[idx][1] = idx + 1
-                    ret[idx][2] = num
-                    ret[idx][3] = idx - 1
-                # map the last base (5' xover if necessary)
-                ret[hi][2] = num
-                ret[hi][3] = hi - 1
-                s5p = strand.connection5p()
-                if s5p != None:
-                    ret[hi][0] = s5p.virtualHelix().number()
-                    ret[hi][1] = s5p.idx3Prime()
-                # end if
-            # end for
+                idx5p, idx3p = hi, lo
+            if lo == hi:
+                # a single base strand keeps its template row, with only the
+                # xover of its high end, as the per-base encoder wrote it
+                if isDrawn5to3:
+                    s5p = None
+                else:
+                    s3p = None
+            # the 5' end has no upstream base, unless there is a 5' xover
+            if s5p != None:
+                ret[idx5p][0:2] = [s5p.virtualHelix().number(), s5p.idx3Prime()]
+            elif lo != hi:
+                ret[idx5p][0:2] = [-1, -1]
+            # likewise for the 3' end
+            if s3p != None:
+                ret[idx3p][2:4] = [s3p.virtualHelix().number(), s3p.idx5Prime()]
+            elif lo != hi:
+                ret[idx3p][2:4] = [-1, -1]
+        # end for
         return ret
     # end def
 
@@ -494,144 +467,71 @@ class StrandSet(QObject):
     def _addToStrandList(self, strand, idx):
         """Inserts strand into the _strandList at idx."""
         self._strandList.insert(idx, strand)
+        self._lowIdxList.insert(idx, strand.lowIdx())
+        self._highIdxList.insert(idx, strand.highIdx())
+        self.part()._invalidateXoverCache(self._virtualHelix)
 
     def _removeFromStrandList(self, strand):
         """Remove strand from _strandList."""
         self._doc.removeStrandFromSelection(strand)  # make sure the strand is no longer selected
-        self._strandList.remove(strand)
+        isInSet, overlap, idx = self._findIndexOfRangeFor(strand)
+        if not isInSet:
+            raise ValueError("%s not in %s" % (strand, self))
+        self._popFromStrandList(idx)
+
+    def _popFromStrandList(self, idx):
+        """Removes and returns the strand at idx in _strandList."""
+        del self._lowIdxList[idx]
+        del self._highIdxList[idx]
+        self.part()._invalidateXoverCache(self._virtualHelix)
+        return self._strandList.pop(idx)
+
+    def _setStrandList(self, strandList):
+        """Replaces the contents of _strandList (assumed to be sorted)."""
+        self._strandList = strandList
+        self._lowIdxList = [strand.lowIdx() for strand in strandList]
+        self._highIdxList = [strand.highIdx() for strand in strandList]
+        self.part()._invalidateXoverCache(self._virtualHelix)
+
+    def _updateStrandIdxs(self, strand, idxs):
+        """
+        Sets the idxs of a strand that is already in _strandList and keeps
+        the interval index in sync. Assumes the new bounds do not overlap
+        any other strand.
+        """
+        isInSet, overlap, idx = self._findIndexOfRangeFor(strand)
+        strand.setIdxs(idxs)
+        if isInSet:
+            self._lowIdxList[idx] = strand.lowIdx()
+            self._highIdxList[idx] = strand.highIdx()
+        self.part()._invalidateXoverCache(self._virtualHelix)
 
-    def _couldStrandInsertAtLastIndex(self, strand):
-        """Verification of insertability based on cached last index."""
-        lastInd = self._lastStrandSetIndex
-        strandList = self._strandList
-        if lastInd == None or lastInd > (len(strandList) - 1):
-            self._lastStrandSetIndex = None
-            return False
-        else:
-            sTestHigh = strandList[lastInd].lowIdx() if lastInd < len(strandList) else self.partMaxBaseIdx()
-            sTestLow = strandList[lastInd - 1].highIdx() if lastInd > 0 else - 1
-            sLow, sHigh = strand.idxs()
-            if sTestLow < sLow and sHigh < sTestHigh:
-                return True
-            else:
-                return False
+    def _overlappingSlice(self, idxLow, idxHigh):
+        """
+        Returns (start, end) such that _strandList[start:end] are the strands
+        overlapping the inclusive range [idxLow, idxHigh].
+        """
+        start = bisect_left(self._highIdxList, idxLow)
+        end = bisect_right(self._lowIdxList, idxHigh, start)
+        return start, end
 
     def _findOverlappingRanges(self, qstrand, useCache=False):
         """
-        a binary search for the strands in self._strandList overlapping with
-        a query strands, or qstrands, indices.
+        Returns an iterator over the strands in self._strandList overlapping
+        with a query strand's (qstrand) indices.
 
         Useful for operations on complementary strands such as applying a
-        sequence
-
-        This is an generator for now
-
-        Strategy:
-        1.
-            search the _strandList for a strand the first strand that has a
-            highIndex >= lowIndex of the query strand.
-            save that strandSet index as sSetIndexLow.
-            if No strand satisfies this condition, return an empty list
-
-            Unless it matches the query strand's lowIndex exactly,
-            Step 1 is O(log N) where N in length of self._strandList to the max,
-            that is it needs to exhaust the search
-
-            conversely you could search for first strand that has a
-            lowIndex LESS than or equal to the lowIndex of the query strand.
-
-        2.
-            starting at self._strandList[sSetIndexLow] test each strand to see if
-            it's indexLow is LESS than or equal to qstrand.indexHigh.  If it is
-            yield/return that strand.  If it's GREATER than the indexHigh, or
-            you run out of strands to check, the generator terminates
+        sequence. useCache is ignored and kept for API compatibility.
         """
-        strandList = self._strandList
-        lenStrands = len(strandList)
-        if lenStrands == 0:
-            return
-        # end if
-
-        low = 0
-        high = lenStrands
-        qLow, qHigh = qstrand.idxs()
-
-        # Step 1: get rangeIndexLow with a binary search
-        if useCache:  # or self.doesLastSetIndexMatch(qstrand, strandList):
-            # cache match!
-            sSetIndexLow = self._lastStrandSetIndex
-        else:
-            sSetIndexLow = -1
-            while low < high:
-                mid = (low + high) / 2
-                midStrand = strandList[mid]
-
-                # pre get indices from the currently tested strand
-                mLow, mHigh = midStrand.idxs()
-
-                if mHigh == qLow:
-                    # match, break out of while loop
-                    sSetIndexLow = mid
-                    break
-                elif mHigh > qLow:
-                    # store the candidate index
-                    sSetIndexLow = mid
-                    # adjust the high index to find a better candidate if
-                    # it exists
-                    high = mid
-                # end elif
-                else:  # mHigh < qLow
-                    # If a strand exists it must be a higher rangeIndex
-                    # leave the high the same
-                    low = mid + 1
-                #end elif
-            # end while
-        # end else
-
-        # Step 2: create a generator on matches
-        # match on whether the tempStrand's lowIndex is
-        # within the range of the qStrand
-        if sSetIndexLow > -1:
-            tempStrands = iter(strandList[sSetIndexLow:])
-            tempStrand = tempStrands.next()
-            qHigh += 1  # bump it up for a more efficient comparison
-            i = 0   # use this to
-            while tempStrand and tempStrand.lowIdx() < qHigh:
-                yield tempStrand
-                # use a next and a default to cause a break condition
-                tempStrand = next(tempStrands, None)
-                i += 1
-            # end while
-
-            # cache the last index we left of at
-            i = sSetIndexLow + i
-            """
-            if
-            1. we ran out of strands to test adjust
-                OR
-            2. the end condition tempStrands highIndex is still inside the
-            qstrand but not equal to the end point
-                adjust i down 1
-            otherwise
-            """
-            if not tempStrand or tempStrand.highIdx() < qHigh - 1:
-                i -= 1
-            # assign cache but double check it's a valid index
-            self._lastStrandSetIndex = i if -1 < i < lenStrands else None
-            return
-        else:
-            # no strand was found
-            # go ahead and clear the cache
-            self._lastStrandSetIndex = None if len(self._strandList) > 0 else 0
-            return
+        start, end = self._overlappingSlice(*qstrand.idxs())
+        return iter(self._strandList[start:end])
     # end def
 
     def getStrandIndex(self, strand):
-        try:
-            ind = self._strandList.index(strand)
-            return (True, ind)
-        except ValueError:
-            return (False, 0)
+        isInSet, overlap, idx = self._findIndexOfRangeFor(strand)
+        if isInSet:
+            return (True, idx)
+        return (False, 0)
     # end def
 
     def _findIndexOfRangeFor(self, strand):
@@ -653,99 +553,15 @@ class StrandSet(QObject):
             idx is the index where the strand could be inserted if found
             is False and overlap is False.
         """
-        # setup
-        strandList = self._strandList
-        lastIdx = self._lastStrandSetIndex
-        lenStrands = len(strandList)
-        # base case: empty list, can insert at 0
-        if lenStrands == 0:
-            return (False, False, 0)
-        # check cache
-        if lastIdx:
-            if lastIdx < lenStrands and strandList[lastIdx] == strand:
-                return (True, False, lastIdx)
-        # init search bounds
-        low, high = 0, lenStrands
         sLow, sHigh = strand.idxs()
-        # perform binary search
-        while low < high:
-            mid = (low + high) / 2
-            midStrand = strandList[mid]
-            mLow, mHigh = midStrand.idxs()
-            if midStrand == strand:
-                self._lastStrandSetIndex = mid
-                return (True, False, mid)
-            elif mHigh < sLow:
-                #  strand                [sLow----)
-                # mStrand  (----mHigh]
-                low = mid + 1  # search higher
-            elif mLow > sHigh:
-                #  strand  (----sHigh]
-                # mStrand                [mLow----)
-                high = mid  # search lower
-            else:
-                if mLow <= sLow <= mHigh:
-                    # overlap: right side of mStrand
-                    #  strand         [sLow---------------)
-                    # mStrand  [mLow----------mHigh]
-                    self._lastStrandSetIndex = None
-                    return (False, True, None)
-                elif mLow <= sHigh <= mHigh:
-                    # overlap: left side of mStrand
-                    #  strand  (--------------sHigh]
-                    # mStrand         [mLow-----------mHigh]
-                    self._lastStrandSetIndex = None
-                    return (False, True, None)
-                elif sLow <= mLow and mHigh <= sHigh:
-                    # overlap: strand encompases existing
-                    #  strand  [sLow-------------------sHigh]
-                    # mStrand         [mLow----mHigh]
-                    # note: inverse case is already covered above
-                    self._lastStrandSetIndex = None
-                    return (False, True, None)
-                else:
-                    # strand not in set, here's where you'd insert it
-                    self._lastStrandSetIndex = mid
-                    return (False, False, mid)
-            # end else
-        self._lastStrandSetIndex = low
-        return (False, False, low)
-    # end def
-
-    def _doesLastSetIndexMatch(self, qstrand, strandList):
-        """
-        strandList is passed to save a lookup
-        """
-        lSI = self._lastStrandSetIndex
-        if lSI:
-            qLow, qHigh = qstrand.idxs()
-            tempStrand = strandList[lSI]
-            tLow, tHigh = tempStrand.idxs()
-            if not (qLow <= tLow <= qHigh or qLow <= tHigh <= qHigh):
-                return False
-            else:  # get a difference
-                dif = abs(qLow - tLow)
-                # check neighboring strandList just in case
-                difLow = dif + 1
-                if lSI > 0:
-                    tLow, tHigh = strand[lSI - 1].idxs()
-                    if qLow <= tLow <= qHigh or qLow <= tHigh <= qHigh:
-                        difLow = abs(qLow - tLow)
-                difHigh = dif + 1
-                if lSI < len(strand) - 1:
-                    tLow, tHigh = strand[lSI + 1].idxs()
-                    if qLow <= tLow <= qHigh or qLow <= tHigh <= qHigh:
-                        difHigh = abs(qLow - tLow)
-                # check that the cached strand is in fact the right guy
-                if dif < difLow and dif < difHigh:
-                    return True
-                else:
-                    False
-            # end else
-        # end if
-        else:
-            return False
-        # end else
+        strandList = self._strandList
+        i = bisect_left(self._lowIdxList, sLow)
+        if i < len(strandList) and strandList[i] is strand:
+            return (True, False, i)
+        start, end = self._overlappingSlice(sLow, sHigh)
+        if start < end:
+            return (False, True, None)
+        return (False, False, start)
     # end def
 
     ### COMMANDS ###
@@ -771,7 +587,7 @@ class StrandSet(QObject):
             # Add the new strand to the StrandSet strandList
             strand = self._strand
             strandSet = self._strandSet
-            strandSet._strandList.insert(self._sSetIdx, strand)
+            strandSet._addToStrandList(strand, self._sSetIdx)
             # Set up the new oligo
             oligo = self._newOligo
             oligo.setStrand5p(strand)
@@ -791,7 +607,7 @@ class StrandSet(QObject):
             strand = self._strand
             strandSet = self._strandSet
             strandSet._doc.removeStrandFromSelection(strand)
-            strandSet._strandList.pop(self._sSetIdx)
+            strandSet._popFromStrandList(self._sSetIdx)
             # Get rid of the new oligo
             oligo = self._newOligo
             oligo.setStrand5p(None)
@@ -839,7 +655,7 @@ class StrandSet(QObject):
             strandSet = self._strandSet
             # strandSet._removeFromStrandList(strand)
             strandSet._doc.removeStrandFromSelection(strand)
-            strandSet._strandList.pop(self._sSetIdx)
+            strandSet._popFromStrandList(self._sSetIdx)
             strand5p = self._oldStrand5p
             strand3p = self._oldStrand3p
             oligo = self._oligo
@@ -893,7 +709,6 @@ class StrandSet(QObject):
             strandSet = self._strandSet
             # Add the newStrand to the sSet
             strandSet._addToStrandList(strand, self._sSetIdx)
-            # strandSet._strandList.insert(self._sSetIdx, strand)
             strand5p = self._oldStrand5p
             strand3p = self._oldStrand3p
             oligo = self._oligo
@@ -1,6 +1,5 @@
-from autobreakconfig import AutobreakConfig
+import autobreak  # the breaking itself, also usable headless
 import cadnano, util
-util.qtWrapImport('QtGui', globals(), ['QIcon', 'QPixmap', 'QAction'])
 
 class AutobreakHandler(object):
     def __init__(self, document, window):
@@ -26,6 +25,7 @@ class AutobreakHandler(object):
             for o in list(part.oligos()):
                 if o.isStaple():  # is there a staple oligo?
                     if self.configDialog == None:
+                        from autobreakconfig import AutobreakConfig
                         self.configDialog = AutobreakConfig(self.win, self)
                     self.configDialog.show()
                     return
@@ -33,8 +33,10 @@ class AutobreakHandler(object):
 def documentWindowWasCreatedSlot(doc, win):
     doc.autobreakHandler = AutobreakHandler(doc, win)
 
-# Initialization
-for c in cadnano.app().documentControllers:
-    doc, win = c.document(), c.window()
-    doc.autobreakHandler = AutobreakHandler(doc, win)
-cadnano.app().documentWindowWasCreatedSignal.connect(documentWindowWasCreatedSlot)
+# Initialization, the toolbar action only exists in the gui
+if cadnano.app().isGui():
+    util.qtWrapImport('QtGui', globals(), ['QIcon', 'QPixmap', 'QAction'])
+    for c in cadnano.app().documentControllers:
+        doc, win = c.document(), c.window()
+        doc.autobreakHandler = AutobreakHandler(doc, win)
+    cadnano.app().documentWindowWasCreatedSignal.connect(documentWindowWasCreatedSlot)
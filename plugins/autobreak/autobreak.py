@@ -6,85 +6,194 @@ from model.parts.part import Part
 from model.oligo import Oligo
 from multiprocessing import Pool, cpu_count
 from operator import itemgetter
+from itertools import izip
+import staplebreaker
+from solutioncache import SolutionCache, tokenSignature
 
-try:
-    import staplegraph
-    nx = True
-except:
-    nx = False
-
-token_cache = {}
+# solutions are keyed on the token list, loop flag, staple limits and
+# scorer, so they stay valid across runs and can be kept between sessions
+token_cache = SolutionCache()
 
 def breakStaples(part, settings):
-    clearTokenCache()
+    """
+    Breaks the selected staple oligos, or all staple oligos if none are
+    selected. All oligos are tokenized up front, the distinct token lists
+    are solved by solveTokenLists (in parallel if settings['numWorkers']
+    is more than 1), and the breaks are applied in a single macro. An
+    oligo changed by the breaks of an earlier one is solved again, or
+    skipped if it no longer exists.
+
+    Known token lists are served from token_cache. If
+    settings['solutionCacheFile'] is set, the cache is loaded from and
+    saved back to that file.
+    """
+    cacheFile = settings.get('solutionCacheFile')
+    if cacheFile:
+        token_cache.load(cacheFile)
     breakOligos = part.document().selectedOligos()
     if not breakOligos:
         breakOligos = part.oligos()
     else:
         part.document().clearAllSelected()
-    for o in list(breakOligos):
+    minStapleLegLen = settings.get('minStapleLegLen', 2)
+
+    # tokenize everything first, the solver only sees picklable tuples
+    jobs = []  # (oligo, tokenList, cacheString)
+    solutions = {}  # cacheString: solution for this run
+    unsolved = {}  # cacheString: list of solver inputs
+    for o in sorted(breakOligos, key=oligoSortKey):
         if not o.isStaple():
             continue
-        if nx:
-            nxBreakStaple(o, settings)
+        tokenList = tokenizeOligo(o, settings)
+        if len(tokenList) == 0:
+            continue
+        cacheString = stringifyToken(o, tokenList, settings)
+        jobs.append((o, tokenList, cacheString))
+        if cacheString in solutions or cacheString in unsolved:
+            continue
+        solution = token_cache.get(cacheString)
+        if solution != None:
+            solutions[cacheString] = solution
         else:
-            print "Not breaking"
-            # breakStaple(o, settings)
+            unsolved[cacheString] = stapleTokenLists(o, tokenList, settings)
+    # end for
+
+    keys = sorted(unsolved.iterkeys())
+    solved = solveTokenLists([unsolved[k] for k in keys],
+                                settings.get('numWorkers', 1))
+    for cacheString, solution in izip(keys, solved):
+        solutions[cacheString] = solution
+        if solution:
+            addToTokenCache(cacheString, *solution)
+    if cacheFile and unsolved:
+        token_cache.save(cacheFile)
+
+    if not jobs:
+        return
+    util.beginSuperMacro(part, desc="Auto-Break")
+    try:
+        for o, tokenList, cacheString in jobs:
+            # the solution only fits if the oligo is still as tokenized
+            if o not in part.oligos():
+                continue
+            if tokenizeOligo(o, settings) != tokenList:
+                nxBreakStaple(o, settings)
+                continue
+            solution = solutions[cacheString]
+            if solution:
+                breakItems, shortestScoreIdx = solution
+                nxPerformBreaks(o, breakItems, tokenList, shortestScoreIdx, minStapleLegLen)
+            elif o.isLoop():
+                print "unbroken Loop", o, o.length()
+    finally:
+        util.endSuperMacro(part)
 # end def
 
 def nxBreakStaple(oligo, settings):
-    stapleScorer = settings.get('stapleScorer', tgtLengthStapleScorer)
-    minStapleLegLen = settings.get('minStapleLegLen', 3)
-    minStapleLen = settings.get('minStapleLen', 30)
-    minStapleLenMinusOne = minStapleLen-1
-    maxStapleLen = settings.get('maxStapleLen', 40)
-    maxStapleLenPlusOne = maxStapleLen+1
-    tgtStapleLen = settings.get('tgtStapleLen', 35)
-    
+    """Breaks a single staple oligo, solving it in this process."""
+    minStapleLegLen = settings.get('minStapleLegLen', 2)
     tokenList = tokenizeOligo(oligo, settings)
 
     # print "tkList", tokenList, oligo.length(), oligo.color()
     if len(tokenList) == 0:
         return
-    cacheString = stringifyToken(oligo, tokenList)
-    if cacheString in token_cache:
-        # print "cacheHit!"
-        breakItems, shortestScoreIdx = token_cache[cacheString]
+    cacheString = stringifyToken(oligo, tokenList, settings)
+    solution = token_cache.get(cacheString)
+    if solution == None:
+        solution = bestSolution(map(staplebreaker.minimumPath,
+                            stapleTokenLists(oligo, tokenList, settings)))
+        if solution:
+            addToTokenCache(cacheString, *solution)
+    if solution:
+        breakItems, shortestScoreIdx = solution
         nxPerformBreaks(oligo, breakItems, tokenList, shortestScoreIdx, minStapleLegLen)
-    else:
-        staple_limits = [minStapleLen, maxStapleLen, tgtStapleLen] 
-        tokenLists = [(tokenList, staple_limits,0)]
-        tokenCount = tokenList[0]
-        if oligo.isLoop():
-            lenList = len(tokenList)
-            for i in range(1, lenList):
-                if tokenCount > 2*maxStapleLen:
-                    break
-                tL = tokenLists[i-1][0]
-                rotatedList =  tL[1:-1] + tL[0:1]   # assumes lenList > 1
-                tokenCount += rotatedList[0]
-                tokenLists.append((rotatedList, staple_limits, i))
-            # end for
-        # end if
-        # p = Pool(cpu_count() * 2)
-        # p = Pool(4)
-        # returns ( [breakStart, [breakLengths, ], score], tokenIdx)
-        # results = p.map(staplegraph.minimumPath, tokenLists)
-        results = map(staplegraph.minimumPath, tokenLists)
-
-        f = itemgetter(0)   # get the graph results
-        g = itemgetter(2)    # get the score
-        # so this is
-        scoreTuple = min(results, key=lambda x: g(f(x)) if x else 10000)
-        # ensure there's at least one result
-        if scoreTuple:
-            shortestScore, shortestScoreIdx = scoreTuple
-            breakItems = results[shortestScoreIdx][0][1]
-            addToTokenCache(cacheString, breakItems, shortestScoreIdx)
-            nxPerformBreaks(oligo, breakItems, tokenList, shortestScoreIdx, minStapleLegLen)
-        else:
-            if oligo.isLoop():
-                print "unbroken Loop", oligo, oligo.length()
+    elif oligo.isLoop():
+        print "unbroken Loop", oligo, oligo.length()
+# end def
+
+def oligoSortKey(oligo):
+    """Orders oligos by the location of their 5' end."""
+    strand5p = oligo.strand5p()
+    return (strand5p.virtualHelix().number(), strand5p.idx5Prime())
+# end def
+
+def stapleTokenLists(oligo, tokenList, settings):
+    """
+    Returns the list of staplebreaker.minimumPath inputs for a tokenized
+    oligo: one for a linear oligo, and one per candidate opening cut for
+    a loop.
+    """
+    stapleScorer = settings.get('stapleScorer', tgtLengthStapleScorer)
+    minStapleLen = settings.get('minStapleLen', 30)
+    maxStapleLen = settings.get('maxStapleLen', 40)
+    tgtStapleLen = settings.get('tgtStapleLen', 35)
+    staple_limits = [minStapleLen, maxStapleLen, tgtStapleLen]
+    if not oligo.isLoop():
+        return [(tokenList, staple_limits, 0, stapleScorer, settings)]
+    # nxPerformBreaks opens loop i with a cut after token i, so
+    # the solution for i has to start with token i+1
+    tokenLists = []
+    tokenCount = 0
+    for i in range(len(tokenList)):
+        if tokenCount > 2*maxStapleLen:
+            break
+        tokenCount += tokenList[i]
+        rotatedList = tokenList[i+1:] + tokenList[:i+1]
+        tokenLists.append((rotatedList, staple_limits, i, stapleScorer, settings))
+    # end for
+    return tokenLists
+# end def
+
+def bestSolution(results):
+    """
+    Takes the minimumPath results for the token lists of one oligo and
+    returns (breakItems, shortestScoreIdx) of the best scoring one, or
+    None if no token list could be broken.
+    """
+    f = itemgetter(0)   # get the graph results
+    g = itemgetter(2)    # get the score
+    # returns ( [breakStart, [breakLengths, ], score], tokenIdx)
+    solved = [x for x in results if x]
+    if not solved:
+        return None
+    scoreTuple = min(solved, key=lambda x: g(f(x)))
+    shortestScore, shortestScoreIdx = scoreTuple
+    breakItems = results[shortestScoreIdx][0][1]
+    return (breakItems, shortestScoreIdx)
+# end def
+
+def solveTokenLists(tokenListsPerOligo, numWorkers=1):
+    """
+    Solves a list of per-oligo token lists (see stapleTokenLists) and
+    returns the bestSolution for each oligo, in order.
+
+    With numWorkers > 1 the token lists are solved in a process Pool.
+    Solving is deterministic, so the results are identical to the serial
+    path, which is also used if the pool can't be started.
+    """
+    flat = [tl for tokenLists in tokenListsPerOligo for tl in tokenLists]
+    results = None
+    if numWorkers > 1 and len(flat) > 1:
+        try:
+            p = Pool(min(numWorkers, len(flat)))
+            try:
+                chunk = max(1, len(flat) / (4*numWorkers))
+                results = p.map(staplebreaker.minimumPath, flat, chunk)
+            finally:
+                p.close()
+                p.join()
+        except Exception as e:
+            print "Parallel autobreak failed, solving serially:", e
+            results = None
+    if results == None:
+        results = map(staplebreaker.minimumPath, flat)
+    solutions = []
+    i = 0
+    for tokenLists in tokenListsPerOligo:
+        n = len(tokenLists)
+        solutions.append(bestSolution(results[i:i+n]))
+        i += n
+    return solutions
 # end def
 
 def addToTokenCache(cacheString, breakItems, shortestScoreIdx):
@@ -92,20 +201,28 @@ def addToTokenCache(cacheString, breakItems, shortestScoreIdx):
 # end def
 
 def clearTokenCache():
-    token_cache = {}
+    token_cache.clear()
 # end def
 
-def stringifyToken(oligo, tokenList):
-    cacheString = str(tokenList)
-    if oligo.isLoop():
-        cacheString = 'L' + cacheString
-    return cacheString
+def tokenCacheStats():
+    """Returns the hit and miss counters and size of token_cache."""
+    return token_cache.stats()
+# end def
+
+def stringifyToken(oligo, tokenList, settings):
+    """Returns the token_cache key for a tokenized oligo."""
+    staple_limits = [settings.get('minStapleLen', 30),
+                     settings.get('maxStapleLen', 40),
+                     settings.get('tgtStapleLen', 35)]
+    stapleScorer = settings.get('stapleScorer', tgtLengthStapleScorer)
+    return tokenSignature(tokenList, oligo.isLoop(), staple_limits, stapleScorer)
 # end def
 
 def tokenizeOligo(oligo, settings):
     """
     Split the oligo into sub-tokens. Strands with insertions are not tokenized
-    and their full length is added.
+    and their full length is added to the current token, so that no break
+    falls on the xovers at either end of them.
     """
     tokenList = []
     minStapleLegLen = settings.get('minStapleLegLen', 2)
@@ -117,11 +234,30 @@ def tokenizeOligo(oligo, settings):
     if oligoL < 2*minStapleLen+1 or oligoL < minStapleLen:
         return tokenList
 
-    totalL = 0
-    strandGen = oligo.strand5p().generator3pStrand()
-    for strand in strandGen:
+    tokenList = strandTokens(oligo, minStapleLegLen)
+    if oligo.isLoop():
+        if len(tokenList) < 2:
+            return []
+        loop_token = tokenList.pop(-1)
+        tokenList[0] += loop_token
+
+    # print "check", sum(tokenList), "==", oligoL, totalL
+    if sum(tokenList) != oligoL:
+        oligo.applyColor("#ff3333", useUndoStack=False)
+        return []
+    assert(sum(tokenList) == oligoL)
+    return tokenList
+# end def
+
+def strandTokens(oligo, minStapleLegLen):
+    """
+    Returns the tokens of the strands of oligo, from its 5' end. Unlike in
+    tokenizeOligo, the last token of a loop is not yet folded into the
+    first.
+    """
+    tokenList = []
+    for strand in oligo.strand5p().generator3pStrand():
         a = strand.totalLength()
-        totalL += a
         # check length, and also for insertions
         if a > 2*minStapleLegLen-1 and not strand.hasInsertion():
             if len(tokenList) == 0:
@@ -134,64 +270,61 @@ def tokenizeOligo(oligo, settings):
                 a -= 1
             # end while
             tokenList.append(minStapleLegLen)
-        else:
+        elif len(tokenList) == 0:
             tokenList.append(a)
+        else:
+            tokenList[-1] = tokenList[-1] + a
         # end if
     # end for
-
-    if oligo.isLoop():
-        loop_token = tokenList.pop(-1)
-        tokenList[0] += loop_token
-
-    # print "check", sum(tokenList), "==", oligoL, totalL
-    if sum(tokenList) != oligoL:
-        oligo.applyColor("#ff3333", useUndoStack=False)
-        return []
-    assert(sum(tokenList) == oligoL)
     return tokenList
 # end def
 
 def nxPerformBreaks(oligo, breakItems, tokenList, startingToken, minStapleLegLen):
-    """ fullBreakptSoln is in the format of an IBS (see breakStrands).
-    This function performs the breaks proposed by the solution. """
+    """
+    Performs the breaks of a minimumPath solution for oligo: breakItems
+    are the staple lengths, starting after token startingToken of
+    tokenList for a loop. All the break positions are looked up before the
+    first split, so that the breaks stay on the bases of oligo.
+    """
+    if not breakItems:
+        return
+    oligoL = oligo.length()
+    positions = []  # break positions, counted from the 5' end of oligo
+    pos = 0
+    if oligo.isLoop():
+        # tokenList[0] starts with the last token of the loop, which
+        # wraps around the 5' end, so the first cut lies that much earlier
+        loopToken = strandTokens(oligo, minStapleLegLen)[-1]
+        pos = sum(tokenList[0:startingToken+1]) - loopToken
+        positions.append(pos)
+    for b in breakItems[0:-1]:
+        pos += b
+        positions.append(pos % oligoL if oligo.isLoop() else pos)
+    if not oligo.isLoop() and pos >= oligoL:
+        raise Exception("Oligo length %d is shorter than break length %d" % (oligoL, pos))
+
+    strand5p = oligo.strand5p()
+    breaks = []  # (strandSet, idx)
+    for pos in positions:
+        strand, idx, is5to3 = getStrandAtLengthInOligo(strand5p, pos)
+        breaks.append((strand.strandSet(), idx))
+
     part = oligo.part()
-    if breakItems:
-        util.beginSuperMacro(part, desc="Auto-Break")
-
-        # temp = []
-        # for s in oligo.strand5p().generator3pStrand():
-        #     temp.append(s.length())
-        # print "the segments", sum(temp), temp
-
-        # print "the sum is ", sum(breakList[1]), "==", oligo.length(), "isLoop", oligo.isLoop()
-        # print "the breakItems", breakItems
-
-        strand = oligo.strand5p()
-        if oligo.isLoop():
-            # start things off make first cut
-            length0 = sum(tokenList[0:startingToken+1])
-            strand, idx, is5to3 = getStrandAtLengthInOligo(strand, length0-minStapleLegLen)
-            sS = strand.strandSet()
-            found, sSIdx = sS.getStrandIndex(strand)
-            # found, overlap, sSIdx = sS._findIndexOfRangeFor(strand)
-            strand.split(idx, updateSequence=False)
-            strand = sS._strandList[sSIdx+1] if is5to3 else sS._strandList[sSIdx]
-
-        # now iterate through all the breaks
-        for b in breakItems[0:-1]:
-            if strand.oligo().length() > b:
-                strand, idx, is5to3 = getStrandAtLengthInOligo(strand, b)
-                sS = strand.strandSet()
-                found, sSIdx = sS.getStrandIndex(strand)
-                # found, overlap, sSIdx = sS._findIndexOfRangeFor(strand)
-                strand.split(idx, updateSequence=False)
-                strand = sS._strandList[sSIdx+1] if is5to3 else sS._strandList[sSIdx]
-            else:
-                raise Exception("Oligo length %d is shorter than break length %d" % (strand.oligo().length(), b))
+    util.beginSuperMacro(part, desc="Auto-Break")
+    try:
+        for sS, idx in breaks:
+            strand = sS.getStrand(idx)
+            if not strand.split(idx, updateSequence=False):
+                raise Exception("Can't break %s at %d" % (strand, idx))
+    finally:
         util.endSuperMacro(part)
 # end def
 
 def getStrandAtLengthInOligo(strandIn, length):
+    """
+    Returns (strand, idx, is5to3) of the last base of the first length
+    bases from the 5' end of strandIn, counting insertions and skips.
+    """
     strandGen = strandIn.generator3pStrand()
     strand = strandGen.next()
     assert(strand == strandIn)
@@ -200,16 +333,22 @@ def getStrandAtLengthInOligo(strandIn, length):
     while strandCounter < length:
         try:
             strand = strandGen.next()
-        except:
-            print "yikes: ", strand.connection3p(), strandCounter, length, strand.oligo().isLoop(), strandIn.oligo().length()
-            raise Exception
+        except StopIteration:
+            raise Exception("Oligo length %d is shorter than break length %d" % (strandCounter, length))
         strandCounter += strand.totalLength()
     # end while
     is5to3 = strand.isDrawn5to3()
     delta = strand.totalLength() - (strandCounter - length) - 1
-    idx5p = strand.idx5Prime()
-    # print "diff", delta, "idx5p", idx5p, "5to3", is5to3, "sCount", strandCounter, "L", length
-    outIdx = idx5p + delta if is5to3 else idx5p - delta
+    step = 1 if is5to3 else -1
+    outIdx = strand.idx5Prime()
+    if strand.hasInsertion():
+        # walk the bases, each one is 1 plus its insertion length long
+        covered = 1 + strand.insertionLengthBetweenIdxs(outIdx, outIdx)
+        while covered <= delta:
+            outIdx += step
+            covered += 1 + strand.insertionLengthBetweenIdxs(outIdx, outIdx)
+    else:
+        outIdx += step*delta
     return (strand, outIdx, is5to3)
 # end def
 
@@ -29,6 +29,7 @@ Created by Jonathan deWerd on 2012-01-19.
 import util, cadnano
 import autobreakconfig_ui
 import autobreak
+from multiprocessing import cpu_count
 util.qtWrapImport('QtGui', globals(), ['QDialog', 'QKeySequence', 'QDialogButtonBox'])
 util.qtWrapImport('QtCore', globals(), ['Qt'])
 
@@ -39,6 +40,8 @@ class AutobreakConfig(QDialog, autobreakconfig_ui.Ui_Dialog):
         self.handler = handler
         fb = self.buttonBox.button(QDialogButtonBox.Cancel)
         fb.setShortcut(QKeySequence(Qt.CTRL | Qt.Key_R ))
+        # solving in a pool forks the gui process, so it is opt-in
+        self.numWorkersSpinBox.setMaximum(cpu_count())
 
     def keyPressEvent(self, e):
         return QDialog.keyPressEvent(self, e)
@@ -54,6 +57,7 @@ class AutobreakConfig(QDialog, autobreakconfig_ui.Ui_Dialog):
                 'minStapleLegLen' : self.minLegLengthSpinBox.value(),\
                 'minStapleLen'    : self.minLengthSpinBox.value(),\
                 'maxStapleLen'    : self.maxLengthSpinBox.value(),\
+                'numWorkers'      : self.numWorkersSpinBox.value(),\
             }
             self.handler.win.pathGraphicsView.setViewportUpdateOn(False)
             # print "pre verify"
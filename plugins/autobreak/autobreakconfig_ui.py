@@ -17,7 +17,7 @@ except AttributeError:
 class Ui_Dialog(object):
     def setupUi(self, Dialog):
         Dialog.setObjectName(_fromUtf8("Dialog"))
-        Dialog.resize(297, 264)
+        Dialog.resize(297, 290)
         sizePolicy = QtGui.QSizePolicy(QtGui.QSizePolicy.Fixed, QtGui.QSizePolicy.Fixed)
         sizePolicy.setHorizontalStretch(0)
         sizePolicy.setVerticalStretch(0)
@@ -25,7 +25,7 @@ class Ui_Dialog(object):
         Dialog.setSizePolicy(sizePolicy)
         Dialog.setWindowTitle(QtGui.QApplication.translate("Dialog", "Dialog", None, QtGui.QApplication.UnicodeUTF8))
         self.layoutWidget = QtGui.QWidget(Dialog)
-        self.layoutWidget.setGeometry(QtCore.QRect(10, 0, 276, 251))
+        self.layoutWidget.setGeometry(QtCore.QRect(10, 0, 276, 277))
         self.layoutWidget.setObjectName(_fromUtf8("layoutWidget"))
         self.verticalLayout = QtGui.QVBoxLayout(self.layoutWidget)
         self.verticalLayout.setMargin(0)
@@ -75,6 +75,16 @@ class Ui_Dialog(object):
         self.minLegLengthSpinBox.setProperty("value", 3)
         self.minLegLengthSpinBox.setObjectName(_fromUtf8("minLegLengthSpinBox"))
         self.formLayout.setWidget(5, QtGui.QFormLayout.FieldRole, self.minLegLengthSpinBox)
+        self.numWorkersLabel = QtGui.QLabel(self.layoutWidget)
+        self.numWorkersLabel.setText(QtGui.QApplication.translate("Dialog", "worker processes", None, QtGui.QApplication.UnicodeUTF8))
+        self.numWorkersLabel.setObjectName(_fromUtf8("numWorkersLabel"))
+        self.formLayout.setWidget(6, QtGui.QFormLayout.LabelRole, self.numWorkersLabel)
+        self.numWorkersSpinBox = QtGui.QSpinBox(self.layoutWidget)
+        self.numWorkersSpinBox.setMinimum(1)
+        self.numWorkersSpinBox.setMaximum(64)
+        self.numWorkersSpinBox.setProperty("value", 1)
+        self.numWorkersSpinBox.setObjectName(_fromUtf8("numWorkersSpinBox"))
+        self.formLayout.setWidget(6, QtGui.QFormLayout.FieldRole, self.numWorkersSpinBox)
         self.verticalLayout.addLayout(self.formLayout)
         self.buttonBox = QtGui.QDialogButtonBox(self.layoutWidget)
         self.buttonBox.setOrientation(QtCore.Qt.Horizontal)
@@ -89,7 +99,8 @@ class Ui_Dialog(object):
         Dialog.setTabOrder(self.targetLengthSpinBox, self.minLengthSpinBox)
         Dialog.setTabOrder(self.minLengthSpinBox, self.maxLengthSpinBox)
         Dialog.setTabOrder(self.maxLengthSpinBox, self.minLegLengthSpinBox)
-        Dialog.setTabOrder(self.minLegLengthSpinBox, self.buttonBox)
+        Dialog.setTabOrder(self.minLegLengthSpinBox, self.numWorkersSpinBox)
+        Dialog.setTabOrder(self.numWorkersSpinBox, self.buttonBox)
 
     def retranslateUi(self, Dialog):
         pass
@@ -0,0 +1,127 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+"""
+solutioncache.py
+
+Bounded cache of autobreak solutions, keyed by token signature.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+
+def tokenSignature(tokenList, isLoop, staple_limits, stapleScorer):
+    """
+    Returns a compact key for a solution: a hash of the token list, the
+    loop flag, the staple limits and the name of the scorer.
+    """
+    scorerName = "%s.%s" % (getattr(stapleScorer, '__module__', None),
+                            getattr(stapleScorer, '__name__', stapleScorer))
+    sig = repr((tuple(tokenList), bool(isLoop), tuple(staple_limits), scorerName))
+    return hashlib.sha1(sig).hexdigest()
+# end def
+
+
+class SolutionCache(object):
+    """
+    An LRU-bounded mapping of tokenSignature to (breakItems, shortestScoreIdx).
+
+    get() counts hits and misses. The cache can be saved to and loaded from
+    a JSON file to reuse solutions between runs.
+    """
+    def __init__(self, maxSize=10000):
+        self._maxSize = maxSize
+        self._solutions = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    # end def
+
+    def __contains__(self, key):
+        return key in self._solutions
+
+    def __len__(self):
+        return len(self._solutions)
+
+    def __getitem__(self, key):
+        return self._solutions[key]
+
+    def __setitem__(self, key, solution):
+        solutions = self._solutions
+        if key in solutions:
+            del solutions[key]
+        solutions[key] = solution
+        while len(solutions) > self._maxSize:
+            solutions.popitem(last=False)  # drop least recently used
+    # end def
+
+    def get(self, key):
+        """Returns the solution for key, or None, and counts the lookup."""
+        solutions = self._solutions
+        solution = solutions.get(key)
+        if solution == None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # move to the most recently used end
+        del solutions[key]
+        solutions[key] = solution
+        return solution
+    # end def
+
+    def clear(self):
+        """Empties the cache and resets the counters."""
+        self._solutions.clear()
+        self.hits = 0
+        self.misses = 0
+    # end def
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._solutions), 'maxSize': self._maxSize}
+    # end def
+
+    def load(self, path):
+        """
+        Merges solutions saved by save() into the cache. A missing or
+        unreadable file leaves the cache as is.
+        """
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r') as f:
+                saved = json.load(f)
+        except (IOError, ValueError):
+            return
+        for key, (breakItems, shortestScoreIdx) in saved:
+            self[str(key)] = (breakItems, shortestScoreIdx)
+    # end def
+
+    def save(self, path):
+        """Writes the cache to path, least recently used first."""
+        with open(path, 'w') as f:
+            json.dump(self._solutions.items(), f, separators=(',', ':'))
+    # end def
+# end class
@@ -0,0 +1,120 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+"""
+staplebreaker.py
+
+Shortest path staple breaker over a token list, a drop-in replacement for
+staplegraph.minimumPath that needs no networkx.
+
+A token_list === list of sequencial lengths between potential break points
+(see autobreak.tokenizeOligo). Breaks fall on token boundaries, so a
+solution is a partition of the token list into consecutive runs, one run
+per staple. The same staples are allowed as the edges of a StapleGraph:
+    - the staple is longer than the minimum staple length
+    - the staple was still shorter than the maximum staple length before
+      its last token was added
+    - the staple spans fewer tokens than the whole list
+Each staple is weighted by a stapleScorer with the signature of
+autobreak.tgtLengthStapleScorer, and the minimum total weight partition is
+found with a single forward pass over the boundaries, which is linear in
+the number of tokens times the maximum staple length.
+"""
+
+# the DEFINE parameters address the staple_limits argument parameters
+MIN_IND = 0     # minimum length index
+MAX_IND = 1     # maximum length index
+OPT_IND = 2     # optimum length index
+
+
+def absLengthScorer(currentIBS, proposedNextBreakNode, settings):
+    """
+    The StapleGraph edge weight, the deviation from settings['tgtStapleLen'].
+    Used when no stapleScorer is passed to minimumPath.
+    """
+    stapleLen = proposedNextBreakNode[0] - currentIBS[2][0]
+    return abs(stapleLen - settings.get('tgtStapleLen', 35))
+# end def
+
+
+def minimumPath(tokenlist_and_staple_limits):
+    """
+    Takes a tuple (tokenList, staple_limits, idx[, stapleScorer[, settings]])
+    and returns (output, idx), where output is formatted like
+    StapleGraph.formatOutput:
+        [start_index, [L1, L2, ... LN], score]
+    and score is the summed stapleScorer weight of the staples.
+
+    Returns None if the tokens can't be broken into valid staples.
+    """
+    tokenList, staple_limits, idx = tokenlist_and_staple_limits[0:3]
+    stapleScorer = absLengthScorer
+    settings = {}
+    if len(tokenlist_and_staple_limits) > 3:
+        stapleScorer = tokenlist_and_staple_limits[3]
+    if len(tokenlist_and_staple_limits) > 4:
+        settings = dict(tokenlist_and_staple_limits[4])
+    minLen = staple_limits[MIN_IND]
+    maxLen = staple_limits[MAX_IND]
+    settings['tgtStapleLen'] = staple_limits[OPT_IND]
+
+    numTokens = len(tokenList)
+    # positions of the token boundaries in the oligo
+    pos = [0] * (numTokens + 1)
+    for i, token in enumerate(tokenList):
+        pos[i + 1] = pos[i] + token
+
+    # best[j] is the lowest total score to break tokens [0, j) into
+    # staples, prev[j] is the boundary at which the last of those starts
+    best = [None] * (numTokens + 1)
+    prev = [None] * (numTokens + 1)
+    best[0] = 0
+    for j in xrange(1, numTokens + 1):
+        endNode = (pos[j],)
+        lastStart = pos[j - 1]
+        bestJ, prevJ = None, None
+        i = j - 1
+        # walk back while the staple, minus its last token, is short enough
+        while i >= 0 and lastStart - pos[i] < maxLen and j - i < numTokens:
+            if best[i] != None and pos[j] - pos[i] > minLen:
+                score = best[i] + \
+                        stapleScorer((None, None, (pos[i],)), endNode, settings)
+                if bestJ == None or score < bestJ:
+                    bestJ, prevJ = score, i
+            i -= 1
+        # end while
+        best[j], prev[j] = bestJ, prevJ
+    # end for
+
+    if numTokens == 0 or best[numTokens] == None:
+        return None
+    lengths = []
+    j = numTokens
+    while j > 0:
+        i = prev[j]
+        lengths.append(pos[j] - pos[i])
+        j = i
+    lengths.reverse()
+    return ([0, lengths, best[numTokens]], idx)
+# end def
@@ -0,0 +1,173 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+"""
+autobreaktests.py
+
+Headless tests of the autobreak plugin: the staplebreaker solver against
+the networkx StapleGraph it replaced, and autostaple followed by
+autobreak, one oligo at a time and with breakStaples, on the functional
+test designs.
+
+Run these tests by calling "python -m tests.autobreaktests" from cadnano2
+root directory.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import glob
+import random
+import unittest
+
+import cadnano
+cadnano.initAppWithoutGui([])
+
+from model.document import Document
+from model.enum import LatticeType
+from model.io.decoder import decode
+
+autobreak = cadnano.plugin('autobreak').autobreak
+staplebreaker = autobreak.staplebreaker
+
+DESIGNS = sorted(glob.glob('tests/functionaltestinputs/*.json'))
+
+SETTINGS = {'stapleScorer': autobreak.tgtLengthStapleScorer,
+            'minStapleLegLen': 2,
+            'minStapleLen': 30,
+            'maxStapleLen': 40,
+            'tgtStapleLen': 35}
+
+
+def autostapledPart(path):
+    document = Document()
+    with open(path, 'rb') as f:
+        decode(document, f, LatticeType.Honeycomb)
+    part = document.selectedPart()
+    part.autoStaple()
+    return part
+# end def
+
+
+def stapleLengths(part):
+    return sorted(o.length() for o in part.oligos() if o.isStaple())
+# end def
+
+
+def expectedStapleLengths(part, settings):
+    """
+    The staple lengths breakStaples should leave: the solved lengths of
+    each breakable staple oligo, and the length of the others.
+    """
+    lengths = []
+    for o in part.oligos():
+        if not o.isStaple():
+            continue
+        tokenList = autobreak.tokenizeOligo(o, settings)
+        solution = None
+        if tokenList:
+            solution = autobreak.bestSolution(map(staplebreaker.minimumPath,
+                        autobreak.stapleTokenLists(o, tokenList, settings)))
+        if solution:
+            lengths.extend(solution[0])
+        else:
+            lengths.append(o.length())
+    return sorted(lengths)
+# end def
+
+
+class AutobreakTests(unittest.TestCase):
+    def testMinimumPathMatchesStapleGraph(self):
+        """staplebreaker finds staples as good as the networkx StapleGraph"""
+        try:
+            staplegraph = __import__('autobreak.staplegraph',
+                                     fromlist=['minimumPath'])
+        except ImportError:
+            return  # no networkx to compare with
+        rand = random.Random(0)
+        for i in xrange(200):
+            tokenList = [rand.choice((1, 1, 1, 2, 3, 5, 8, 13))
+                         for j in xrange(rand.randint(1, 40))]
+            arg = (tokenList, [12, 20, 16], i)
+            expected = staplegraph.minimumPath(arg)
+            result = staplebreaker.minimumPath(arg)
+            if expected == None:
+                self.assertEqual(result, None, tokenList)
+                continue
+            self.assertNotEqual(result, None, tokenList)
+            (start, lengths, score), idx = result
+            self.assertEqual((start, score, idx),
+                             (expected[0][0], expected[0][2], expected[1]))
+            # the staples partition the tokens
+            self.assertEqual(sum(lengths), sum(tokenList))
+            boundaries = set(sum(tokenList[:j])
+                             for j in xrange(len(tokenList) + 1))
+            for j in xrange(len(lengths)):
+                self.assertTrue(sum(lengths[:j + 1]) in boundaries)
+    # end def
+
+    def testBreakFunctionalDesigns(self):
+        """autostaple and autobreak leave the solved staples of each design"""
+        for path in DESIGNS:
+            part = autostapledPart(path)
+            expected = expectedStapleLengths(part, SETTINGS)
+            for o in sorted(part.oligos(), key=autobreak.oligoSortKey):
+                if o.isStaple() and o in part.oligos():
+                    autobreak.nxBreakStaple(o, SETTINGS)
+            self.assertEqual(stapleLengths(part), expected, path)
+    # end def
+
+    def testBreakStaplesOnFunctionalDesigns(self):
+        """breakStaples, serial and in a pool, on each design"""
+        for numWorkers in (1, 2):
+            settings = dict(SETTINGS, numWorkers=numWorkers)
+            autobreak.clearTokenCache()
+            for path in DESIGNS:
+                part = autostapledPart(path)
+                expected = expectedStapleLengths(part, settings)
+                autobreak.breakStaples(part, settings)
+                self.assertEqual(stapleLengths(part), expected, path)
+                self.assertEqual(part.undoStack().macroStack, [])
+    # end def
+
+    def testBreakStaplesClosesMacroOnError(self):
+        """a failing break leaves no Auto-Break macro open"""
+        part = autostapledPart(DESIGNS[0])
+        def failingPerformBreaks(*args):
+            raise ValueError("break failed")
+        performBreaks = autobreak.nxPerformBreaks
+        autobreak.nxPerformBreaks = failingPerformBreaks
+        try:
+            self.assertRaises(ValueError,
+                              autobreak.breakStaples, part, SETTINGS)
+        finally:
+            autobreak.nxPerformBreaks = performBreaks
+        self.assertEqual(part.undoStack().macroStack, [])
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+"""
+batchtests.py
+
+Runs the headless batch command line on small designs.
+
+Run these tests by calling "python -m tests.batchtests" from cadnano2
+root directory.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import csv
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import cadnano
+cadnano.initAppWithoutGui([])
+
+import cadnanobatch
+from model.document import Document
+from model.enum import LatticeType
+from model.io.decoder import decode
+
+INPUTS = 'tests/functionaltestinputs/'
+PIPELINE = ['batch', '--autostaple', '--autobreak', '--export-staples',
+            '--sequence', 'p7308', '--save', 'json', '-j', '1']
+
+
+def squareDesign(numBases=32):
+    """
+    Returns a legacy design of one square lattice helix, with a scaffold
+    and a staple strand across all its bases.
+    """
+    scaf = [[0, i - 1, 0, i + 1] for i in xrange(numBases)]
+    stap = [[0, i + 1, 0, i - 1] for i in xrange(numBases)]
+    scaf[0][:2] = scaf[-1][2:] = stap[0][2:] = stap[-1][:2] = [-1, -1]
+    helix = {'num': 0, 'row': 0, 'col': 0, 'scaf': scaf, 'stap': stap,
+             'loop': [0] * numBases, 'skip': [0] * numBases,
+             'stap_colors': [], 'scafLoop': [], 'stapLoop': []}
+    return {'name': 'square', 'vstrands': [helix]}
+# end def
+
+
+class BatchTests(unittest.TestCase):
+    def setUp(self):
+        self.outputDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.outputDir)
+
+    def runBatch(self, args):
+        """Returns the exit status and output of cadnanobatch.main(args)."""
+        stdout = sys.stdout
+        sys.stdout = output = StringIO()
+        try:
+            status = cadnanobatch.main(args + ['--output-dir', self.outputDir])
+        finally:
+            sys.stdout = stdout
+        return status, output.getvalue()
+    # end def
+
+    def outputFile(self, name):
+        return os.path.join(self.outputDir, name)
+
+    def testPipeline(self):
+        """autostaple, autobreak, sequence, csv and json of a design"""
+        status, output = self.runBatch(PIPELINE +
+                                       [INPUTS + 'loops_and_skips.json'])
+        self.assertEqual(status, 0, output)
+        with open(self.outputFile('loops_and_skips.csv'), 'rb') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["Start", "End", "Sequence", "Length",
+                                   "Color"])
+        self.assertTrue(len(rows) > 1)
+        for row in rows[1:]:
+            self.assertEqual(len(row[2]), int(row[3]))
+            self.assertFalse('?' in row[2])
+        document = Document()
+        with open(self.outputFile('loops_and_skips.json'), 'rb') as f:
+            decode(document, f)
+        self.assertNotEqual(document.selectedPart(), None)
+    # end def
+
+    def testCircularStaplesAreLeftOut(self):
+        """circular staples are reported and left out, the rest is saved"""
+        status, output = self.runBatch(PIPELINE +
+                                       [INPUTS + 'Nature09_squarenut.json'])
+        self.assertEqual(status, 0, output)
+        self.assertTrue('circular staples left out' in output, output)
+        self.assertTrue(os.path.exists(
+                                self.outputFile('Nature09_squarenut.csv')))
+        self.assertTrue(os.path.exists(
+                                self.outputFile('Nature09_squarenut.json')))
+    # end def
+
+    def testWrongLatticeFails(self):
+        """a design read with the wrong lattice fails and isn't saved"""
+        path = self.outputFile('squarenut.json')
+        shutil.copy(INPUTS + 'Nature09_squarenut.json', path)
+        with open(path, 'rb') as f:
+            original = f.read()
+        status, output = self.runBatch(['batch', '-j', '1', '--lattice',
+                                        'square', '--save', 'json', path])
+        self.assertEqual(status, 1, output)
+        self.assertTrue("FAILED" in output, output)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), original)
+    # end def
+
+    def testLatticeIsInferred(self):
+        """without --lattice, the lattice follows the helix length"""
+        path = self.outputFile('square.json')
+        with open(path, 'w') as f:
+            json.dump(squareDesign(), f)
+        status, output = self.runBatch(['batch', '-j', '1', '--suffix',
+                                        '_out', '--save', 'json', path])
+        self.assertEqual(status, 0, output)
+        document = Document()
+        with open(self.outputFile('square_out.json'), 'rb') as f:
+            decode(document, f, LatticeType.Square)
+        part = document.selectedPart()
+        self.assertEqual(part.crossSectionType(), LatticeType.Square)
+        self.assertEqual(sum(o.length() for o in part.oligos()), 64)
+        status, output = self.runBatch(['batch', '-j', '1', '--lattice',
+                                        'honeycomb', path])
+        self.assertEqual(status, 1, output)
+    # end def
+
+    def testFailureStatus(self):
+        """a design that can't be read fails, and the others still run"""
+        missing = self.outputFile('missing.json')
+        status, output = self.runBatch(['batch', '-j', '1', missing,
+                                        INPUTS + 'skip.json'])
+        self.assertEqual(status, 1)
+        self.assertTrue("1 of 2 designs processed" in output, output)
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
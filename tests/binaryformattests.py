@@ -0,0 +1,158 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+"""
+binaryformattests.py
+
+Headless tests of the binary document format: json designs saved as .cnb
+and read back must save to the same json, and damaged files must be
+rejected.
+
+Run these tests by calling "python -m tests.binaryformattests" from
+cadnano2 root directory.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import glob
+import json
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import cadnano
+cadnano.initAppWithoutGui([])
+
+from model.document import Document
+from model.enum import LatticeType
+from model.io.decoder import decode
+from model.io.encoder import encode
+from model.io import binaryformat
+from model.io.binaryformat import encode_binary, is_binary, import_binary
+
+DESIGNS = sorted(glob.glob('tests/functionaltestinputs/*.json'))
+SMALL_DESIGN = 'tests/functionaltestinputs/loops_and_skips.json'
+
+
+def loadJson(path):
+    """Returns the document of the json design at path and its helix order."""
+    document = Document()
+    with open(path, 'rb') as f:
+        decode(document, f, LatticeType.Honeycomb)
+    with open(path, 'rb') as f:
+        order = [(h['row'], h['col']) for h in json.load(f)['vstrands']]
+    return document, order
+# end def
+
+
+def jsonString(document, order, name):
+    f = StringIO()
+    f.name = name
+    encode(document, order, f)
+    return f.getvalue()
+# end def
+
+
+def binaryString(document, order, name):
+    f = StringIO()
+    f.name = name
+    encode_binary(document, order, f)
+    return f.getvalue()
+# end def
+
+
+class BinaryFormatTests(unittest.TestCase):
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def testRoundTrip(self):
+        """json -> .cnb -> json is lossless for each design"""
+        for path in DESIGNS:
+            document, order = loadJson(path)
+            name = os.path.basename(path)
+            expected = jsonString(document, order, name)
+            # through a real file, which is memory mapped
+            cnbPath = os.path.join(self.tempDir, 'design.cnb')
+            with open(cnbPath, 'wb') as f:
+                encode_binary(document, order, f)
+            fromFile = Document()
+            with open(cnbPath, 'rb') as f:
+                decode(fromFile, f)
+            self.assertEqual(jsonString(fromFile, order, name), expected, path)
+            # and from a string
+            fromString = Document()
+            with open(cnbPath, 'rb') as f:
+                decode(fromString, f.read())
+            self.assertEqual(jsonString(fromString, order, name), expected, path)
+    # end def
+
+    def testIsBinary(self):
+        """is_binary tells .cnb from json, without moving the file position"""
+        document, order = loadJson(SMALL_DESIGN)
+        data = binaryString(document, order, 'design.cnb')
+        self.assertTrue(is_binary(data))
+        with open(SMALL_DESIGN, 'rb') as f:
+            self.assertFalse(is_binary(f.read()))
+        f = StringIO(data)
+        f.seek(3)
+        self.assertFalse(is_binary(f))
+        self.assertEqual(f.tell(), 3)
+        f.seek(0)
+        self.assertTrue(is_binary(f))
+        self.assertEqual(f.tell(), 0)
+        self.assertFalse(is_binary(''))
+    # end def
+
+    def testTruncatedInput(self):
+        """every truncation of a file is rejected with a ValueError"""
+        document, order = loadJson(SMALL_DESIGN)
+        data = binaryString(document, order, 'design.cnb')
+        for size in xrange(len(binaryformat.MAGIC), len(data)):
+            self.assertRaises(ValueError, import_binary,
+                              Document(), data[:size])
+    # end def
+
+    def testWrongVersion(self):
+        """files of an unknown version are rejected with a ValueError"""
+        document, order = loadJson(SMALL_DESIGN)
+        data = binaryString(document, order, 'design.cnb')
+        offset = len(binaryformat.MAGIC)
+        for version in (0, binaryformat.VERSION + 1):
+            damaged = data[:offset] + struct.pack('<i', version) + \
+                      data[offset + 4:]
+            self.assertRaises(ValueError, import_binary, Document(), damaged)
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
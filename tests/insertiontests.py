@@ -0,0 +1,164 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+
+"""
+insertiontests.py
+
+Tests of the InsertionIndex range queries against a scan of every
+insertion, including skips, length changes, removals and shifts.
+
+Run these tests by calling "python -m tests.insertiontests" from cadnano2
+root directory.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import random
+import unittest
+
+from model.decorators.insertion import Insertion, InsertionIndex
+
+SIZE = 64  # bases per test helix
+
+
+def scanBetween(insertions, idxL, idxH):
+    return sorted((i for i in insertions.itervalues()
+                   if idxL <= i.idx() <= idxH), key=Insertion.idx)
+# end def
+
+
+def scanLengthBetween(insertions, idxL, idxH):
+    return sum(i.length() for i in scanBetween(insertions, idxL, idxH))
+# end def
+
+
+def scanExpandedIdx(insertions, idx):
+    return idx + sum(i.length() for i in insertions.itervalues()
+                     if i.idx() < idx)
+# end def
+
+
+class InsertionIndexTests(unittest.TestCase):
+    def assertMatchesScan(self, insertions):
+        for idxL in xrange(-2, SIZE + 2):
+            self.assertEqual(insertions.expandedIdx(idxL),
+                             scanExpandedIdx(insertions, idxL))
+            for idxH in xrange(idxL - 1, SIZE + 2):
+                self.assertEqual(insertions.insertionsBetween(idxL, idxH),
+                                 scanBetween(insertions, idxL, idxH))
+                self.assertEqual(insertions.lengthBetween(idxL, idxH),
+                                 scanLengthBetween(insertions, idxL, idxH))
+        for idx, insertion in insertions.iteritems():
+            self.assertEqual(insertion.idx(), idx)
+    # end def
+
+    def testEmpty(self):
+        """an empty index has no insertions and expands nothing"""
+        self.assertMatchesScan(InsertionIndex())
+    # end def
+
+    def testInsertionsAndSkips(self):
+        """queries over insertions and skips match a scan"""
+        insertions = InsertionIndex()
+        for idx, length in ((3, 2), (4, -1), (10, 5), (11, -1), (40, 1)):
+            insertions[idx] = Insertion(idx, length)
+        self.assertMatchesScan(insertions)
+    # end def
+
+    def testSetLength(self):
+        """lengths changed on the index or on the insertion are seen"""
+        insertions = InsertionIndex()
+        for idx in (5, 20, 33):
+            insertions[idx] = Insertion(idx, 1)
+        self.assertMatchesScan(insertions)
+        insertions.setInsertionLength(20, 7)
+        self.assertMatchesScan(insertions)
+        insertions[33].setLength(-1)
+        self.assertMatchesScan(insertions)
+        self.assertEqual(insertions.lengthBetween(0, SIZE), 7)
+    # end def
+
+    def testRemoveAndReAdd(self):
+        """an insertion removed and added again is counted once"""
+        insertions = InsertionIndex()
+        for idx in (5, 20, 33):
+            insertions[idx] = Insertion(idx, 2)
+        self.assertMatchesScan(insertions)
+        removed = insertions.pop(20)
+        self.assertMatchesScan(insertions)
+        removed.setLength(4)  # no longer in the index
+        self.assertEqual(insertions.lengthBetween(0, SIZE), 4)
+        insertions[20] = removed
+        self.assertMatchesScan(insertions)
+        del insertions[5]
+        insertions[5] = Insertion(5, -1)
+        self.assertMatchesScan(insertions)
+        self.assertEqual(insertions.lengthBetween(0, SIZE), 5)
+    # end def
+
+    def testShiftIdxs(self):
+        """shifted insertions keep their lengths at their new idxs"""
+        insertions = InsertionIndex()
+        for idx, length in ((3, 2), (4, -1), (30, 5)):
+            insertions[idx] = Insertion(idx, length)
+        insertions.lengthBetween(0, SIZE)  # build the sums
+        insertions.shiftIdxs(6)
+        self.assertEqual(sorted(insertions.keys()), [9, 10, 36])
+        self.assertMatchesScan(insertions)
+        insertions[36].setLength(1)
+        self.assertMatchesScan(insertions)
+        insertions.shiftIdxs(-9)
+        self.assertEqual(sorted(insertions.keys()), [0, 1, 27])
+        self.assertMatchesScan(insertions)
+    # end def
+
+    def testRandomEdits(self):
+        """queries match a scan after each of a random series of edits"""
+        rand = random.Random(0)
+        insertions = InsertionIndex()
+        for i in xrange(200):
+            idx = rand.randrange(SIZE)
+            edit = rand.random()
+            if idx in insertions and edit < 0.3:
+                del insertions[idx]
+            elif idx in insertions and edit < 0.6:
+                insertions[idx].setLength(rand.choice((-1, 1, 2, 6)))
+            elif idx in insertions:
+                insertions.setInsertionLength(idx, rand.choice((-1, 1, 3)))
+            else:
+                insertions[idx] = Insertion(idx, rand.choice((-1, 1, 4)))
+            self.assertEqual(insertions.lengthBetween(0, SIZE),
+                             scanLengthBetween(insertions, 0, SIZE))
+            if i % 20 == 0:
+                self.assertMatchesScan(insertions)
+        self.assertMatchesScan(insertions)
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
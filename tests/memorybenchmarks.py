@@ -0,0 +1,138 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+"""
+memorybenchmarks.py
+
+Measures the bytes held per Strand and per Insertion of an autostapled
+design, against the instance layout they had before __slots__ (an
+instance dictionary holding six bound method aliases and two empty
+decorator and modifier dictionaries). OldStrand and OldInsertion rebuild
+that layout; measured on the tree before __slots__, the real instances
+held the same number of bytes.
+
+Run them by calling "python -m tests.memorybenchmarks [design.json]" from
+cadnano2 root directory.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import cadnano
+cadnano.initAppWithoutGui([])
+
+from model.document import Document
+from model.enum import LatticeType
+from model.io.decoder import decode
+from model.decorators.insertion import Insertion
+
+DEFAULT_DESIGN = 'tests/functionaltestinputs/Science09_beachball_v1.json'
+
+
+### PREVIOUS LAYOUTS ###
+class OldStrand(object):
+    """The instance dictionary of a Strand before __slots__."""
+    def __init__(self, strand):
+        self.__dict__.update((name, getattr(strand, name))
+                             for name in type(strand).__slots__)
+        self._decorators = {}
+        self._modifiers = {}
+        # the per instance bound method aliases
+        self.idx5Prime = self.lowIdx
+        self.idx3Prime = self.highIdx
+        self.connectionLow = self.connection5p
+        self.connectionHigh = self.connection3p
+        self.setConnectionLow = self.setConnection5p
+        self.setConnectionHigh = self.setConnection3p
+
+    def lowIdx(self): pass
+    def highIdx(self): pass
+    def connection5p(self): pass
+    def connection3p(self): pass
+    def setConnection5p(self, strand): pass
+    def setConnection3p(self, strand): pass
+
+
+class OldInsertion(object):
+    def __init__(self, insertion):
+        self._length = insertion.length()
+        self._index = insertion.idx()
+
+
+def instanceBytes(obj):
+    """
+    The size of obj together with the containers only it references: its
+    instance dictionary, bound methods stored in it and empty dictionaries.
+    Shared objects such as neighbouring strands or the oligo aren't counted.
+    """
+    size = sys.getsizeof(obj)
+    values = []
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+        values = obj.__dict__.values()
+    for slot in getattr(type(obj), '__slots__', ()):
+        if hasattr(obj, slot):
+            values.append(getattr(obj, slot))
+    for value in values:
+        if hasattr(value, 'im_self') and value.im_self is obj:
+            size += sys.getsizeof(value)
+        elif isinstance(value, dict) and not value:
+            size += sys.getsizeof(value)
+    return size
+# end def
+
+
+def main(path=DEFAULT_DESIGN):
+    document = Document()
+    with open(path, 'rb') as f:
+        decode(document, f, LatticeType.Honeycomb)
+    part = document.selectedPart()
+    part.autoStaple()
+
+    strands = []
+    for vh in part.getVirtualHelices():
+        for strandSet in (vh.scaffoldStrandSet(), vh.stapleStrandSet()):
+            strands.extend(strandSet)
+    insertions = [insertion for insertionDict in part.insertions().values()
+                            for insertion in insertionDict.values()]
+
+    cases = [("Strand", strands, OldStrand),
+             ("Insertion", insertions, OldInsertion)]
+    print "%-10s %8s %14s %14s %8s" % ("object", "count", "before (B/obj)",
+                                       "after (B/obj)", "saved")
+    for name, objs, oldCls in cases:
+        if not objs:
+            continue
+        before = sum(instanceBytes(oldCls(obj)) for obj in objs)
+        after = sum(instanceBytes(obj) for obj in objs)
+        print "%-10s %8d %14.1f %14.1f %7.0f%%" % (name, len(objs),
+                                                  float(before) / len(objs),
+                                                  float(after) / len(objs),
+                                                  100. * (before - after) / before)
+# end def
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,186 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+"""
+parttests.py
+
+Headless tests of autoStaple and of the deferred oligo updates it uses,
+and of the per helix cache of crossover candidates.
+
+Run these tests by calling "python -m tests.parttests" from cadnano2
+root directory.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import unittest
+
+import cadnano
+cadnano.initAppWithoutGui([])
+
+from model.document import Document
+from model.enum import LatticeType
+from model.io.decoder import decode
+from model.oligo import Oligo
+
+DESIGN = 'tests/functionaltestinputs/Nature09_squarenut.json'
+
+
+def loadPart(path=DESIGN):
+    document = Document()
+    with open(path, 'rb') as f:
+        decode(document, f, LatticeType.Honeycomb)
+    return document.selectedPart()
+# end def
+
+
+def freeRange(part, length):
+    """
+    Returns a strandSet and the lowest (lo, hi) range of length bases
+    without strands in it, scanning every strand.
+    """
+    for vh in part.getVirtualHelices():
+        for strandSet in (vh.stapleStrandSet(), vh.scaffoldStrandSet()):
+            for lo in xrange(part.maxBaseIdx() - length + 2):
+                hi = lo + length - 1
+                if not any(s.lowIdx() <= hi and lo <= s.highIdx()
+                           for s in strandSet):
+                    return strandSet, lo, hi
+    return None
+# end def
+
+
+class PartTests(unittest.TestCase):
+    def testAutoStapleEndsDeferredUpdatesOnError(self):
+        """an exception in autoStaple leaves no deferred updates or macro"""
+        part = loadPart()
+        def failingCrossoverList(vh):
+            raise ValueError("no crossovers")
+        part.potentialCrossoverList = failingCrossoverList
+        self.assertRaises(ValueError, part.autoStaple)
+        self.assertFalse(part._oligoUpdatesDeferred)
+        self.assertEqual(part.undoStack().macroStack, [])
+        for vh in part.getVirtualHelices():
+            for strand in vh.stapleStrandSet():
+                self.assertTrue(strand.oligo() in part.oligos())
+    # end def
+
+    def testAutoStapleUndo(self):
+        """undoing autoStaple restores the imported staples"""
+        part = loadPart()
+        before = sorted(o.length() for o in part.oligos() if o.isStaple())
+        part.autoStaple()
+        part.undoStack().undo()
+        after = sorted(o.length() for o in part.oligos() if o.isStaple())
+        self.assertEqual(after, before)
+    # end def
+
+    def testRebuildOligosUndoRestoresWalkedStrandSets(self):
+        """undoing rebuildOligos restores strands reached through xovers"""
+        part = loadPart()
+        part.autoStaple()
+        # a staple strandset with a xover into another helix
+        for vh in part.getVirtualHelices():
+            strandSet = vh.stapleStrandSet()
+            others = set(s.connection3p().strandSet() for s in strandSet
+                         if s.connection3p() != None) - set([strandSet])
+            if others:
+                break
+        otherStrands = [s for ss in others for s in ss]
+        # give the strands across the xovers oligos of their own
+        for strand in otherStrands:
+            strand.setOligo(Oligo(part))
+        oldOligos = [s.oligo() for s in otherStrands]
+        part.rebuildOligos([strandSet])
+        self.assertNotEqual([s.oligo() for s in otherStrands], oldOligos)
+        part.undoStack().undo()
+        self.assertEqual([s.oligo() for s in otherStrands], oldOligos)
+    # end def
+
+    def assertXoverCacheIsFresh(self, part):
+        """The cached crossover candidates equal a cold recomputation."""
+        vhs = part.getVirtualHelices()
+        cached = [part.potentialCrossoverList(vh) for vh in vhs]
+        cachedNear = [part.potentialCrossoverList(vh, 40) for vh in vhs]
+        part._clearXoverLUT()
+        self.assertEqual([part.potentialCrossoverList(vh) for vh in vhs],
+                         cached)
+        self.assertEqual([part.potentialCrossoverList(vh, 40) for vh in vhs],
+                         cachedNear)
+    # end def
+
+    def testXoverCacheFollowsEdits(self):
+        """crossover candidates are recomputed after each kind of edit"""
+        part = loadPart()
+        part.autoStaple()
+        undoStack = part.undoStack()
+        self.assertXoverCacheIsFresh(part)
+
+        # strands
+        strandSet, lo, hi = freeRange(part, 12)
+        strandSet.createStrand(lo, hi)
+        self.assertXoverCacheIsFresh(part)
+        strand = strandSet.getStrand(lo)
+        strand.resize((lo, hi - 3))
+        self.assertXoverCacheIsFresh(part)
+        self.assertTrue(strandSet.splitStrand(strand, lo + 4))
+        self.assertXoverCacheIsFresh(part)
+        strandSet.mergeStrands(strandSet.getStrand(lo),
+                               strandSet.getStrand(hi - 3))
+        self.assertXoverCacheIsFresh(part)
+        strandSet.removeStrand(strandSet.getStrand(lo))
+        self.assertXoverCacheIsFresh(part)
+        for i in xrange(5):
+            undoStack.undo()
+            self.assertXoverCacheIsFresh(part)
+        for i in xrange(5):
+            undoStack.redo()
+            self.assertXoverCacheIsFresh(part)
+
+        # xovers
+        strand5p = [s for vh in part.getVirtualHelices()
+                    for s in vh.stapleStrandSet()
+                    if s.connection3p() != None and
+                    s.connection3p().virtualHelix() != vh][0]
+        strand3p = strand5p.connection3p()
+        part.removeXover(strand5p, strand3p)
+        self.assertXoverCacheIsFresh(part)
+        undoStack.undo()
+        self.assertXoverCacheIsFresh(part)
+        undoStack.redo()
+        self.assertXoverCacheIsFresh(part)
+        part.createXover(strand5p, strand5p.idx3Prime(),
+                         strand3p, strand3p.idx5Prime())
+        self.assertEqual(strand5p.connection3p(), strand3p)
+        self.assertXoverCacheIsFresh(part)
+        undoStack.undo()
+        self.assertXoverCacheIsFresh(part)
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,6 +17,7 @@ from xmlrunner import XMLTestRunner
 # from unittests import UnitTests
 # from modeltests import ModelTests
 from functionaltests import FunctionalTests
+from startuptests import StartupTests
 # from recordedtests.template import RecordedTests
 
 def main(useXMLRunner=True):
@@ -24,10 +25,11 @@ def main(useXMLRunner=True):
     # unitsuite = unittest.makeSuite(UnitTests)
     # modelsuite = unittest.makeSuite(ModelTests)
     funsuite = unittest.makeSuite(FunctionalTests)
+    startupsuite = unittest.makeSuite(StartupTests)
 
     # combine and run tests
     # alltests = unittest.TestSuite([unitsuite, modelsuite, funsuite])
-    alltests = unittest.TestSuite([funsuite])
+    alltests = unittest.TestSuite([funsuite, startupsuite])
     if useXMLRunner:
         stream = file("testresults.xml", "w")
         runner = XMLTestRunner(stream)
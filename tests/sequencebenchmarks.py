@@ -0,0 +1,145 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+"""
+sequencebenchmarks.py
+
+Micro-benchmarks of model.sequencetools against the util.py helpers it
+replaced, called once per sequence as their callers did.
+
+Run them by calling "python -m tests.sequencebenchmarks" from cadnano2 root
+directory.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import string
+import timeit
+from data.dnasequences import sequences
+from model import sequencetools
+
+### PREVIOUS IMPLEMENTATIONS ###
+# the sequence helpers of util.py before model.sequencetools
+def oldStrToDna(seqStr):
+    """Returns str having been reduced to capital ACTG."""
+    return "".join([c for c in seqStr if c in 'ACGTacgt']).upper()
+
+complement = string.maketrans('ACGTacgt','TGCATGCA')
+def oldRcomp(seqStr):
+    """Returns the reverse complement of the sequence in seqStr."""
+    return seqStr.translate(complement)[::-1]
+def oldComp(seqStr):
+    """Returns the complement of the sequence in seqStr."""
+    return seqStr.translate(complement)
+
+whitetoQ = string.maketrans(' ','?')
+def oldMarkwhite(seqStr):
+    return seqStr.translate(whitetoQ)
+
+def oldNowhite(seqStr):
+    """Gets rid of whitespace in a string."""
+    return ''.join([c for c in seqStr if c in string.letters])
+
+
+# the per-strand loops and list joins the callers used
+def oldCompList(seqList):
+    return [oldComp(seq) if seq else None for seq in seqList]
+
+
+def oldRcompList(seqList):
+    return [oldRcomp(seq) if seq else None for seq in seqList]
+
+
+def oldMarkwhiteList(seqList):
+    return [oldMarkwhite(seq) if seq else None for seq in seqList]
+
+
+def oldBlanks(length):
+    return ''.join([' ' for x in range(length)])
+
+
+# util had no validation, GC content or melting temperature, these are
+# the plain python versions of them
+def oldIsValidSequence(seqStr):
+    return all(c in 'ACGTURYSWKMBDHVN-' for c in seqStr.upper())
+
+
+def oldGcContent(seqStr):
+    bases = oldStrToDna(seqStr)
+    return len([c for c in bases if c in 'GC']) / float(len(bases))
+
+
+def oldMeltingTemp(seqStr):
+    bases = oldStrToDna(seqStr)
+    gc = len([c for c in bases if c in 'GC'])
+    return 64.9 + 41.0 * (gc - 16.4) / len(bases)
+
+
+def main(repeat=3, number=20):
+    scaffold = sequences['p7308']
+    rawScaffold = '\n'.join(scaffold[i:i + 60]
+                            for i in xrange(0, len(scaffold), 60)).lower()
+    lowerScaffold = scaffold.lower()
+    # roughly the strands of a scaffold: 32 base pieces, some unset
+    strandSeqs = [scaffold[i:i + 32] for i in xrange(0, len(scaffold), 32)]
+    strandSeqs[::7] = [None] * len(strandSeqs[::7])
+    staples = [scaffold[i:i + 42] for i in xrange(0, len(scaffold), 42)]
+
+    cases = [
+        ("strToDna", lambda: oldStrToDna(rawScaffold),
+                     lambda: sequencetools.strToDna(rawScaffold)),
+        ("nowhite", lambda: oldNowhite(rawScaffold),
+                    lambda: sequencetools.nowhite(rawScaffold)),
+        ("compList", lambda: oldCompList(strandSeqs),
+                     lambda: sequencetools.compList(strandSeqs)),
+        ("rcompList", lambda: oldRcompList(strandSeqs),
+                      lambda: sequencetools.rcompList(strandSeqs)),
+        ("markwhiteList", lambda: oldMarkwhiteList(strandSeqs),
+                          lambda: sequencetools.markwhiteList(strandSeqs)),
+        ("blank padding", lambda: oldBlanks(len(scaffold)),
+                   lambda: ' ' * len(scaffold)),
+        ("isValidSequence", lambda: oldIsValidSequence(lowerScaffold),
+                            lambda: sequencetools.isValidSequence(
+                                                        lowerScaffold)),
+        ("gcContentList", lambda: [oldGcContent(s) for s in staples],
+                          lambda: sequencetools.gcContentList(staples)),
+        ("meltingTempList", lambda: [oldMeltingTemp(s) for s in staples],
+                            lambda: sequencetools.meltingTempList(staples)),
+    ]
+    print "%-16s %12s %12s %8s" % ("benchmark", "before (ms)", "after (ms)",
+                                   "speedup")
+    for name, before, after in cases:
+        tBefore = min(timeit.repeat(before, repeat=repeat, number=number))
+        tAfter = min(timeit.repeat(after, repeat=repeat, number=number))
+        print "%-16s %12.3f %12.3f %7.1fx" % (name,
+                                              1000. * tBefore / number,
+                                              1000. * tAfter / number,
+                                              tBefore / tAfter)
+# end def
+
+
+if __name__ == "__main__":
+    main()
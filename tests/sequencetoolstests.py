@@ -0,0 +1,118 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+
+"""
+sequencetoolstests.py
+
+Tests of model.sequencetools against the sequence benchmarks' plain python
+versions, and of the sequence validation in Oligo.applySequence.
+
+Run these tests by calling "python -m tests.sequencetoolstests" from
+cadnano2 root directory.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import unittest
+
+import cadnano
+cadnano.initAppWithoutGui([])
+
+from data.dnasequences import sequences
+from model import sequencetools
+from model.document import Document
+from model.enum import LatticeType
+from model.io.decoder import decode
+from tests import sequencebenchmarks as old
+
+DESIGN = 'tests/functionaltestinputs/loops_and_skips.json'
+SEQUENCES = ['ACGTTGCA', 'acgtnnRYkm', 'GATTACA-', 'AAAATTTTCCGG' * 3,
+             'A C G\nT', u'GC\xe9AT', 'xyz']
+
+
+class SequenceToolsTests(unittest.TestCase):
+    def testMatchesOldHelpers(self):
+        """the translate helpers give what the util helpers gave"""
+        for seq in SEQUENCES + [sequences['p7308'][:100]]:
+            seq = str(seq.encode('ascii', 'ignore'))
+            self.assertEqual(sequencetools.strToDna(seq), old.oldStrToDna(seq))
+            self.assertEqual(sequencetools.nowhite(seq), old.oldNowhite(seq))
+            self.assertEqual(sequencetools.comp(seq), old.oldComp(seq))
+            self.assertEqual(sequencetools.rcomp(seq), old.oldRcomp(seq))
+            self.assertEqual(sequencetools.isValidSequence(seq),
+                             old.oldIsValidSequence(seq))
+            if sequencetools.strToDna(seq):
+                self.assertAlmostEqual(sequencetools.gcContent(seq),
+                                       old.oldGcContent(seq))
+    # end def
+
+    def testListVariants(self):
+        """the list variants keep their None entries"""
+        seqList = [None, 'ACGT', 'AC  ', None, 'GGGCCCAAATTTGGGCCCAAAT']
+        self.assertEqual(sequencetools.compList(seqList),
+                         old.oldCompList(seqList))
+        self.assertEqual(sequencetools.rcompList(seqList),
+                         old.oldRcompList(seqList))
+        self.assertEqual(sequencetools.markwhiteList(seqList),
+                         old.oldMarkwhiteList(seqList))
+        self.assertEqual(sequencetools.gcContentList(seqList),
+                         [None, 0.5, 0.5, None,
+                          sequencetools.gcContent(seqList[-1])])
+        tms = sequencetools.meltingTempList(seqList)
+        self.assertEqual(tms[:2], [None, 12.0])
+        self.assertAlmostEqual(tms[-1], old.oldMeltingTemp(seqList[-1]))
+    # end def
+
+    def testValidation(self):
+        """invalidChars reports the chars outside the alphabet, upper case"""
+        self.assertEqual(sequencetools.invalidChars('acgtNRY-'), '')
+        self.assertEqual(sequencetools.invalidChars('ACxG T'), 'X ')
+        self.assertFalse(sequencetools.isValidSequence('ACGU', 'ACGT'))
+        self.assertTrue(sequencetools.isValidSequence('acgu', 'ACGU'))
+    # end def
+
+    def testApplySequenceValidates(self):
+        """Oligo.applySequence rejects invalid sequences and changes nothing"""
+        document = Document()
+        with open(DESIGN, 'rb') as f:
+            decode(document, f, LatticeType.Honeycomb)
+        part = document.selectedPart()
+        scaffold = max((o for o in part.oligos() if not o.isStaple()),
+                       key=lambda o: o.length())
+        self.assertRaises(ValueError, scaffold.applySequence,
+                          'ACGTQ' * scaffold.length())
+        self.assertEqual(part.undoStack().count(), 0)
+        self.assertEqual(scaffold.sequence(), None)
+        scaffold.applySequence(sequences['p7308'])
+        self.assertEqual(scaffold.sequence(),
+                         sequences['p7308'][:scaffold.length()])
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+"""
+signaltests.py
+
+Tests of the pure python signals of dummyqt, in particular of the replay
+of emissions made while signals are suspended.
+
+Run these tests by calling "python -m tests.signaltests" from cadnano2
+root directory.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import unittest
+
+from dummyqt.QtCore import QObject, pyqtSignal, signalsSuspended
+
+
+class Emitter(QObject):
+    addedSignal = pyqtSignal(object)
+    removedSignal = pyqtSignal(object)
+# end class
+
+
+class SignalTests(unittest.TestCase):
+    def setUp(self):
+        self.emitter = Emitter()
+        self.heard = []
+        self.emitter.addedSignal.connect(
+                                lambda x: self.heard.append(('added', x)))
+        self.emitter.removedSignal.connect(
+                                lambda x: self.heard.append(('removed', x)))
+
+    def testEmit(self):
+        """connected slots are called at once when not suspended"""
+        self.emitter.addedSignal.emit(1)
+        self.assertEqual(self.heard, [('added', 1)])
+        Emitter().addedSignal.emit(1)  # nothing connected, nothing called
+        self.assertEqual(self.heard, [('added', 1)])
+    # end def
+
+    def testSuspendedEmissionsReplayInOrder(self):
+        """repeats with other emissions in between are all replayed"""
+        with signalsSuspended():
+            self.emitter.addedSignal.emit(1)
+            self.emitter.removedSignal.emit(1)
+            self.emitter.addedSignal.emit(1)
+            self.assertEqual(self.heard, [])
+        self.assertEqual(self.heard, [('added', 1), ('removed', 1),
+                                      ('added', 1)])
+    # end def
+
+    def testConsecutiveRepeatsCoalesce(self):
+        """an emission repeating the one just before it is replayed once"""
+        with signalsSuspended():
+            self.emitter.addedSignal.emit(1)
+            self.emitter.addedSignal.emit(1)
+            self.emitter.addedSignal.emit(2)
+            self.emitter.addedSignal.emit([3])  # unhashable arguments
+            self.emitter.addedSignal.emit([3])
+        self.assertEqual(self.heard, [('added', 1), ('added', 2),
+                                      ('added', [3])])
+    # end def
+
+    def testNestedSuspension(self):
+        """emissions are replayed when the outermost suspension ends"""
+        with signalsSuspended():
+            with signalsSuspended():
+                self.emitter.addedSignal.emit(1)
+            self.assertEqual(self.heard, [])
+        self.assertEqual(self.heard, [('added', 1)])
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
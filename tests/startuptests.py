@@ -0,0 +1,113 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+"""
+startuptests.py
+
+Startup time budget of headless cadnano, as used by batch workers.
+
+Run these tests by calling "python -m tests.startuptests" from cadnano2
+root directory. The budget can be changed with the
+CADNANO_STARTUP_BUDGET environment variable (in seconds).
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import json
+import os
+import subprocess
+import unittest
+
+STARTUP_BUDGET = float(os.environ.get('CADNANO_STARTUP_BUDGET', 2.0))
+
+# gui modules a headless start must not import
+GUI_MODULES = ('cadnanoqt', 'controllers', 'ui', 'views.pathview',
+               'views.sliceview', 'views.solidview', 'autobreak')
+
+# run in a fresh interpreter so nothing is imported yet
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.time()
+import cadnano
+cadnano.app()
+from model.document import Document
+from model.io.decoder import decode
+from model.io.encoder import encode
+elapsed = time.time() - start
+%s
+print json.dumps({'elapsed': elapsed,
+                  'modules': [m for m in sys.modules if sys.modules[m]]})
+"""
+
+
+def headlessStartup(extra=''):
+    """
+    Returns the seconds a fresh interpreter takes to start cadnano
+    headless, and the names of the modules it has imported after running
+    the extra statements.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output([sys.executable, '-c',
+                                      STARTUP_SCRIPT % extra], cwd=root)
+    result = json.loads(output.splitlines()[-1])
+    return result['elapsed'], result['modules']
+# end def
+
+
+def guiModules(modules):
+    return sorted(m for m in modules
+                  if m in GUI_MODULES or m.startswith(tuple(
+                                        g + '.' for g in GUI_MODULES)))
+# end def
+
+
+class StartupTests(unittest.TestCase):
+    def testHeadlessStartupBudget(self):
+        """import cadnano, cadnano.app() and the model io within budget"""
+        elapsed, modules = headlessStartup()
+        self.assertTrue(elapsed < STARTUP_BUDGET,
+                        "headless startup took %.2fs, the budget is %.2fs"
+                        % (elapsed, STARTUP_BUDGET))
+    # end def
+
+    def testHeadlessStartupImportsNoGui(self):
+        """no gui modules or plugins are imported by a headless start"""
+        elapsed, modules = headlessStartup()
+        self.assertEqual(guiModules(modules), [])
+    # end def
+
+    def testPluginLoadsOnFirstUse(self):
+        """plugins load on first use, without their gui"""
+        elapsed, modules = headlessStartup(
+                                "cadnano.plugin('autobreak').autobreak")
+        self.assertTrue('autobreak.autobreak' in modules)
+        self.assertFalse('autobreak.autobreakconfig' in modules)
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
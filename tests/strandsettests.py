@@ -0,0 +1,189 @@
+# The MIT License
+#
+# Copyright (c) 2011 Wyss Institute at Harvard University
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# http://www.opensource.org/licenses/mit-license.php
+
+
+
+"""
+strandsettests.py
+
+Tests of the StrandSet lookups (getStrand, hasStrandAt,
+getOverlappingStrands) and of the sorted bound lists behind them, against
+a scan of every strand.
+
+Run these tests by calling "python -m tests.strandsettests" from cadnano2
+root directory.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+import random
+import unittest
+
+import cadnano
+cadnano.initAppWithoutGui([])
+
+from model.document import Document
+from model.enum import LatticeType
+from model.io.decoder import decode
+
+DESIGN = 'tests/functionaltestinputs/Nature09_squarenut.json'
+
+
+def loadPart(path=DESIGN):
+    document = Document()
+    with open(path, 'rb') as f:
+        decode(document, f, LatticeType.Honeycomb)
+    return document.selectedPart()
+# end def
+
+
+def strandSets(part):
+    return [ss for vh in part.getVirtualHelices()
+               for ss in (vh.scaffoldStrandSet(), vh.stapleStrandSet())]
+# end def
+
+
+def scanOverlapping(strandSet, idxLow, idxHigh):
+    return sorted((s for s in strandSet._strandList
+                   if s.lowIdx() <= idxHigh and idxLow <= s.highIdx()),
+                  key=lambda s: s.lowIdx())
+# end def
+
+
+def gapAround(strandSet, strand):
+    """Returns the lowest and highest idx strand may be resized to."""
+    lo, hi = 0, strandSet.part().maxBaseIdx()
+    for s in strandSet._strandList:
+        if s.highIdx() < strand.lowIdx():
+            lo = max(lo, s.highIdx() + 1)
+        elif s.lowIdx() > strand.highIdx():
+            hi = min(hi, s.lowIdx() - 1)
+    return lo, hi
+# end def
+
+
+class StrandSetTests(unittest.TestCase):
+    def assertMatchesScan(self, strandSet):
+        strands = strandSet._strandList
+        self.assertEqual(strandSet._lowIdxList, [s.lowIdx() for s in strands])
+        self.assertEqual(strandSet._highIdxList,
+                         [s.highIdx() for s in strands])
+        for a, b in zip(strands, strands[1:]):
+            self.assertTrue(a.highIdx() < b.lowIdx())
+        maxIdx = strandSet.part().maxBaseIdx()
+        for idx in xrange(-1, maxIdx + 2):
+            found = scanOverlapping(strandSet, idx, idx)
+            self.assertEqual(strandSet.getStrand(idx),
+                             found[0] if found else None)
+        for idxLow in xrange(-1, maxIdx + 2, 5):
+            for idxHigh in xrange(idxLow - 1, maxIdx + 2, 7):
+                found = scanOverlapping(strandSet, idxLow, idxHigh)
+                self.assertEqual(strandSet.getOverlappingStrands(idxLow,
+                                                                 idxHigh),
+                                 found)
+                self.assertEqual(strandSet.hasStrandAt(idxLow, idxHigh),
+                                 bool(found))
+    # end def
+
+    def assertAllMatchScan(self, part):
+        for strandSet in strandSets(part):
+            self.assertMatchesScan(strandSet)
+    # end def
+
+    def testEdits(self):
+        """lookups match a scan after each kind of edit and its undo"""
+        part = loadPart()
+        undoStack = part.undoStack()
+        self.assertAllMatchScan(part)
+        strandSet = part.getVirtualHelices()[0].stapleStrandSet()
+        strandSet.removeAllStrands()
+        self.assertMatchesScan(strandSet)
+        strandSet.createStrand(10, 40)
+        strandSet.createStrand(50, 60)
+        self.assertMatchesScan(strandSet)
+        strand = strandSet.getStrand(10)
+        strand.resize((5, 45))
+        self.assertMatchesScan(strandSet)
+        self.assertTrue(strandSet.splitStrand(strand, 20))
+        self.assertMatchesScan(strandSet)
+        strandSet.mergeStrands(strandSet.getStrand(5), strandSet.getStrand(45))
+        self.assertMatchesScan(strandSet)
+        self.assertEqual(strandSet.getStrand(20).idxs(), (5, 45))
+        strandSet.removeStrand(strandSet.getStrand(55))
+        self.assertMatchesScan(strandSet)
+        for i in xrange(7):
+            undoStack.undo()
+            self.assertAllMatchScan(part)
+        for i in xrange(7):
+            undoStack.redo()
+            self.assertAllMatchScan(part)
+    # end def
+
+    def testRandomEdits(self):
+        """lookups match a scan after each of a random series of edits"""
+        part = loadPart()
+        undoStack = part.undoStack()
+        rand = random.Random(0)
+        sets = strandSets(part)
+        maxIdx = part.maxBaseIdx()
+        for i in xrange(300):
+            strandSet = rand.choice(sets)
+            strands = strandSet._strandList
+            edit = rand.random()
+            if edit < 0.2 or not strands:
+                lo = rand.randrange(maxIdx)
+                hi = min(maxIdx, lo + rand.randrange(3, 16))
+                if not scanOverlapping(strandSet, lo, hi):
+                    strandSet.createStrand(lo, hi)
+            elif edit < 0.3:
+                strandSet.removeStrand(rand.choice(strands))
+            elif edit < 0.5:
+                strand = rand.choice(strands)
+                gapLo, gapHi = gapAround(strandSet, strand)
+                lo = rand.randint(gapLo, strand.highIdx())
+                hi = rand.randint(max(lo, strand.lowIdx()), gapHi)
+                strand.resize((lo, hi))
+            elif edit < 0.65:
+                strand = rand.choice(strands)
+                idx = rand.randint(strand.lowIdx(), strand.highIdx())
+                strandSet.splitStrand(strand, idx)
+            elif edit < 0.8:
+                pairs = [(a, b) for a, b in zip(strands, strands[1:])
+                         if strandSet.strandsCanBeMerged(a, b)]
+                if pairs:
+                    strandSet.mergeStrands(*rand.choice(pairs))
+            else:
+                undoStack.undo()
+            self.assertMatchesScan(strandSet)
+        self.assertAllMatchScan(part)
+        while undoStack.canUndo():
+            undoStack.undo()
+        self.assertAllMatchScan(part)
+    # end def
+# end class
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -236,25 +236,8 @@ def defineEventForwardingMethodsForClass(classObj, forwardedEventSuffix, eventNa
         eventHandler = makeTemplateMethod(eventMethodName, delegateMethodName)
         setattr(classObj, eventMethodName, eventHandler)
 
-def strToDna(seqStr):
-    """Returns str having been reduced to capital ACTG."""
-    return "".join([c for c in seqStr if c in 'ACGTacgt']).upper()
-
-complement = string.maketrans('ACGTacgt','TGCATGCA')
-def rcomp(seqStr):
-    """Returns the reverse complement of the sequence in seqStr."""
-    return seqStr.translate(complement)[::-1]
-def comp(seqStr):
-    """Returns the complement of the sequence in seqStr."""
-    return seqStr.translate(complement)
-
-whitetoQ = string.maketrans(' ','?')
-def markwhite(seqStr):
-    return seqStr.translate(whitetoQ)
-
-def nowhite(seqStr):
-    """Gets rid of whitespace in a string."""
-    return ''.join([c for c in seqStr if c in string.letters])
+# sequence helpers, kept here for existing callers
+from model.sequencetools import strToDna, rcomp, comp, markwhite, nowhite
 
 nearest=lambda a,l:min(l,key=lambda x:abs(x-a))
 
@@ -40,6 +40,56 @@ util.qtWrapImport('QtGui', globals(), ['QBrush', 'QGraphicsItem', \
 _baseWidth = styles.PATH_BASE_WIDTH
 # _gridPen = QPen(styles.minorgridstroke, styles.MINOR_GRID_STROKE_WIDTH)
 # _gridPen.setCosmetic(True)
+_gridPaths = {}  # (canvasSize, subStepSize): grid QPainterPath
+_GRID_PATH_CACHE_SIZE = 4
+
+
+def _gridPath(canvasSize, subStepSize):
+    """
+    Returns a QPainterPath object for the minor grid lines.
+    The path also includes a border outline and a midline for
+    dividing scaffold and staple bases.
+
+    Every helix of a part has the same grid, so the path is built once per
+    (canvasSize, subStepSize) and shared: QPainterPath is implicitly shared,
+    so the helix items setting it don't copy its elements. The grid is in
+    item coordinates and the pen is cosmetic when zoomed out, so the path
+    doesn't depend on the zoom level.
+    """
+    key = (canvasSize, subStepSize)
+    if key in _gridPaths:
+        return _gridPaths[key]
+    if len(_gridPaths) >= _GRID_PATH_CACHE_SIZE:
+        _gridPaths.clear()  # sizes of parts resized since
+    bw = _baseWidth
+    bw2 = 2 * bw
+    path = QPainterPath()
+    # border
+    path.addRect(0, 0, bw * canvasSize, 2 * bw)
+    # minor tick marks
+    for i in range(canvasSize):
+        x = round(bw * i) + .5
+        if i % subStepSize == 0:
+            path.moveTo(x-.5, 0)
+            path.lineTo(x-.5, bw2)
+            path.lineTo(x-.25, bw2)
+            path.lineTo(x-.25, 0)
+            path.lineTo(x, 0)
+            path.lineTo(x, bw2)
+            path.lineTo(x+.25, bw2)
+            path.lineTo(x+.25, 0)
+            path.lineTo(x+.5, 0)
+            path.lineTo(x+.5, bw2)
+        else:
+            path.moveTo(x, 0)
+            path.lineTo(x, 2 * bw)
+
+    # staple-scaffold divider
+    path.moveTo(0, bw)
+    path.lineTo(bw * canvasSize, bw)
+    _gridPaths[key] = path
+    return path
+# end def
 
 
 class VirtualHelixItem(QGraphicsPathItem):
@@ -187,46 +237,13 @@ class VirtualHelixItem(QGraphicsPathItem):
 
     def refreshPath(self):
         """
-        Returns a QPainterPath object for the minor grid lines.
-        The path also includes a border outline and a midline for
-        dividing scaffold and staple bases.
+        Sets the QPainterPath for the minor grid lines, shared by all the
+        helices of the same length and substep size (see _gridPath).
         """
         bw = _baseWidth
-        bw2 = 2 * bw
         part = self.part()
-        path = QPainterPath()
-        subStepSize = part.subStepSize()
         canvasSize = part.maxBaseIdx()+1
-        # border
-        path.addRect(0, 0, bw * canvasSize, 2 * bw)
-        # minor tick marks
-        for i in range(canvasSize):
-            x = round(bw * i) + .5
-            if i % subStepSize == 0:
-                path.moveTo(x-.5, 0)
-                path.lineTo(x-.5, bw2)
-                path.lineTo(x-.25, bw2)
-                path.lineTo(x-.25, 0)
-                path.lineTo(x, 0)
-                path.lineTo(x, bw2)
-                path.lineTo(x+.25, bw2)
-                path.lineTo(x+.25, 0)
-                path.lineTo(x+.5, 0)
-                path.lineTo(x+.5, bw2)
-
-                # path.moveTo(x-.5, 0)
-                # path.lineTo(x-.5, 2 * bw)
-                # path.lineTo(x+.5, 2 * bw)
-                # path.lineTo(x+.5, 0)
-
-            else:
-                path.moveTo(x, 0)
-                path.lineTo(x, 2 * bw)
-
-        # staple-scaffold divider
-        path.moveTo(0, bw)
-        path.lineTo(bw * canvasSize, bw)
-        
+        path = _gridPath(canvasSize, part.subStepSize())
         self.setPath(path)
         
         if self._modelVirtualHelix.scaffoldIsOnTop():